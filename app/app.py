@@ -1,15 +1,72 @@
 import reflex as rx
-from app.state import BrowserState
+from reflex.components.el.elements.media import Iframe
+from reflex.constants import Dirs
+from reflex.event import no_args_event_spec
+from reflex.utils.imports import ImportVar
+from reflex.vars.base import VarData
+from reflex.vars.function import FunctionStringVar
+from app.history_store import history_store
+from app.profiler import ProfilingMiddleware, profiler
+from app.favicons import FAVICON_PATH, favicon_api, favicon_service
+from app.proxy import PROXY_PATH, PROXY_SANDBOX_FLAGS, caching_proxy, proxy_api
+from app.session_store import session_store
+from app.hotkeys import hotkey_watcher
+from app.state import HOTKEYS, MAX_KEEP_ALIVE_TABS, BrowserState
 from app.states.download_state import DownloadState
 
 
-def browser_tab(tab: dict) -> rx.Component:
-    is_active = BrowserState.active_tab_id == tab["id"]
+BACKEND_URL_VAR_DATA = VarData(
+    imports={
+        f"$/{Dirs.STATE_PATH}": "getBackendURL",
+        "$/env.json": ImportVar(tag="env", is_default=True),
+    }
+)
+favicon_url = FunctionStringVar.create(
+    "((name) => { const endpoint = getBackendURL(env.PING);"
+    f' endpoint.pathname = "{FAVICON_PATH}/" + name;'
+    ' endpoint.search = ""; return endpoint.href; })',
+    _var_data=BACKEND_URL_VAR_DATA,
+)
+
+
+site_origin = FunctionStringVar.create(
+    "((url) => { try { const origin = new URL(url).origin;"
+    " return origin === 'null' ? '' : origin; } catch { return ''; } })"
+)
+
+
+def site_icon(url: rx.Var, fallback: str | rx.Var, size: int) -> rx.Component:
+    name = BrowserState.favicons[site_origin.call(url).to(str)].to(str)
+    return rx.cond(
+        name,
+        rx.el.img(
+            src=favicon_url.call(name).to(str),
+            alt="",
+            width=size,
+            height=size,
+            loading="lazy",
+            class_name="mr-2 shrink-0",
+        ),
+        rx.icon(fallback, size=size, class_name="mr-2 shrink-0"),
+    )
+
+
+def browser_tab(tab_id: rx.Var[int]) -> rx.Component:
+    is_active = BrowserState.active_tab_id == tab_id
+    label = rx.cond(
+        BrowserState.recent_tab_labels.contains(tab_id),
+        BrowserState.recent_tab_labels[tab_id],
+        BrowserState.tab_labels[tab_id],
+    )
     return rx.el.div(
-        rx.el.span(tab["title"], class_name="truncate max-w-[120px]"),
+        rx.el.div(
+            site_icon(label["content_url"], "globe", 14),
+            rx.el.span(label["title"], class_name="truncate max-w-[120px]"),
+            class_name="flex items-center min-w-0",
+        ),
         rx.el.button(
             rx.icon("x", size=14),
-            on_click=lambda: BrowserState.close_tab(tab["id"]),
+            on_click=lambda: BrowserState.close_tab(tab_id),
             class_name=rx.cond(
                 is_active,
                 "ml-2 text-gray-700 hover:text-black",
@@ -17,7 +74,10 @@ def browser_tab(tab: dict) -> rx.Component:
             ),
             size="1",
         ),
-        on_click=lambda: BrowserState.switch_tab(tab["id"]),
+        on_click=[
+            rx.call_script("window.taviadTabSwitchStart = performance.now()"),
+            BrowserState.switch_tab(tab_id),
+        ],
         class_name=rx.cond(
             is_active,
             "flex items-center justify-between h-10 px-4 cursor-pointer bg-white border-t-2 border-blue-500 rounded-t-lg shadow-sm",
@@ -55,28 +115,56 @@ def navigation_controls() -> rx.Component:
     )
 
 
+def omnibox_suggestion(suggestion: dict) -> rx.Component:
+    return rx.el.li(
+        rx.icon(
+            rx.cond(suggestion["bookmarked"], "star", "history"),
+            size=14,
+            class_name="mr-2 text-gray-400 shrink-0",
+        ),
+        rx.el.span(suggestion["title"], class_name="font-medium truncate mr-2"),
+        rx.el.span(suggestion["url"], class_name="text-gray-500 truncate"),
+        on_mouse_down=lambda: BrowserState.navigate_to_bookmark(suggestion["url"]),
+        class_name="flex items-center px-4 py-2 text-sm cursor-pointer hover:bg-gray-100",
+    )
+
+
 def address_bar() -> rx.Component:
     return rx.el.div(
         rx.el.form(
             rx.el.input(
+                id="address_bar",
                 name="url",
                 key=BrowserState.active_tab_url,
                 default_value=BrowserState.active_tab_url,
                 placeholder="Search Google or type a URL",
+                auto_complete="off",
+                on_change=lambda text: BrowserState.update_suggestions(
+                    text, BrowserState.omnibox_generation
+                ).debounce(100),
+                on_blur=BrowserState.clear_suggestions,
                 class_name="w-full h-10 px-4 bg-gray-100 rounded-full focus:outline-none focus:ring-2 focus:ring-blue-500 focus:bg-white",
             ),
             on_submit=BrowserState.navigate,
             width="100%",
             reset_on_submit=True,
         ),
-        class_name="flex-grow mx-4",
+        rx.cond(
+            BrowserState.omnibox_suggestions.length() > 0,
+            rx.el.ul(
+                rx.foreach(BrowserState.omnibox_suggestions, omnibox_suggestion),
+                class_name="absolute left-0 right-0 top-11 z-50 py-1 bg-white rounded-lg shadow-lg border border-gray-200",
+            ),
+            rx.fragment(),
+        ),
+        class_name="relative flex-grow mx-4",
     )
 
 
 def browser_header() -> rx.Component:
     return rx.el.header(
         rx.el.div(
-            rx.foreach(BrowserState.tabs, browser_tab),
+            rx.foreach(BrowserState.tab_ids, browser_tab),
             rx.el.button(
                 rx.icon("plus", size=16),
                 on_click=BrowserState.add_tab,
@@ -121,11 +209,16 @@ def browser_header() -> rx.Component:
 def bookmark_bar() -> rx.Component:
     return rx.el.div(
         rx.foreach(
-            BrowserState.bookmarks,
+            BrowserState.bookmark_bar_items,
             lambda bookmark: rx.el.button(
-                rx.icon(bookmark["icon"], size=16, class_name="mr-2"),
+                site_icon(bookmark["url"], bookmark["icon"], 16),
                 rx.el.span(bookmark["title"]),
-                on_click=lambda: BrowserState.navigate_to_bookmark(bookmark["url"]),
+                on_click=rx.cond(
+                    bookmark["is_folder"],
+                    BrowserState.open_bookmark_folder(bookmark["id"]),
+                    BrowserState.navigate_to_bookmark(bookmark["url"]),
+                ),
+                on_mouse_enter=BrowserState.speculate(bookmark["url"]),
                 class_name="flex items-center px-3 py-1.5 text-sm font-medium text-gray-700 bg-white rounded-md hover:bg-gray-100 border border-gray-200 shadow-sm",
             ),
         ),
@@ -133,13 +226,59 @@ def bookmark_bar() -> rx.Component:
     )
 
 
+class TabFrame(Iframe):
+    on_load: rx.EventHandler[no_args_event_spec]
+
+
+proxied_url = FunctionStringVar.create(
+    "((url) => { const endpoint = getBackendURL(env.PING);"
+    f' endpoint.pathname = "{PROXY_PATH}";'
+    " endpoint.search = new URLSearchParams({url}).toString();"
+    " return endpoint.href; })",
+    _var_data=BACKEND_URL_VAR_DATA,
+)
+
+
+def tab_frame(tab: dict) -> rx.Component:
+    content_url = tab["content_url"].to(str)
+    proxied = BrowserState.proxy_pages & content_url.startswith("http")
+    return TabFrame.create(
+        src=rx.cond(proxied, proxied_url.call(content_url).to(str), content_url),
+        sandbox=rx.cond(proxied, PROXY_SANDBOX_FLAGS, None).to(str),
+        id="tab_frame_" + tab["id"].to_string(),
+        key=tab["id"],
+        on_load=rx.call_script(
+            "(() => { const id = "
+            + tab["id"].to_string()
+            + "; const now = performance.now(); const timing = {};"
+            " const pending = window.taviadTabSwitch;"
+            " if (pending?.id === id) { window.taviadTabSwitch = null;"
+            " timing.switch_ms = now - pending.start; }"
+            " let url = document.getElementById('tab_frame_' + id)?.src ?? '';"
+            " try { const src = new URL(url);"
+            f" if (src.pathname === '{PROXY_PATH}')"
+            " url = new URL(src.searchParams.get('url')).href; } catch {}"
+            " (window.taviadFrameUrls ??= {})[id] = url;"
+            " const load = window.taviadPageLoads?.[id];"
+            " if (load?.url === url) { delete window.taviadPageLoads[id];"
+            " timing.load_ms = now - load.start; timing.url = load.url; }"
+            " return Object.keys(timing).length ? timing : null; })()",
+            callback=BrowserState.record_frame_load,
+        ),
+        class_name=rx.cond(
+            BrowserState.active_tab_id == tab["id"],
+            "absolute inset-0 w-full h-full border-0",
+            "absolute inset-0 w-full h-full border-0 invisible pointer-events-none",
+        ),
+    )
+
+
 def browser_content() -> rx.Component:
     return rx.el.main(
         rx.el.div(
-            rx.el.iframe(
-                src=BrowserState.active_tab.get("content_url", "about:blank"),
-                key=BrowserState.active_tab_id.to_string(),
-                class_name="w-full h-full border-0 transition-all duration-300",
+            rx.el.div(
+                rx.foreach(BrowserState.live_tabs, tab_frame),
+                class_name="relative w-full transition-all duration-300",
                 style={
                     "height": rx.cond(
                         BrowserState.show_dev_tools | BrowserState.show_statistics,
@@ -182,6 +321,41 @@ def settings_modal() -> rx.Component:
                 ),
                 class_name="mb-4",
             ),
+            rx.el.div(
+                rx.el.label(
+                    "History Entries per Tab", class_name="text-sm font-medium"
+                ),
+                rx.el.input(
+                    type="number",
+                    min=1,
+                    default_value=BrowserState.history_limit.to_string(),
+                    on_blur=BrowserState.set_history_limit,
+                    class_name="w-full mt-1 h-10 px-3 bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+                ),
+                class_name="mb-4",
+            ),
+            rx.el.div(
+                rx.el.label("Tabs Kept Loaded", class_name="text-sm font-medium"),
+                rx.el.input(
+                    type="number",
+                    min=1,
+                    max=MAX_KEEP_ALIVE_TABS,
+                    default_value=BrowserState.keep_alive_limit.to_string(),
+                    on_blur=BrowserState.set_keep_alive_limit,
+                    class_name="w-full mt-1 h-10 px-3 bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+                ),
+                class_name="mb-4",
+            ),
+            rx.el.label(
+                rx.el.input(
+                    type="checkbox",
+                    checked=BrowserState.proxy_pages,
+                    on_change=BrowserState.toggle_proxy_pages,
+                    class_name="mr-2",
+                ),
+                "Load pages through the caching proxy",
+                class_name="flex items-center text-sm font-medium mb-4",
+            ),
             rx.el.div(
                 rx.el.label("Search Engine", class_name="text-sm font-medium"),
                 rx.el.select(
@@ -193,6 +367,46 @@ def settings_modal() -> rx.Component:
                     on_change=BrowserState.set_search_engine,
                     class_name="w-full mt-1 h-10 px-3 bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
                 ),
+                class_name="mb-4",
+            ),
+            rx.el.div(
+                rx.el.label("Import Browser Data", class_name="text-sm font-medium"),
+                rx.upload.root(
+                    rx.el.div(
+                        rx.icon("upload", size=16, class_name="mr-2"),
+                        "Drop Chrome History, Firefox places.sqlite or bookmarks.html",
+                        class_name="flex items-center justify-center h-16 text-xs text-gray-500",
+                    ),
+                    id="import_upload",
+                    multiple=False,
+                    disabled=BrowserState.importing,
+                    on_drop=BrowserState.upload_import(
+                        rx.upload_files(upload_id="import_upload")
+                    ),
+                    class_name="w-full mt-1 border-2 border-dashed border-gray-200 rounded-md cursor-pointer hover:bg-gray-50",
+                ),
+                rx.cond(
+                    BrowserState.import_status != "",
+                    rx.el.div(
+                        rx.cond(
+                            BrowserState.importing,
+                            rx.el.div(
+                                rx.el.div(
+                                    class_name="bg-blue-500 h-1.5 rounded-full transition-all",
+                                    style={
+                                        "width": BrowserState.import_progress.to_string()
+                                        + "%"
+                                    },
+                                ),
+                                class_name="w-full bg-gray-200 rounded-full h-1.5 mt-2",
+                            ),
+                        ),
+                        rx.el.p(
+                            BrowserState.import_status,
+                            class_name="text-xs text-gray-500 mt-1",
+                        ),
+                    ),
+                ),
                 class_name="mb-6",
             ),
             rx.el.div(
@@ -223,13 +437,36 @@ def downloads_popover() -> rx.Component:
         rx.popover.content(
             rx.el.div(
                 rx.el.div(
-                    rx.el.h3("Downloads", class_name="font-semibold text-gray-800"),
-                    rx.el.button(
-                        "Start Dummy Download",
-                        on_click=DownloadState.start_dummy_download,
-                        class_name="text-xs text-blue-500 hover:underline",
+                    rx.el.div(
+                        rx.el.h3("Downloads", class_name="font-semibold text-gray-800"),
+                        rx.el.button(
+                            "Clear Completed",
+                            on_click=DownloadState.clear_completed_downloads,
+                            class_name="text-xs text-blue-500 hover:underline",
+                        ),
+                        class_name="flex justify-between items-center mb-2",
                     ),
-                    class_name="flex justify-between items-center p-4 border-b",
+                    rx.el.form(
+                        rx.el.input(
+                            name="url",
+                            placeholder="https://example.com/file.zip",
+                            class_name="flex-grow h-8 px-3 text-sm bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+                        ),
+                        rx.el.button(
+                            "Download",
+                            type="submit",
+                            class_name="px-3 h-8 text-xs font-medium text-white bg-blue-500 rounded-md hover:bg-blue-600",
+                        ),
+                        rx.el.input(
+                            name="sha256",
+                            placeholder="SHA-256 (optional)",
+                            class_name="w-full h-8 px-3 text-xs font-mono bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+                        ),
+                        on_submit=DownloadState.start_download,
+                        reset_on_submit=True,
+                        class_name="flex flex-wrap gap-2",
+                    ),
+                    class_name="p-4 border-b",
                 ),
                 rx.cond(
                     DownloadState.downloads.length() == 0,
@@ -237,7 +474,7 @@ def downloads_popover() -> rx.Component:
                         "No downloads yet.", class_name="p-4 text-center text-gray-500"
                     ),
                     rx.el.ul(
-                        rx.foreach(DownloadState.downloads, download_item),
+                        rx.foreach(DownloadState.downloads.reverse(), download_item),
                         class_name="divide-y divide-gray-200 max-h-96 overflow-y-auto",
                     ),
                 ),
@@ -259,10 +496,15 @@ def download_item(item: dict) -> rx.Component:
                     item["status"] == "In Progress",
                     rx.el.div(
                         rx.el.div(
-                            class_name="bg-blue-500 h-1.5 rounded-full transition-all",
-                            style={"width": item["progress"].to_string() + "%"},
+                            rx.el.div(
+                                class_name="bg-blue-500 h-1.5 rounded-full transition-all",
+                                style={"width": item["progress"].to_string() + "%"},
+                            ),
+                            class_name="w-full bg-gray-200 rounded-full h-1.5 mt-1",
+                        ),
+                        rx.el.p(
+                            item["size_text"], class_name="text-xs text-gray-500 mt-1"
                         ),
-                        class_name="w-full bg-gray-200 rounded-full h-1.5 mt-1",
                     ),
                     rx.el.p(
                         item["status"],
@@ -270,9 +512,15 @@ def download_item(item: dict) -> rx.Component:
                             item["status"] == "Completed",
                             "text-xs text-green-600",
                             rx.cond(
-                                item["status"] == "Paused",
+                                (item["status"] == "Paused")
+                                | (item["status"] == "Queued"),
                                 "text-xs text-yellow-600",
-                                "text-xs text-gray-500",
+                                rx.cond(
+                                    (item["status"] == "Failed")
+                                    | (item["status"] == "Corrupt"),
+                                    "text-xs text-red-600",
+                                    "text-xs text-gray-500",
+                                ),
                             ),
                         ),
                     ),
@@ -283,7 +531,33 @@ def download_item(item: dict) -> rx.Component:
         ),
         rx.el.div(
             rx.cond(
-                item["status"] == "Paused",
+                item["status"] == "Queued",
+                rx.el.div(
+                    rx.el.button(
+                        rx.icon("arrow-up", size=14),
+                        on_click=lambda: DownloadState.move_download(item["id"], -1),
+                        title="Move up in queue",
+                        class_name="p-1 text-gray-500 hover:bg-gray-100 rounded-md transition-colors",
+                    ),
+                    rx.el.button(
+                        rx.icon("arrow-down", size=14),
+                        on_click=lambda: DownloadState.move_download(item["id"], 1),
+                        title="Move down in queue",
+                        class_name="p-1 text-gray-500 hover:bg-gray-100 rounded-md transition-colors",
+                    ),
+                    rx.el.button(
+                        rx.icon("skip-forward", size=14),
+                        on_click=lambda: DownloadState.download_next(item["id"]),
+                        title="Download next",
+                        class_name="p-1 text-gray-500 hover:bg-gray-100 rounded-md transition-colors",
+                    ),
+                    class_name="flex items-center gap-1",
+                ),
+            ),
+            rx.cond(
+                (item["status"] == "Paused")
+                | (item["status"] == "Failed")
+                | (item["status"] == "Corrupt"),
                 rx.el.button(
                     rx.icon("play", size=14),
                     on_click=lambda: DownloadState.resume_download(item["id"]),
@@ -293,7 +567,7 @@ def download_item(item: dict) -> rx.Component:
                     rx.icon("pause", size=14),
                     on_click=lambda: DownloadState.pause_download(item["id"]),
                     class_name="p-1 text-gray-500 hover:bg-gray-100 rounded-md transition-colors",
-                    disabled=item["status"] != "In Progress",
+                    disabled=(item["status"] == "Completed"),
                 ),
             ),
             rx.el.button(
@@ -307,6 +581,45 @@ def download_item(item: dict) -> rx.Component:
     )
 
 
+def bookmark_row(bm: dict) -> rx.Component:
+    return rx.el.div(
+        rx.cond(
+            bm["is_folder"],
+            rx.el.button(
+                rx.icon("folder", class_name="mr-2"),
+                on_click=lambda: BrowserState.open_bookmark_folder(bm["id"]),
+            ),
+            site_icon(bm["url"], bm["icon"], 20),
+        ),
+        rx.el.input(
+            default_value=bm["title"],
+            on_blur=lambda val: BrowserState.edit_bookmark(bm["id"], val, bm["url"]),
+            class_name="flex-grow bg-transparent",
+        ),
+        rx.cond(
+            bm["is_folder"],
+            rx.el.button(
+                rx.icon("chevron-right", size=14),
+                on_click=lambda: BrowserState.open_bookmark_folder(bm["id"]),
+                class_name="mr-2",
+            ),
+            rx.el.input(
+                default_value=bm["url"],
+                on_blur=lambda val: BrowserState.edit_bookmark(
+                    bm["id"], bm["title"], val
+                ),
+                class_name="flex-grow bg-transparent text-sm text-gray-500",
+            ),
+        ),
+        rx.el.button(
+            rx.icon("trash-2", size=14),
+            on_click=lambda: BrowserState.remove_bookmark(bm["id"]),
+        ),
+        key=bm["id"],
+        class_name="flex items-center p-2 hover:bg-gray-100 rounded-md",
+    )
+
+
 def bookmark_manager_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.trigger(
@@ -320,37 +633,88 @@ def bookmark_manager_modal() -> rx.Component:
                 "Bookmark Manager", class_name="text-lg font-semibold"
             ),
             rx.el.div(
+                rx.el.button(
+                    "Bookmarks Bar",
+                    on_click=BrowserState.open_bookmark_folder(0),
+                    class_name="hover:underline",
+                ),
                 rx.foreach(
-                    BrowserState.bookmarks,
-                    lambda bm: rx.el.div(
-                        rx.icon(bm["icon"], class_name="mr-2"),
-                        rx.el.input(
-                            default_value=bm["title"],
-                            on_blur=lambda val: BrowserState.edit_bookmark(
-                                bm["url"], val, bm["url"]
-                            ),
-                            class_name="flex-grow bg-transparent",
-                        ),
-                        rx.el.input(
-                            default_value=bm["url"],
-                            on_blur=lambda val: BrowserState.edit_bookmark(
-                                bm["url"], bm["title"], val
-                            ),
-                            class_name="flex-grow bg-transparent text-sm text-gray-500",
+                    BrowserState.bookmark_folder_path,
+                    lambda folder: rx.el.button(
+                        "/ " + folder["title"],
+                        on_click=lambda: BrowserState.open_bookmark_folder(
+                            folder["id"]
                         ),
-                        rx.el.button(
-                            rx.icon("trash-2", size=14),
-                            on_click=lambda: BrowserState.remove_bookmark(bm["url"]),
-                        ),
-                        class_name="flex items-center p-2 hover:bg-gray-100 rounded-md",
+                        class_name="hover:underline",
                     ),
                 ),
-                class_name="my-4 max-h-96 overflow-y-auto",
+                class_name="flex items-center gap-1 mt-2 text-sm text-gray-500",
+            ),
+            rx.el.input(
+                value=BrowserState.bookmark_query,
+                on_change=BrowserState.search_bookmarks.debounce(300),
+                placeholder="Search bookmarks",
+                class_name="w-full h-8 mt-2 px-3 text-sm bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+            ),
+            rx.el.div(
+                rx.foreach(BrowserState.bookmark_folder_items, bookmark_row),
+                class_name="mt-4 max-h-96 overflow-y-auto",
+            ),
+            rx.el.div(
+                rx.el.button(
+                    "Previous",
+                    on_click=BrowserState.previous_bookmark_page,
+                    disabled=BrowserState.bookmark_page_number == 0,
+                    class_name="text-xs text-blue-500 hover:underline disabled:opacity-50",
+                ),
+                rx.el.span(
+                    BrowserState.bookmark_page_label, class_name="text-xs text-gray-500"
+                ),
+                rx.el.button(
+                    "Next",
+                    on_click=BrowserState.next_bookmark_page,
+                    disabled=~BrowserState.has_more_bookmarks,
+                    class_name="text-xs text-blue-500 hover:underline disabled:opacity-50",
+                ),
+                class_name="flex justify-between items-center my-2",
+            ),
+            rx.el.div(
+                rx.el.form(
+                    rx.el.input(
+                        name="title",
+                        placeholder="New folder",
+                        class_name="flex-grow h-8 px-3 text-sm bg-gray-100 rounded-md focus:outline-none",
+                    ),
+                    rx.el.button("Add Folder", type="submit", class_name="text-sm"),
+                    on_submit=BrowserState.add_bookmark_folder,
+                    reset_on_submit=True,
+                    class_name="flex flex-grow gap-2",
+                ),
+                rx.el.button(
+                    "Bookmark Current Page",
+                    on_click=BrowserState.add_bookmark_to_folder,
+                    class_name="text-sm",
+                ),
+                rx.radix.primitives.dialog.close(rx.el.button("Done")),
+                class_name="flex items-center gap-4",
             ),
-            rx.radix.primitives.dialog.close(rx.el.button("Done")),
             class_name="bg-white p-6 rounded-lg shadow-lg",
             style={"maxWidth": "600px"},
         ),
+        open=BrowserState.show_bookmark_manager,
+        on_open_change=BrowserState.set_bookmark_manager_open,
+    )
+
+
+def profile_row(row: dict) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(row["name"], class_name="pr-4"),
+        rx.el.td(row["calls"], class_name="pr-4 text-right"),
+        rx.el.td(row["samples"], class_name="pr-4 text-right"),
+        rx.el.td(row["p50_ms"], class_name="pr-4 text-right"),
+        rx.el.td(row["p99_ms"], class_name="pr-4 text-right"),
+        rx.el.td(row["delta_bytes"], class_name="pr-4 text-right"),
+        rx.el.td(row["state_bytes"], class_name="text-right"),
     )
 
 
@@ -358,11 +722,67 @@ def dev_tools_panel() -> rx.Component:
     return rx.el.div(
         rx.el.div(
             rx.el.p("Developer Tools", class_name="font-semibold"),
-            class_name="p-2 border-b",
+            rx.el.div(
+                rx.el.button(
+                    "Refresh",
+                    on_click=BrowserState.refresh_profile,
+                    class_name="px-2 py-1 text-xs rounded bg-gray-700 hover:bg-gray-600",
+                ),
+                rx.el.button(
+                    "Export JSON",
+                    on_click=BrowserState.export_profile,
+                    class_name="px-2 py-1 text-xs rounded bg-gray-700 hover:bg-gray-600",
+                ),
+                class_name="flex gap-2",
+            ),
+            class_name="flex items-center justify-between p-2 border-b",
         ),
         rx.el.div(
             rx.el.p(
-                "> console.log('Hello from Taviad Surf!')",
+                f"> Background tasks: {BrowserState.profile_background_tasks} "
+                f"(peak {BrowserState.profile_peak_background_tasks}), "
+                f"sampling {BrowserState.profile_sample_rate * 100}% of events",
+                class_name="font-mono text-sm",
+            ),
+            rx.el.p(
+                f"> Speculative prefetch: {BrowserState.prefetch_stats['prefetches']} "
+                f"fetched, {BrowserState.prefetch_stats['used']} used, "
+                f"{BrowserState.prefetch_stats['mean_ttfb_saved_ms']} ms TTFB saved "
+                "per use",
+                class_name="font-mono text-sm",
+            ),
+            rx.cond(
+                BrowserState.tab_switch_ms > 0,
+                rx.el.p(
+                    f"> Tab switch visible in {BrowserState.tab_switch_ms} ms (",
+                    rx.cond(BrowserState.tab_switch_warm, "kept alive", "reloaded"),
+                    ")",
+                    class_name="font-mono text-sm",
+                ),
+                rx.fragment(),
+            ),
+            rx.el.table(
+                rx.el.thead(
+                    rx.el.tr(
+                        rx.el.th("handler", class_name="pr-4 text-left"),
+                        rx.el.th("calls", class_name="pr-4 text-right"),
+                        rx.el.th("samples", class_name="pr-4 text-right"),
+                        rx.el.th("p50 ms", class_name="pr-4 text-right"),
+                        rx.el.th("p99 ms", class_name="pr-4 text-right"),
+                        rx.el.th("delta B", class_name="pr-4 text-right"),
+                        rx.el.th("state B", class_name="text-right"),
+                    ),
+                    class_name="text-gray-400",
+                ),
+                rx.el.tbody(rx.foreach(BrowserState.profile_handlers, profile_row)),
+                class_name="font-mono text-xs my-2",
+            ),
+            rx.el.p(
+                "> Computed var recomputes: ",
+                rx.foreach(
+                    BrowserState.profile_recomputes,
+                    lambda item: rx.el.span(f"{item[0]}={item[1]} "),
+                ),
                 class_name="font-mono text-sm",
             ),
             class_name="p-4 h-full overflow-y-auto",
@@ -371,6 +791,26 @@ def dev_tools_panel() -> rx.Component:
     )
 
 
+def stat_card(label: str, value: rx.Var) -> rx.Component:
+    return rx.el.div(
+        rx.el.p(value, class_name="text-xl font-semibold text-gray-800"),
+        rx.el.p(label, class_name="text-xs text-gray-500"),
+        class_name="px-4 py-2 bg-gray-50 rounded-md border border-gray-200",
+    )
+
+
+def history_link(entry: dict) -> rx.Component:
+    return rx.el.li(
+        rx.el.button(
+            entry["title"],
+            on_click=lambda: BrowserState.navigate_to_bookmark(entry["url"]),
+            class_name="font-medium text-blue-600 hover:underline mr-2",
+        ),
+        rx.el.span(entry["url"], class_name="text-gray-500"),
+        class_name="truncate text-sm",
+    )
+
+
 def statistics_panel() -> rx.Component:
     return rx.el.div(
         rx.el.div(
@@ -378,18 +818,102 @@ def statistics_panel() -> rx.Component:
             class_name="p-2 border-b",
         ),
         rx.el.div(
-            rx.el.h3("History", class_name="font-semibold mb-2"),
-            rx.el.ul(
-                rx.foreach(
-                    BrowserState.tabs.reverse(),
-                    lambda tab: rx.foreach(
-                        tab["history"].reverse(),
-                        lambda h: rx.el.li(h, class_name="truncate text-sm"),
+            rx.el.div(
+                rx.el.div(
+                    stat_card("Visits", BrowserState.total_visits),
+                    stat_card("Sites", BrowserState.unique_domains),
+                    class_name="flex gap-2 mb-4",
+                ),
+                rx.el.h3("Most Visited", class_name="font-semibold mb-2"),
+                rx.el.ol(
+                    rx.foreach(
+                        BrowserState.top_sites,
+                        lambda site: rx.el.li(
+                            rx.el.span(site["domain"], class_name="truncate"),
+                            rx.el.span(site["visits"], class_name="ml-2 text-gray-400"),
+                            class_name="flex justify-between text-sm",
+                        ),
+                    ),
+                    class_name="list-decimal list-inside text-gray-600",
+                ),
+                rx.el.h3("Page Load Times", class_name="font-semibold mt-4 mb-2"),
+                rx.cond(
+                    BrowserState.site_load_times,
+                    rx.el.table(
+                        rx.el.thead(
+                            rx.el.tr(
+                                rx.el.th("Site", class_name="text-left"),
+                                rx.el.th("p50", class_name="text-right"),
+                                rx.el.th("p95", class_name="text-right"),
+                            ),
+                            class_name="text-gray-400",
+                        ),
+                        rx.el.tbody(
+                            rx.foreach(
+                                BrowserState.site_load_times,
+                                lambda site: rx.el.tr(
+                                    rx.el.td(
+                                        site["domain"], class_name="truncate max-w-32"
+                                    ),
+                                    rx.el.td(
+                                        f"{site['p50_ms']} ms", class_name="text-right"
+                                    ),
+                                    rx.el.td(
+                                        f"{site['p95_ms']} ms", class_name="text-right"
+                                    ),
+                                ),
+                            )
+                        ),
+                        class_name="w-full text-sm text-gray-600",
+                    ),
+                    rx.el.p(
+                        "No page loads timed yet.", class_name="text-sm text-gray-400"
+                    ),
+                ),
+                class_name="w-64 shrink-0",
+            ),
+            rx.el.div(
+                rx.el.div(
+                    rx.el.h3("History", class_name="font-semibold"),
+                    rx.el.input(
+                        default_value=BrowserState.history_query,
+                        on_change=BrowserState.search_history.debounce(300),
+                        placeholder="Search history",
+                        class_name="h-8 px-3 text-sm bg-gray-100 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500",
+                    ),
+                    class_name="flex items-center justify-between mb-2",
+                ),
+                rx.cond(
+                    BrowserState.history_query != "",
+                    rx.el.ul(
+                        rx.foreach(BrowserState.history_search_results, history_link),
+                        class_name="list-disc list-inside text-gray-600",
+                    ),
+                    rx.el.div(
+                        rx.el.ul(
+                            rx.foreach(BrowserState.history_page, history_link),
+                            class_name="list-disc list-inside text-gray-600",
+                        ),
+                        rx.el.div(
+                            rx.el.button(
+                                "Newer",
+                                on_click=BrowserState.newer_history_page,
+                                disabled=BrowserState.history_page_number == 0,
+                                class_name="text-xs text-blue-500 hover:underline disabled:opacity-50",
+                            ),
+                            rx.el.button(
+                                "Older",
+                                on_click=BrowserState.older_history_page,
+                                disabled=~BrowserState.has_older_history,
+                                class_name="text-xs text-blue-500 hover:underline disabled:opacity-50",
+                            ),
+                            class_name="flex justify-between mt-2",
+                        ),
                     ),
                 ),
-                class_name="list-disc list-inside text-gray-600",
+                class_name="flex-1 overflow-hidden",
             ),
-            class_name="p-4",
+            class_name="flex gap-6 p-4 overflow-y-auto",
         ),
         class_name="h-full bg-white border-t-2 border-gray-200",
     )
@@ -400,7 +924,7 @@ def index() -> rx.Component:
         browser_header(),
         bookmark_bar(),
         browser_content(),
-        rx.window_event_listener(on_key_down=BrowserState.handle_key_down),
+        hotkey_watcher(HOTKEYS, on_hotkey=BrowserState.handle_hotkey),
         class_name="flex flex-col h-screen w-screen bg-gray-50 font-['Open_Sans']",
     )
 
@@ -415,5 +939,11 @@ app = rx.App(
             rel="stylesheet",
         ),
     ],
+    api_transformer=[proxy_api, favicon_api],
 )
-app.add_page(index, title="Taviad Surf")
\ No newline at end of file
+app.add_page(index, title="Taviad Surf", on_load=BrowserState.restore_session)
+app.register_lifespan_task(history_store.lifespan)
+app.register_lifespan_task(session_store.lifespan)
+app.register_lifespan_task(caching_proxy.lifespan)
+app.register_lifespan_task(favicon_service.lifespan)
+app.add_middleware(ProfilingMiddleware(profiler))
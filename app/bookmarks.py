@@ -0,0 +1,218 @@
+import bisect
+import itertools
+import re
+from collections.abc import Iterator
+from typing import TypedDict
+
+BOOKMARK_BAR_ID = 0
+FOLDER_ICON = "folder"
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*://(www\.)?")
+
+
+def _tokens(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(_SCHEME_RE.sub("", text.lower())))
+
+
+class Bookmark(TypedDict):
+    id: int
+    title: str
+    url: str
+    icon: str
+    folder_id: int
+    is_folder: bool
+
+
+class BookmarkStore:
+    __slots__ = ("nodes", "children", "by_url", "next_id", "postings", "terms")
+
+    def __init__(self):
+        self.nodes: dict[int, Bookmark] = {}
+        self.children: dict[int, dict[int, None]] = {BOOKMARK_BAR_ID: {}}
+        self.by_url: dict[str, int] = {}
+        self.next_id = BOOKMARK_BAR_ID + 1
+        self.postings: dict[str, set[int]] = {}
+        self.terms: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.by_url)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.by_url
+
+    def get(self, node_id: int) -> Bookmark | None:
+        return self.nodes.get(node_id)
+
+    def find(self, url: str) -> Bookmark | None:
+        node_id = self.by_url.get(url)
+        return None if node_id is None else self.nodes[node_id]
+
+    def bookmarks(self) -> Iterator[Bookmark]:
+        for node_id in self.by_url.values():
+            yield self.nodes[node_id]
+
+    def is_folder(self, node_id: int) -> bool:
+        return node_id in self.children
+
+    def count(self, folder_id: int) -> int:
+        return len(self.children.get(folder_id, ()))
+
+    def items(
+        self, folder_id: int, limit: int | None = None, offset: int = 0
+    ) -> list[Bookmark]:
+        stop = None if limit is None else offset + limit
+        children = itertools.islice(self.children.get(folder_id, ()), offset, stop)
+        return [dict(self.nodes[node_id]) for node_id in children]
+
+    def lookup(self, node_ids: list[int]) -> list[Bookmark]:
+        return [dict(self.nodes[node_id]) for node_id in node_ids]
+
+    def _index(self, node: Bookmark):
+        for term in _tokens(f"{node['title']} {node['url']}"):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = set()
+                bisect.insort(self.terms, term)
+            posting.add(node["id"])
+
+    def _unindex(self, node: Bookmark):
+        for term in _tokens(f"{node['title']} {node['url']}"):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.discard(node["id"])
+            if not posting:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+
+    def search(self, query: str) -> list[int]:
+        matches: set[int] | None = None
+        for prefix in sorted(_tokens(query), key=len, reverse=True):
+            found: set[int] = set()
+            position = bisect.bisect_left(self.terms, prefix)
+            while position < len(self.terms) and self.terms[position].startswith(
+                prefix
+            ):
+                posting = self.postings[self.terms[position]]
+                found |= posting if matches is None else posting & matches
+                position += 1
+            matches = found
+            if not matches:
+                break
+        return sorted(matches or ())
+
+    def path(self, folder_id: int) -> list[Bookmark]:
+        result: list[Bookmark] = []
+        node = self.nodes.get(folder_id)
+        while node is not None:
+            result.append(dict(node))
+            node = self.nodes.get(node["folder_id"])
+        result.reverse()
+        return result
+
+    def _insert(self, node: Bookmark) -> Bookmark:
+        self.nodes[node["id"]] = node
+        self.children[node["folder_id"]][node["id"]] = None
+        self.next_id = max(self.next_id, node["id"] + 1)
+        self._index(node)
+        return node
+
+    def add(
+        self,
+        url: str,
+        title: str,
+        icon: str = "file-text",
+        folder_id: int = BOOKMARK_BAR_ID,
+    ) -> Bookmark | None:
+        if url in self.by_url or folder_id not in self.children:
+            return None
+        node = self._insert(
+            {
+                "id": self.next_id,
+                "title": title,
+                "url": url,
+                "icon": icon,
+                "folder_id": folder_id,
+                "is_folder": False,
+            }
+        )
+        self.by_url[url] = node["id"]
+        return node
+
+    def add_folder(
+        self, title: str, parent_id: int = BOOKMARK_BAR_ID
+    ) -> Bookmark | None:
+        if parent_id not in self.children:
+            return None
+        node = self._insert(
+            {
+                "id": self.next_id,
+                "title": title,
+                "url": "",
+                "icon": FOLDER_ICON,
+                "folder_id": parent_id,
+                "is_folder": True,
+            }
+        )
+        self.children[node["id"]] = {}
+        return node
+
+    def update(self, node_id: int, title: str, url: str | None = None) -> bool:
+        node = self.nodes.get(node_id)
+        if node is None:
+            return False
+        changes_url = url is not None and not node["is_folder"] and url != node["url"]
+        if changes_url and url in self.by_url:
+            return False
+        self._unindex(node)
+        if changes_url:
+            del self.by_url[node["url"]]
+            self.by_url[url] = node_id
+            node["url"] = url
+        node["title"] = title
+        self._index(node)
+        return True
+
+    def move(self, node_id: int, folder_id: int) -> bool:
+        node = self.nodes.get(node_id)
+        if node is None or folder_id not in self.children:
+            return False
+        if node["is_folder"]:
+            ancestor = self.nodes.get(folder_id)
+            while ancestor is not None:
+                if ancestor["id"] == node_id:
+                    return False
+                ancestor = self.nodes.get(ancestor["folder_id"])
+        del self.children[node["folder_id"]][node_id]
+        node["folder_id"] = folder_id
+        self.children[folder_id][node_id] = None
+        return True
+
+    def remove(self, node_id: int) -> list[Bookmark]:
+        node = self.nodes.get(node_id)
+        if node is None:
+            return []
+        del self.children[node["folder_id"]][node_id]
+        removed: list[Bookmark] = []
+        stack = [node_id]
+        while stack:
+            current = self.nodes.pop(stack.pop())
+            self._unindex(current)
+            if current["is_folder"]:
+                stack.extend(self.children.pop(current["id"]))
+            else:
+                del self.by_url[current["url"]]
+                removed.append(current)
+        return removed
+
+
+def default_bookmarks() -> BookmarkStore:
+    store = BookmarkStore()
+    store.add("https://reflex.dev", "Reflex", "box")
+    store.add("https://github.com", "GitHub", "github")
+    store.add("https://google.com", "Google", "search")
+    store.add(
+        "https://reflex.dev/docs/getting-started/introduction/", "Docs", "book-open"
+    )
+    return store
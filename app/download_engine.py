@@ -0,0 +1,400 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import uuid
+from collections.abc import AsyncIterator
+from urllib.parse import unquote, urlsplit
+
+import aiofiles
+import httpx
+
+from app.download_scheduler import rate_limiter, scheduler
+from app.proxy import PrivateAddressError, open_public, public_transport
+
+DOWNLOAD_DIR = os.environ.get("TAVIAD_DOWNLOAD_DIR", "downloads")
+CHUNK_SIZE = 256 * 1024
+PROGRESS_INTERVAL = 0.25
+SEGMENT_COUNT = int(os.environ.get("TAVIAD_DOWNLOAD_SEGMENTS", "4"))
+SEGMENT_MIN_SIZE = 4 * 1024 * 1024
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.\-]+")
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+SHA256_RE = re.compile(r"[0-9a-fA-F]{64}")
+SIDECAR_MAX_SIZE = 4096
+
+_client: httpx.AsyncClient | None = None
+_controls: dict[tuple[str, int], "DownloadControl"] = {}
+
+
+class DownloadError(Exception):
+    pass
+
+
+class IntegrityError(DownloadError):
+    pass
+
+
+class DownloadControl:
+    def __init__(self, priority: int = 0, sha256: str = ""):
+        self.priority = priority
+        self.sha256 = sha256.lower()
+        self.phase = "queued"
+        self.received = 0
+        self.total = 0
+        self.action: str | None = None
+        self._stopped = asyncio.Event()
+
+    def stop(self, action: str):
+        self.action = action
+        self._stopped.set()
+
+    def reprioritize(self, priority: int):
+        self.priority = priority
+        scheduler.reprioritize(self, priority)
+
+
+def start_control(
+    token: str, download_id: int, priority: int, sha256: str = ""
+) -> DownloadControl | None:
+    if (token, download_id) in _controls:
+        return None
+    control = _controls[token, download_id] = DownloadControl(priority, sha256)
+    return control
+
+
+def get_control(token: str, download_id: int) -> DownloadControl | None:
+    return _controls.get((token, download_id))
+
+
+def finish_control(token: str, download_id: int):
+    _controls.pop((token, download_id), None)
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, read=60.0),
+            transport=public_transport(
+                httpx.Limits(max_connections=64, max_keepalive_connections=16)
+            ),
+        )
+    return _client
+
+
+def filename_for(url: str) -> str:
+    name = unquote(os.path.basename(urlsplit(url).path))
+    name = _UNSAFE_FILENAME_RE.sub("_", name).strip("._")
+    return name or "download"
+
+
+def new_download_path(name: str) -> str:
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    return os.path.join(DOWNLOAD_DIR, f"{uuid.uuid4().hex[:8]}-{name}")
+
+
+def partial_path(path: str) -> str:
+    return f"{path}.part"
+
+
+def segments_path(path: str) -> str:
+    return f"{path}.segments"
+
+
+def remove_download_files(path: str):
+    for candidate in (path, partial_path(path), segments_path(path)):
+        try:
+            os.remove(candidate)
+        except FileNotFoundError:
+            pass
+
+
+def _hash_file(sha: "hashlib._Hash", path: str, size: int | None = None):
+    remaining = os.path.getsize(path) if size is None else size
+    with open(path, "rb") as file:
+        while remaining > 0:
+            block = file.read(min(4 * CHUNK_SIZE, remaining))
+            if not block:
+                break
+            sha.update(block)
+            remaining -= len(block)
+
+
+class StreamHasher:
+    def __init__(self):
+        self._sha = hashlib.sha256()
+        self._pending: asyncio.Future | None = None
+
+    async def _drain(self):
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+
+    async def update(self, data: bytes):
+        await self._drain()
+        self._pending = asyncio.get_running_loop().run_in_executor(
+            None, self._sha.update, data
+        )
+
+    async def update_from_file(self, path: str, size: int | None = None):
+        await self._drain()
+        await asyncio.to_thread(_hash_file, self._sha, path, size)
+
+    async def reset(self):
+        await self._drain()
+        self._sha = hashlib.sha256()
+
+    async def hexdigest(self) -> str:
+        await self._drain()
+        return self._sha.hexdigest()
+
+
+async def fetch_sidecar_digest(url: str) -> str:
+    try:
+        parts = urlsplit(url)
+        sidecar_url = parts._replace(path=f"{parts.path}.sha256").geturl()
+        async with open_public(get_client(), sidecar_url) as response:
+            if response.status_code != 200:
+                return ""
+            body = bytearray()
+            async for chunk in response.aiter_bytes(SIDECAR_MAX_SIZE):
+                body += chunk
+                if len(body) > SIDECAR_MAX_SIZE:
+                    return ""
+    except (httpx.HTTPError, httpx.InvalidURL, PrivateAddressError):
+        return ""
+    match = SHA256_RE.match(body.decode(errors="replace").strip())
+    return match.group(0).lower() if match else ""
+
+
+def _total_size(response: httpx.Response, offset: int) -> int:
+    if response.status_code == 206:
+        match = _CONTENT_RANGE_RE.match(response.headers.get("content-range", ""))
+        if match and match.group(3) != "*":
+            return int(match.group(3))
+    length = response.headers.get("content-length")
+    return offset + int(length) if length is not None else 0
+
+
+async def stream_download(
+    url: str, path: str, hasher: StreamHasher
+) -> AsyncIterator[tuple[int, int]]:
+    part_path = partial_path(path)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    async with open_public(get_client(), url, headers) as response:
+        if offset and response.status_code == 416:
+            await hasher.update_from_file(part_path, offset)
+            yield offset, offset
+            return
+        if response.status_code >= 400:
+            raise DownloadError(f"HTTP {response.status_code}")
+        if response.status_code != 206:
+            offset = 0
+        total = _total_size(response, offset)
+        yield offset, total
+        if offset:
+            await hasher.update_from_file(part_path, offset)
+        async with aiofiles.open(part_path, "ab" if offset else "wb") as file:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                await hasher.update(chunk)
+                await file.write(chunk)
+                offset += len(chunk)
+                yield offset, total
+                await rate_limiter.consume(len(chunk))
+    if total and offset != total:
+        raise DownloadError("Connection closed before the download finished")
+
+
+async def _probe_range_size(url: str) -> int | None:
+    headers = {"Range": "bytes=0-0"}
+    async with open_public(get_client(), url, headers) as response:
+        if response.status_code != 206:
+            return None
+        return _total_size(response, 0) or None
+
+
+def _plan_segments(total: int, count: int, received: int = 0) -> list[list[int]]:
+    size = -(-total // count)
+    segments = []
+    for start in range(0, total, size):
+        end = min(start + size, total) - 1
+        segments.append([start, end, max(0, min(received - start, end - start + 1))])
+    return segments
+
+
+def _load_segments(path: str, total: int) -> list[list[int]] | None:
+    try:
+        with open(segments_path(path)) as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if saved.get("total") != total or not os.path.exists(partial_path(path)):
+        return None
+    return saved["segments"]
+
+
+def _save_segments(path: str, total: int, segments: list[list[int]]):
+    with open(segments_path(path), "w") as file:
+        json.dump({"total": total, "segments": segments}, file)
+
+
+def _preallocate(part_path: str, total: int) -> int:
+    fd = os.open(part_path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        received = os.fstat(fd).st_size
+        if received > total:
+            os.ftruncate(fd, 0)
+            received = 0
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fd, 0, total)
+        else:
+            os.ftruncate(fd, total)
+    finally:
+        os.close(fd)
+    return received
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+async def _write_at(fd: int, data: bytes, offset: int):
+    write = asyncio.ensure_future(asyncio.to_thread(_pwrite_all, fd, data, offset))
+    try:
+        await asyncio.shield(write)
+    except asyncio.CancelledError:
+        await asyncio.wait([write])
+        raise
+
+
+async def _fetch_segment(
+    url: str,
+    fd: int,
+    segment: list[int],
+    control: DownloadControl,
+    connections: asyncio.Semaphore,
+):
+    start, end, _ = segment
+    if start + segment[2] > end:
+        return
+    async with connections:
+        headers = {"Range": f"bytes={start + segment[2]}-{end}"}
+        async with open_public(get_client(), url, headers) as response:
+            if response.status_code != 206:
+                raise DownloadError("Server stopped honouring range requests")
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                chunk = chunk[: end - start - segment[2] + 1]
+                await _write_at(fd, chunk, start + segment[2])
+                segment[2] += len(chunk)
+                control.received += len(chunk)
+                await rate_limiter.consume(len(chunk))
+    if start + segment[2] <= end:
+        raise DownloadError("Connection closed before the download finished")
+
+
+async def segmented_download(
+    url: str, path: str, total: int, control: DownloadControl, connections: int
+):
+    part_path = partial_path(path)
+    segments = _load_segments(path, total)
+    if segments is None:
+        received = await asyncio.to_thread(_preallocate, part_path, total)
+        segments = _plan_segments(total, SEGMENT_COUNT, received)
+        await asyncio.to_thread(_save_segments, path, total, segments)
+    control.total = total
+    control.received = sum(segment[2] for segment in segments)
+    fd = os.open(part_path, os.O_WRONLY)
+    limit = asyncio.Semaphore(connections)
+    tasks = [
+        asyncio.create_task(_fetch_segment(url, fd, segment, control, limit))
+        for segment in segments
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        os.close(fd)
+        _save_segments(path, total, segments)
+
+
+async def _verify(
+    url: str, path: str, control: DownloadControl, hasher: StreamHasher | None
+):
+    control.phase = "verifying"
+    expected = control.sha256 or await fetch_sidecar_digest(url)
+    part_path = partial_path(path)
+    if expected:
+        if hasher is None:
+            hasher = StreamHasher()
+            await hasher.update_from_file(part_path)
+        if await hasher.hexdigest() != expected:
+            remove_download_files(path)
+            raise IntegrityError("SHA-256 digest does not match")
+    os.replace(part_path, path)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(segments_path(path))
+
+
+async def download(url: str, path: str, control: DownloadControl):
+    host = urlsplit(url).hostname or ""
+    async with scheduler.slot(control, host, control.priority):
+        control.phase = "downloading"
+        if SEGMENT_COUNT > 1 and hasattr(os, "pwrite"):
+            total = await _probe_range_size(url)
+            if total is not None and total >= SEGMENT_MIN_SIZE:
+                extra = scheduler.acquire_connections(host, SEGMENT_COUNT - 1)
+                try:
+                    await segmented_download(url, path, total, control, 1 + extra)
+                finally:
+                    scheduler.release_connections(host, extra)
+                await _verify(url, path, control, None)
+                return
+        if os.path.exists(segments_path(path)):
+            remove_download_files(path)
+        hasher = StreamHasher()
+        async with contextlib.aclosing(stream_download(url, path, hasher)) as chunks:
+            async for received, total in chunks:
+                control.received = received
+                control.total = total
+        await _verify(url, path, control, hasher)
+
+
+async def run_transfer(
+    url: str, path: str, control: DownloadControl
+) -> AsyncIterator[tuple[str, int, int]]:
+    transfer = asyncio.create_task(download(url, path, control))
+    stopped = asyncio.create_task(control._stopped.wait())
+    reported = None
+    try:
+        while not transfer.done():
+            await asyncio.wait(
+                (transfer, stopped),
+                timeout=PROGRESS_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if stopped.done() and not transfer.done():
+                return
+            frame = (control.phase, control.received, control.total)
+            if frame != reported:
+                reported = frame
+                yield frame
+        transfer.result()
+        frame = (control.phase, control.received, control.total)
+        if frame != reported:
+            yield frame
+    finally:
+        stopped.cancel()
+        if not transfer.done():
+            transfer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await transfer
@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import itertools
+import os
+import time
+from collections.abc import Hashable
+
+MAX_ACTIVE_DOWNLOADS = int(os.environ.get("TAVIAD_MAX_DOWNLOADS", "4"))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("TAVIAD_MAX_HOST_CONNECTIONS", "6"))
+DOWNLOAD_RATE_LIMIT = int(os.environ.get("TAVIAD_DOWNLOAD_RATE_LIMIT", "0"))
+
+
+class TokenBucket:
+    def __init__(self, rate: int, capacity: int | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+
+    async def consume(self, amount: int):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+        self._tokens -= amount
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "host", "future")
+
+    def __init__(self, priority: int, sequence: int, host: str):
+        self.priority = priority
+        self.sequence = sequence
+        self.host = host
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+
+class DownloadScheduler:
+    def __init__(self, max_active: int, max_per_host: int):
+        self.max_active = max_active
+        self.max_per_host = max_per_host
+        self._active = 0
+        self._connections: dict[str, int] = {}
+        self._waiters: dict[Hashable, _Waiter] = {}
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _pump(self):
+        if self._active >= self.max_active or not self._waiters:
+            return
+        ordered = sorted(
+            self._waiters.items(),
+            key=lambda item: (item[1].priority, item[1].sequence),
+        )
+        for key, waiter in ordered:
+            if self._active >= self.max_active:
+                break
+            if self._connections.get(waiter.host, 0) >= self.max_per_host:
+                continue
+            del self._waiters[key]
+            self._active += 1
+            self._connections[waiter.host] = self._connections.get(waiter.host, 0) + 1
+            waiter.future.set_result(None)
+
+    def _release(self, host: str):
+        self._active -= 1
+        self.release_connections(host, 1)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: Hashable, host: str, priority: int):
+        waiter = _Waiter(priority, next(self._sequence), host)
+        self._waiters[key] = waiter
+        self._pump()
+        try:
+            await waiter.future
+        except BaseException:
+            if self._waiters.get(key) is waiter:
+                del self._waiters[key]
+            elif waiter.future.done() and not waiter.future.cancelled():
+                self._release(host)
+            raise
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def reprioritize(self, key: Hashable, priority: int):
+        waiter = self._waiters.get(key)
+        if waiter is not None:
+            waiter.priority = priority
+
+    def acquire_connections(self, host: str, count: int) -> int:
+        in_use = self._connections.get(host, 0)
+        granted = max(0, min(count, self.max_per_host - in_use))
+        if granted:
+            self._connections[host] = in_use + granted
+        return granted
+
+    def release_connections(self, host: str, count: int):
+        if not count:
+            return
+        remaining = self._connections.get(host, 0) - count
+        if remaining > 0:
+            self._connections[host] = remaining
+        else:
+            self._connections.pop(host, None)
+        self._pump()
+
+
+scheduler = DownloadScheduler(MAX_ACTIVE_DOWNLOADS, MAX_CONNECTIONS_PER_HOST)
+rate_limiter = TokenBucket(DOWNLOAD_RATE_LIMIT)
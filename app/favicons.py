@@ -0,0 +1,390 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.proxy import (
+    USER_AGENT,
+    PrivateAddressError,
+    is_proxyable,
+    open_public,
+    public_transport,
+)
+
+FAVICON_PATH = "/_favicon"
+FAVICON_DIR = os.environ.get("TAVIAD_FAVICON_DIR", "favicons")
+FAVICON_CACHE_SIZE = int(os.environ.get("TAVIAD_FAVICON_CACHE_SIZE", str(32 * 2**20)))
+FAVICON_CONCURRENCY = int(os.environ.get("TAVIAD_FAVICON_CONCURRENCY", "8"))
+FAVICON_ORIGINS_LIMIT = int(os.environ.get("TAVIAD_FAVICON_ORIGINS_LIMIT", "10000"))
+ORIGINS_SAVE_DELAY = 2.0
+MAX_ICON_SIZE = 256 * 2**10
+MAX_PAGE_HEAD_SIZE = 64 * 2**10
+MISSING_ICON_RETRY = 24 * 60 * 60
+ICON_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+logger = logging.getLogger(__name__)
+
+_ICON_TYPES = {
+    "ico": "image/x-icon",
+    "png": "image/png",
+    "gif": "image/gif",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+_ICON_NAME_RE = re.compile(rf"[0-9a-f]{{64}}\.({'|'.join(_ICON_TYPES)})")
+_LINK_RE = re.compile(rb"<link\b[^>]*>", re.IGNORECASE)
+_ATTRIBUTE_RE = re.compile(
+    rb"""([a-z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE
+)
+
+
+def _icon_type(data: bytes) -> str | None:
+    if data.startswith((b"\x00\x00\x01\x00", b"\x00\x00\x02\x00")):
+        return "ico"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"GIF8"):
+        return "gif"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+        return "webp"
+    if b"<svg" in data[:512].lower():
+        return "svg"
+    return None
+
+
+def _icon_links(page_url: str, html: bytes) -> list[str]:
+    icons = []
+    touch_icons = []
+    for tag in _LINK_RE.findall(html):
+        attributes = {
+            name.lower(): (quoted or single or bare).decode(errors="replace")
+            for name, quoted, single, bare in _ATTRIBUTE_RE.findall(tag)
+        }
+        rel = attributes.get("rel", "").lower().split()
+        href = attributes.get("href", "").strip()
+        if not href or href.startswith("data:"):
+            continue
+        if "icon" in rel:
+            icons.append(urljoin(page_url, href))
+        elif "apple-touch-icon" in rel:
+            touch_icons.append(urljoin(page_url, href))
+    return (icons + touch_icons)[:3]
+
+
+def _write_file(path: str, data: bytes):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _remove_files(paths: list[str]):
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _scan_icons(directory: str) -> list[tuple[str, int]]:
+    os.makedirs(directory, exist_ok=True)
+    icons = []
+    for entry in os.scandir(directory):
+        if _ICON_NAME_RE.fullmatch(entry.name):
+            stat = entry.stat()
+            icons.append((stat.st_mtime, entry.name, stat.st_size))
+    icons.sort()
+    return [(name, size) for _, name, size in icons]
+
+
+def _read_origins(path: str) -> list[tuple[str, tuple[str, float]]]:
+    try:
+        with open(path) as file:
+            return [(origin, tuple(icon)) for origin, icon in json.load(file).items()]
+    except (OSError, ValueError, TypeError, AttributeError):
+        return []
+
+
+def _write_origins(path: str, origins: list[tuple[str, tuple[str, float]]]):
+    _write_file(path, json.dumps(dict(origins), separators=(",", ":")).encode())
+
+
+class IconStore:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._index: OrderedDict[str, int] | None = None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    async def load(self) -> OrderedDict[str, int]:
+        if self._index is None:
+            icons = await asyncio.to_thread(_scan_icons, self.directory)
+            if self._index is None:
+                self._index = OrderedDict(icons)
+                self.size = sum(self._index.values())
+        return self._index
+
+    def __contains__(self, name: str) -> bool:
+        return self._index is not None and name in self._index
+
+    async def touch(self, name: str) -> bool:
+        index = await self.load()
+        if name not in index:
+            return False
+        index.move_to_end(name)
+        with contextlib.suppress(FileNotFoundError):
+            await asyncio.to_thread(os.utime, self.path(name))
+        return True
+
+    async def put(self, data: bytes, icon_type: str) -> tuple[str, list[str]]:
+        index = await self.load()
+        name = f"{hashlib.sha256(data).hexdigest()}.{icon_type}"
+        if await self.touch(name):
+            return name, []
+        await asyncio.to_thread(_write_file, self.path(name), data)
+        index[name] = len(data)
+        self.size += len(data)
+        evicted = []
+        while self.size > self.max_bytes and len(index) > 1:
+            old_name, old_size = index.popitem(last=False)
+            self.size -= old_size
+            evicted.append(old_name)
+        if evicted:
+            await asyncio.to_thread(
+                _remove_files, [self.path(old_name) for old_name in evicted]
+            )
+        return name, evicted
+
+
+class FaviconService:
+    def __init__(
+        self,
+        store: IconStore,
+        concurrency: int,
+        max_origins: int = FAVICON_ORIGINS_LIMIT,
+    ):
+        self.store = store
+        self.max_origins = max_origins
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client: httpx.AsyncClient | None = None
+        self._origins: OrderedDict[str, tuple[str, float]] | None = None
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+        self._origins_changed = False
+        self._save_handle: asyncio.TimerHandle | None = None
+        self._save_tasks: set[asyncio.Task] = set()
+        self._save_lock = asyncio.Lock()
+
+    @property
+    def _origins_path(self) -> str:
+        return os.path.join(self.store.directory, "origins.json")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                timeout=httpx.Timeout(5.0),
+                transport=public_transport(
+                    httpx.Limits(
+                        max_connections=FAVICON_CONCURRENCY * 2,
+                        max_keepalive_connections=FAVICON_CONCURRENCY,
+                    )
+                ),
+            )
+        return self._client
+
+    async def _load_origins(self) -> OrderedDict[str, tuple[str, float]]:
+        if self._origins is None:
+            await self.store.load()
+            origins = await asyncio.to_thread(_read_origins, self._origins_path)
+            if self._origins is None:
+                self._origins = OrderedDict(origins[-self.max_origins :])
+        return self._origins
+
+    def cached(self, origin: str) -> str | None:
+        known = self._origins.get(origin) if self._origins is not None else None
+        if known is None:
+            return None
+        name, checked_at = known
+        if name and name not in self.store:
+            return None
+        if not name and time.time() - checked_at >= MISSING_ICON_RETRY:
+            return None
+        self._origins.move_to_end(origin)
+        return name
+
+    async def lookup(self, origins: list[str]) -> dict[str, str]:
+        await self._load_origins()
+        names = await asyncio.gather(*(self.icon(origin) for origin in origins))
+        return dict(zip(origins, names))
+
+    async def icon(self, origin: str) -> str:
+        await self._load_origins()
+        name = self.cached(origin)
+        if name is not None:
+            return name
+        task = self._inflight.get(origin)
+        if task is None:
+            task = self._inflight[origin] = asyncio.create_task(
+                self._fetch_origin(origin)
+            )
+            task.add_done_callback(lambda _: self._inflight.pop(origin, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_origin(self, origin: str) -> str:
+        name = ""
+        evicted = []
+        if is_proxyable(f"{origin}/"):
+            async with self._semaphore:
+                try:
+                    icon = await self._download(origin)
+                except httpx.HTTPError:
+                    icon = None
+            if icon is not None:
+                name, evicted = await self.store.put(*icon)
+        origins = await self._load_origins()
+        origins.pop(origin, None)
+        origins[origin] = name, time.time()
+        while len(origins) > self.max_origins:
+            origins.popitem(last=False)
+        if evicted:
+            evicted = set(evicted)
+            for other, (other_name, _) in list(origins.items()):
+                if other_name in evicted:
+                    del origins[other]
+        self._origins_changed = True
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                ORIGINS_SAVE_DELAY, self._start_save
+            )
+        return name
+
+    def _start_save(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._save_tasks.add(task)
+        task.add_done_callback(self._save_done)
+
+    def _save_done(self, task: asyncio.Task):
+        self._save_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Could not write favicon origins", exc_info=task.exception())
+
+    async def flush(self):
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        async with self._save_lock:
+            if not self._origins_changed:
+                return
+            self._origins_changed = False
+            await asyncio.to_thread(
+                _write_origins, self._origins_path, list(self._origins.items())
+            )
+
+    async def _read(self, url: str, limit: int) -> tuple[str, bytes] | None:
+        try:
+            async with open_public(self._get_client(), url) as response:
+                if response.status_code != 200:
+                    return None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > limit:
+                        break
+                return str(response.url), bytes(body)
+        except PrivateAddressError:
+            return None
+
+    async def _get_icon(self, url: str) -> tuple[bytes, str] | None:
+        response = await self._read(url, MAX_ICON_SIZE)
+        if response is None or len(response[1]) > MAX_ICON_SIZE:
+            return None
+        icon_type = _icon_type(response[1])
+        return (response[1], icon_type) if icon_type else None
+
+    async def _download(self, origin: str) -> tuple[bytes, str] | None:
+        icon = await self._get_icon(f"{origin}/favicon.ico")
+        if icon is not None:
+            return icon
+        page = await self._read(f"{origin}/", MAX_PAGE_HEAD_SIZE)
+        if page is None:
+            return None
+        for url in _icon_links(*page):
+            with contextlib.suppress(httpx.HTTPError):
+                icon = await self._get_icon(url)
+                if icon is not None:
+                    return icon
+        return None
+
+    async def close(self):
+        await asyncio.gather(*self._save_tasks, return_exceptions=True)
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            await self.close()
+
+
+def site_origin(url: str) -> str:
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return ""
+    if parts.scheme not in ("http", "https") or not host:
+        return ""
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode()
+        except UnicodeError:
+            return ""
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != (443 if parts.scheme == "https" else 80):
+        host = f"{host}:{port}"
+    return f"{parts.scheme}://{host}"
+
+
+async def handle_favicon(request: Request) -> Response:
+    name = request.path_params["name"]
+    if not _ICON_NAME_RE.fullmatch(name) or not await favicon_service.store.touch(name):
+        return PlainTextResponse("Unknown icon.", 404)
+    return FileResponse(
+        favicon_service.store.path(name),
+        media_type=_ICON_TYPES[name.rpartition(".")[2]],
+        headers={
+            "Cache-Control": ICON_CACHE_CONTROL,
+            "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+favicon_service = FaviconService(
+    IconStore(FAVICON_DIR, FAVICON_CACHE_SIZE), FAVICON_CONCURRENCY
+)
+favicon_api = Starlette(
+    routes=[Route(f"{FAVICON_PATH}/{{name}}", handle_favicon, methods=["GET"])]
+)
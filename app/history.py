@@ -0,0 +1,90 @@
+import itertools
+import sys
+from collections import deque
+
+DEFAULT_HISTORY_LIMIT = 100
+MAX_HISTORY_LIMIT = 1000
+
+
+def _restore_history(
+    entries: tuple[str, ...], position: int, limit: int | None
+) -> "TabHistory":
+    history = TabHistory.__new__(TabHistory)
+    history.entries = deque(map(sys.intern, entries), maxlen=limit)
+    history.position = position
+    return history
+
+
+class TabHistory:
+    __slots__ = ("entries", "position")
+
+    def __init__(self, url: str, limit: int = DEFAULT_HISTORY_LIMIT):
+        self.entries: deque[str] = deque((sys.intern(str(url)),), maxlen=limit)
+        self.position = 0
+
+    @classmethod
+    def restore(cls, entries: list[str], position: int, limit: int) -> "TabHistory":
+        entries = entries or ["about:blank"]
+        position = max(0, min(position, len(entries) - 1))
+        history = _restore_history(tuple(entries), position, None)
+        history.resize(limit)
+        return history
+
+    def __reduce__(self):
+        return (
+            _restore_history,
+            (tuple(self.entries), self.position, self.entries.maxlen),
+        )
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __reversed__(self):
+        return reversed(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def current(self) -> str:
+        return self.entries[self.position]
+
+    @property
+    def can_go_back(self) -> bool:
+        return self.position > 0
+
+    @property
+    def can_go_forward(self) -> bool:
+        return self.position < len(self.entries) - 1
+
+    def push(self, url: str) -> str:
+        while len(self.entries) - 1 > self.position:
+            self.entries.pop()
+        self.entries.append(sys.intern(str(url)))
+        self.position = len(self.entries) - 1
+        return self.entries[self.position]
+
+    def back(self) -> str | None:
+        if not self.can_go_back:
+            return None
+        self.position -= 1
+        return self.entries[self.position]
+
+    def forward(self) -> str | None:
+        if not self.can_go_forward:
+            return None
+        self.position += 1
+        return self.entries[self.position]
+
+    def resize(self, limit: int):
+        if limit == self.entries.maxlen:
+            return
+        excess = max(0, len(self.entries) - limit)
+        forward = min(excess, len(self.entries) - 1 - self.position)
+        for _ in range(forward):
+            self.entries.pop()
+        dropped = excess - forward
+        self.entries = deque(
+            itertools.islice(self.entries, dropped, None), maxlen=limit
+        )
+        self.position -= dropped
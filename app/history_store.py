@@ -0,0 +1,305 @@
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+from typing import TypedDict
+
+import aiosqlite
+
+HISTORY_DB_PATH = os.environ.get("TAVIAD_HISTORY_DB", "taviad_history.db")
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH_SIZE = 500
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    last_visit REAL NOT NULL DEFAULT 0,
+    UNIQUE (profile, url)
+);
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    url_id INTEGER NOT NULL REFERENCES urls (id),
+    visited_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_profile_time ON visits (profile, visited_at);
+CREATE TABLE IF NOT EXISTS load_times (
+    profile TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    last_load REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile, domain, bucket)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS urls_fts USING fts5 (
+    url, title, content = 'urls', content_rowid = 'id'
+);
+CREATE TRIGGER IF NOT EXISTS urls_fts_insert AFTER INSERT ON urls BEGIN
+    INSERT INTO urls_fts (rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS urls_fts_update AFTER UPDATE OF title ON urls
+WHEN old.title != new.title BEGIN
+    INSERT INTO urls_fts (urls_fts, rowid, url, title)
+    VALUES ('delete', old.id, old.url, old.title);
+    INSERT INTO urls_fts (rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+"""
+
+UPSERT_URL = """
+INSERT INTO urls (profile, url, title, visit_count, last_visit)
+VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (profile, url) DO UPDATE SET
+    title = excluded.title,
+    visit_count = visit_count + 1,
+    last_visit = max(last_visit, excluded.last_visit)
+"""
+
+INSERT_VISIT = """
+INSERT INTO visits (profile, url_id, visited_at)
+SELECT profile, id, ? FROM urls WHERE profile = ? AND url = ?
+"""
+
+UPSERT_LOAD_TIME = """
+INSERT INTO load_times (profile, domain, bucket, count, last_load)
+VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (profile, domain, bucket) DO UPDATE SET
+    count = count + 1,
+    last_load = max(last_load, excluded.last_load)
+"""
+
+SEARCH = """
+SELECT urls.url, urls.title, urls.visit_count, urls.last_visit
+FROM urls_fts JOIN urls ON urls.id = urls_fts.rowid
+WHERE urls_fts MATCH ? AND urls.profile = ?
+ORDER BY urls.last_visit DESC
+LIMIT ?
+"""
+
+TOP_URLS = """
+SELECT url, title, visit_count, last_visit
+FROM urls
+WHERE profile = ?
+ORDER BY last_visit DESC
+LIMIT ?
+"""
+
+HOST_VISIT_COUNTS = """
+SELECT
+    CASE WHEN instr(rest, '/') THEN substr(rest, 1, instr(rest, '/') - 1)
+    ELSE rest END AS host,
+    sum(visit_count)
+FROM (
+    SELECT substr(url, instr(url, '://') + 3) AS rest, visit_count
+    FROM urls
+    WHERE profile = ?
+)
+GROUP BY host
+"""
+
+LOAD_TIMES = """
+SELECT domain, bucket, count, max(last_load) OVER (PARTITION BY domain) AS seen
+FROM load_times
+WHERE profile = ?
+ORDER BY seen, domain
+"""
+
+RECENT = """
+SELECT urls.url, urls.title, urls.visit_count, visits.visited_at
+FROM visits JOIN urls ON urls.id = visits.url_id
+WHERE visits.profile = ? AND visits.visited_at < ?
+ORDER BY visits.visited_at DESC
+LIMIT ?
+"""
+
+_TOKEN_RE = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryEntry(TypedDict):
+    url: str
+    title: str
+    visit_count: int
+    last_visit: float
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._pending: list[tuple[str, str, str, float]] = []
+        self._pending_loads: list[tuple[str, str, int, float]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._conn: aiosqlite.Connection | None = None
+        self._reader: aiosqlite.Connection | None = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            conn = await aiosqlite.connect(self.path)
+            await conn.executescript(SCHEMA)
+            await conn.commit()
+            if self._conn is None:
+                self._conn = conn
+            else:
+                await conn.close()
+        return self._conn
+
+    async def _connect_reader(self) -> aiosqlite.Connection:
+        if self._reader is None:
+            await self._connect()
+            conn = await aiosqlite.connect(self.path)
+            await conn.execute("PRAGMA query_only = ON")
+            if self._reader is None:
+                self._reader = conn
+            else:
+                await conn.close()
+        return self._reader
+
+    def record(self, profile: str, url: str, title: str, visited_at: float = 0.0):
+        if not url or url == "about:blank":
+            return
+        self._pending.append((profile, url, title, visited_at or time.time()))
+        self._schedule_flush()
+
+    def record_load_time(
+        self, profile: str, domain: str, bucket: int, loaded_at: float = 0.0
+    ):
+        if not domain:
+            return
+        self._pending_loads.append((profile, domain, bucket, loaded_at or time.time()))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if len(self._pending) + len(self._pending_loads) >= FLUSH_BATCH_SIZE:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_handle = None
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                FLUSH_INTERVAL, self._start_flush
+            )
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Could not write history", exc_info=task.exception())
+
+    async def flush(self):
+        self._flush_handle = None
+        async with self._flush_lock:
+            if not self._pending and not self._pending_loads:
+                return
+            batch, self._pending = self._pending, []
+            loads, self._pending_loads = self._pending_loads, []
+            try:
+                await self._write(batch, loads)
+            except (sqlite3.Error, OSError):
+                logger.exception(
+                    "Dropped %d history visits and %d page loads",
+                    len(batch),
+                    len(loads),
+                )
+                if self._conn is not None:
+                    await self._conn.rollback()
+
+    async def _write(
+        self,
+        batch: list[tuple[str, str, str, float]],
+        loads: list[tuple[str, str, int, float]],
+    ):
+        conn = await self._connect()
+        await conn.executemany(UPSERT_URL, batch)
+        await conn.executemany(
+            INSERT_VISIT,
+            [(visited_at, profile, url) for profile, url, _, visited_at in batch],
+        )
+        await conn.executemany(UPSERT_LOAD_TIME, loads)
+        await conn.commit()
+
+    async def import_visits(self, profile: str, visits: list[tuple[str, str, float]]):
+        batch = [(profile, url, title, visited_at) for url, title, visited_at in visits]
+        async with self._flush_lock:
+            await self._write(batch, [])
+
+    async def search(
+        self, profile: str, query: str, limit: int = 50
+    ) -> list[HistoryEntry]:
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens:
+            return []
+        conn = await self._connect_reader()
+        match = " ".join(f'"{token}"*' for token in tokens)
+        async with conn.execute(SEARCH, (match, profile, limit)) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {"url": url, "title": title, "visit_count": count, "last_visit": last}
+            for url, title, count, last in rows
+        ]
+
+    async def top_urls(self, profile: str, limit: int) -> list[HistoryEntry]:
+        conn = await self._connect_reader()
+        async with conn.execute(TOP_URLS, (profile, limit)) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {"url": url, "title": title, "visit_count": count, "last_visit": last}
+            for url, title, count, last in rows
+        ]
+
+    async def host_visit_counts(self, profile: str) -> list[tuple[str, int]]:
+        conn = await self._connect_reader()
+        async with conn.execute(HOST_VISIT_COUNTS, (profile,)) as cursor:
+            return list(await cursor.fetchall())
+
+    async def load_times(self, profile: str) -> list[tuple[str, int, int]]:
+        conn = await self._connect_reader()
+        async with conn.execute(LOAD_TIMES, (profile,)) as cursor:
+            rows = await cursor.fetchall()
+        return [(domain, bucket, count) for domain, bucket, count, _ in rows]
+
+    async def recent(
+        self, profile: str, before: float = math.inf, limit: int = 50
+    ) -> list[HistoryEntry]:
+        conn = await self._connect_reader()
+        async with conn.execute(RECENT, (profile, before, limit)) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {"url": url, "title": title, "visit_count": count, "last_visit": last}
+            for url, title, count, last in rows
+        ]
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+        for conn in (self._reader, self._conn):
+            if conn is not None:
+                await conn.close()
+        self._reader = self._conn = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            await self.close()
+
+
+history_store = HistoryStore(HISTORY_DB_PATH)
@@ -0,0 +1,56 @@
+import reflex as rx
+from reflex.components.base.fragment import Fragment
+from reflex.utils import imports
+from reflex.vars.base import Var
+
+_HOTKEY_HOOK = """
+useEffect(() => {
+    const hotkeys = new Set(%s);
+    const handle_hotkey = %s;
+    const handle_key = (event) => {
+        const key = event.key.length === 1 ? event.key.toLowerCase() : event.key;
+        const combo = [
+            event.ctrlKey || event.metaKey ? "Mod" : "",
+            event.altKey ? "Alt" : "",
+            event.shiftKey ? "Shift" : "",
+            key,
+        ].filter(Boolean).join("+");
+        if (!hotkeys.has(combo)) {
+            return;
+        }
+        event.preventDefault();
+        window.taviadTabSwitchStart = performance.now();
+        handle_hotkey(combo);
+    };
+    document.addEventListener("keydown", handle_key, false);
+    return () => {
+        document.removeEventListener("keydown", handle_key, false);
+    }
+})
+"""
+
+
+class HotkeyWatcher(Fragment):
+    hotkeys: Var[list[str]]
+
+    on_hotkey: rx.EventHandler[lambda combo: [combo]]
+
+    @classmethod
+    def create(cls, hotkeys: list[str], on_hotkey: rx.EventHandler) -> "HotkeyWatcher":
+        return super().create(hotkeys=hotkeys, on_hotkey=on_hotkey)
+
+    def add_imports(self) -> imports.ImportDict:
+        return {"react": [imports.ImportVar(tag="useEffect")]}
+
+    def add_hooks(self) -> list[str | Var]:
+        return [
+            _HOTKEY_HOOK
+            % (str(self.hotkeys), str(Var.create(self.event_triggers["on_hotkey"])))
+        ]
+
+    def render(self) -> dict:
+        return {"name": "Fragment", "contents": "", "children": [], "props": {}}
+
+
+def hotkey_watcher(hotkeys: list[str], on_hotkey: rx.EventHandler) -> HotkeyWatcher:
+    return HotkeyWatcher.create(hotkeys=hotkeys, on_hotkey=on_hotkey)
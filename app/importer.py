@@ -0,0 +1,214 @@
+import asyncio
+import contextlib
+import os
+import sqlite3
+from collections.abc import AsyncIterator
+from html.parser import HTMLParser
+from typing import TypedDict
+from urllib.parse import quote
+
+import aiosqlite
+
+from app.urls import is_navigable
+
+IMPORT_BATCH_SIZE = 2000
+HTML_CHUNK_SIZE = 64 * 1024
+CHROME_EPOCH_OFFSET = 11_644_473_600
+
+CHROME_COUNT_VISITS = "SELECT count(*) FROM visits"
+CHROME_VISITS = """
+SELECT urls.url, urls.title, visits.visit_time
+FROM visits JOIN urls ON urls.id = visits.url
+ORDER BY visits.id
+"""
+
+FIREFOX_COUNT_VISITS = "SELECT count(*) FROM moz_historyvisits"
+FIREFOX_VISITS = """
+SELECT moz_places.url, moz_places.title, moz_historyvisits.visit_date
+FROM moz_historyvisits JOIN moz_places ON moz_places.id = moz_historyvisits.place_id
+ORDER BY moz_historyvisits.id
+"""
+FIREFOX_BOOKMARKS = """
+WITH RECURSIVE tree (id, depth) AS (
+    SELECT id, 0 FROM moz_bookmarks
+    WHERE parent IN (SELECT id FROM moz_bookmarks WHERE parent = 0)
+    AND guid != 'tags________'
+    UNION ALL
+    SELECT moz_bookmarks.id, tree.depth + 1
+    FROM moz_bookmarks JOIN tree ON moz_bookmarks.parent = tree.id
+)
+SELECT moz_bookmarks.id, moz_bookmarks.parent, moz_bookmarks.type,
+    coalesce(moz_bookmarks.title, ''), coalesce(moz_places.url, '')
+FROM tree
+JOIN moz_bookmarks ON moz_bookmarks.id = tree.id
+LEFT JOIN moz_places ON moz_places.id = moz_bookmarks.fk
+WHERE moz_bookmarks.type IN (1, 2)
+ORDER BY tree.depth, moz_bookmarks.parent, moz_bookmarks.position
+"""
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+class ImportedBookmark(TypedDict):
+    key: str
+    parent: str
+    title: str
+    url: str
+
+
+Visit = tuple[str, str, float]
+
+
+def detect_format(path: str) -> str:
+    with open(path, "rb") as file:
+        header = file.read(512)
+    if header.startswith(b"SQLite format 3\x00"):
+        try:
+            with sqlite3.connect(_readonly_uri(path), uri=True) as conn:
+                tables = {
+                    name
+                    for (name,) in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    )
+                }
+        except sqlite3.DatabaseError as e:
+            raise ImportFormatError(f"Unreadable database: {e}") from e
+        if {"urls", "visits"} <= tables:
+            return "chrome"
+        if {"moz_places", "moz_historyvisits"} <= tables:
+            return "firefox"
+    elif b"netscape-bookmark-file" in header.lower():
+        return "netscape"
+    raise ImportFormatError(
+        "Not a Chrome History, Firefox places.sqlite or bookmarks file"
+    )
+
+
+def _readonly_uri(path: str) -> str:
+    return f"file:{quote(os.path.abspath(path))}?mode=ro&immutable=1"
+
+
+async def count_visits(path: str, source: str) -> int:
+    query = {"chrome": CHROME_COUNT_VISITS, "firefox": FIREFOX_COUNT_VISITS}
+    if source not in query:
+        return 0
+    async with aiosqlite.connect(_readonly_uri(path), uri=True) as conn:
+        async with conn.execute(query[source]) as cursor:
+            (count,) = await cursor.fetchone()
+    return count
+
+
+async def _fetch_batches(path: str, query: str) -> AsyncIterator[list[tuple]]:
+    async with aiosqlite.connect(_readonly_uri(path), uri=True) as conn:
+        async with conn.execute(query) as cursor:
+            while rows := await cursor.fetchmany(IMPORT_BATCH_SIZE):
+                yield rows
+
+
+async def read_visits(path: str, source: str) -> AsyncIterator[list[Visit]]:
+    if source == "chrome":
+        query, offset = CHROME_VISITS, CHROME_EPOCH_OFFSET
+    elif source == "firefox":
+        query, offset = FIREFOX_VISITS, 0
+    else:
+        return
+    async with contextlib.aclosing(_fetch_batches(path, query)) as batches:
+        async for rows in batches:
+            yield [
+                (url, title or "", at / 1_000_000 - offset)
+                for url, title, at in rows
+                if is_navigable(url)
+            ]
+
+
+class _NetscapeParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.items: list[ImportedBookmark] = []
+        self._folders = [""]
+        self._pending_folder: str | None = None
+        self._next_key = 0
+        self._text: list[str] | None = None
+        self._href = ""
+
+    def _key(self) -> str:
+        self._next_key += 1
+        return str(self._next_key)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("h3", "a"):
+            self._text = []
+            self._href = (dict(attrs).get("href") or "") if tag == "a" else ""
+        elif tag == "dl" and self._pending_folder is not None:
+            self._folders.append(self._pending_folder)
+            self._pending_folder = None
+
+    def handle_endtag(self, tag):
+        if tag in ("h3", "a") and self._text is not None:
+            title = "".join(self._text).strip()
+            self._text = None
+            if tag == "h3":
+                self._pending_folder = self._key()
+                self.items.append(
+                    {
+                        "key": self._pending_folder,
+                        "parent": self._folders[-1],
+                        "title": title,
+                        "url": "",
+                    }
+                )
+            elif is_navigable(self._href):
+                self.items.append(
+                    {
+                        "key": self._key(),
+                        "parent": self._folders[-1],
+                        "title": title or self._href,
+                        "url": self._href,
+                    }
+                )
+        elif tag == "dl" and len(self._folders) > 1:
+            self._folders.pop()
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def feed_chunk(self, chunk: str) -> list[ImportedBookmark]:
+        self.feed(chunk)
+        items, self.items = self.items, []
+        return items
+
+
+async def read_bookmarks(
+    path: str, source: str
+) -> AsyncIterator[list[ImportedBookmark]]:
+    if source == "firefox":
+        async with contextlib.aclosing(
+            _fetch_batches(path, FIREFOX_BOOKMARKS)
+        ) as batches:
+            async for rows in batches:
+                yield [
+                    {
+                        "key": str(node_id),
+                        "parent": str(parent),
+                        "title": title or url or "Untitled",
+                        "url": url if kind == 1 else "",
+                    }
+                    for node_id, parent, kind, title, url in rows
+                    if kind == 2 or is_navigable(url)
+                ]
+    elif source == "netscape":
+        parser = _NetscapeParser()
+        file = await asyncio.to_thread(open, path, encoding="utf-8", errors="replace")
+        try:
+            while chunk := await asyncio.to_thread(file.read, HTML_CHUNK_SIZE):
+                items = await asyncio.to_thread(parser.feed_chunk, chunk)
+                if items:
+                    yield items
+        finally:
+            await asyncio.to_thread(file.close)
+        await asyncio.to_thread(parser.close)
+        if parser.items:
+            yield parser.items
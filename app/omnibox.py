@@ -0,0 +1,183 @@
+import bisect
+import heapq
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import TypedDict
+
+from app.history_store import history_store
+
+HALF_LIFE = 7 * 24 * 60 * 60
+BOOKMARK_BONUS = 4.0
+MAX_SUGGESTIONS = 8
+MAX_LOADED_PROFILES = 1000
+SEED_LIMIT = 5000
+
+
+class Suggestion(TypedDict):
+    url: str
+    title: str
+    bookmarked: bool
+
+
+def _strip_url(url: str) -> str:
+    key = url.lower()
+    for prefix in ("https://", "http://"):
+        if key.startswith(prefix):
+            key = key[len(prefix) :]
+            break
+    if key.startswith("www."):
+        key = key[4:]
+    return key
+
+
+def _prefix_end(prefix: str) -> str:
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _rank(count: float, at: float) -> float:
+    return math.log2(count) + at / HALF_LIFE
+
+
+class _Entry:
+    __slots__ = ("title", "rank", "bookmarked")
+
+    def __init__(self, title: str):
+        self.title = title
+        self.rank = -math.inf
+        self.bookmarked = False
+
+    def decayed_score(self, now: float) -> float:
+        if self.rank == -math.inf:
+            return 0.0
+        return 2.0 ** (self.rank - now / HALF_LIFE)
+
+    def frecency(self, now: float) -> float:
+        bonus = BOOKMARK_BONUS if self.bookmarked else 0.0
+        return self.decayed_score(now) + bonus
+
+    def sort_key(self, bonus_rank: float) -> float:
+        if not self.bookmarked:
+            return self.rank
+        high, low = max(self.rank, bonus_rank), min(self.rank, bonus_rank)
+        return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._keys: list[tuple[str, str]] = []
+        self._entries: dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert_key(self, key: str, url: str):
+        item = (key, url)
+        position = bisect.bisect_left(self._keys, item)
+        if position == len(self._keys) or self._keys[position] != item:
+            self._keys.insert(position, item)
+
+    def _remove_key(self, key: str, url: str):
+        item = (key, url)
+        position = bisect.bisect_left(self._keys, item)
+        if position < len(self._keys) and self._keys[position] == item:
+            del self._keys[position]
+
+    def _entry(self, url: str, title: str) -> _Entry:
+        entry = self._entries.get(url)
+        if entry is None:
+            entry = self._entries[url] = _Entry(title)
+            self._insert_key(_strip_url(url), url)
+            if title:
+                self._insert_key(title.lower(), url)
+        elif title and title != entry.title:
+            if entry.title:
+                self._remove_key(entry.title.lower(), url)
+            entry.title = title
+            self._insert_key(title.lower(), url)
+        return entry
+
+    def _drop_if_unused(self, url: str):
+        entry = self._entries.get(url)
+        if entry is None or entry.bookmarked or entry.rank > -math.inf:
+            return
+        del self._entries[url]
+        self._remove_key(_strip_url(url), url)
+        if entry.title:
+            self._remove_key(entry.title.lower(), url)
+
+    def seed(self, url: str, title: str, visit_count: int, last_visit: float):
+        entry = self._entry(url, title)
+        entry.rank = max(entry.rank, _rank(max(visit_count, 1), last_visit))
+
+    def visit(self, url: str, title: str, at: float | None = None):
+        at = time.time() if at is None else at
+        entry = self._entry(url, title)
+        entry.rank = _rank(entry.decayed_score(at) + 1.0, at)
+
+    def set_bookmarked(self, url: str, title: str, bookmarked: bool):
+        if bookmarked:
+            self._entry(url, title).bookmarked = True
+        elif url in self._entries:
+            self._entries[url].bookmarked = False
+            self._drop_if_unused(url)
+
+    def suggest(
+        self, text: str, limit: int = MAX_SUGGESTIONS, now: float | None = None
+    ) -> list[Suggestion]:
+        prefix = text.strip().lower()
+        if not prefix:
+            return []
+        now = time.time() if now is None else now
+        urls: dict[str, None] = {}
+        for stripped in {prefix, _strip_url(prefix)}:
+            if not stripped:
+                continue
+            start = bisect.bisect_left(self._keys, (stripped,))
+            stop = bisect.bisect_left(self._keys, (_prefix_end(stripped),), start)
+            urls.update(dict.fromkeys(url for _, url in self._keys[start:stop]))
+        bonus_rank = _rank(BOOKMARK_BONUS, now)
+        entries = self._entries
+        ranked = heapq.nlargest(
+            limit, urls, key=lambda url: entries[url].sort_key(bonus_rank)
+        )
+        return [
+            {
+                "url": url,
+                "title": entries[url].title,
+                "bookmarked": entries[url].bookmarked,
+            }
+            for url in ranked
+        ]
+
+
+_indexes: "OrderedDict[str, SuggestionIndex]" = OrderedDict()
+
+
+def get_loaded_index(profile: str) -> SuggestionIndex | None:
+    return _indexes.get(profile)
+
+
+def invalidate_index(profile: str):
+    _indexes.pop(profile, None)
+
+
+async def load_index(profile: str, bookmarks: Iterable[dict]) -> SuggestionIndex:
+    index = _indexes.get(profile)
+    if index is not None:
+        _indexes.move_to_end(profile)
+        return index
+    index = SuggestionIndex()
+    for entry in await history_store.top_urls(profile, SEED_LIMIT):
+        index.seed(
+            entry["url"], entry["title"], entry["visit_count"], entry["last_visit"]
+        )
+    for bookmark in bookmarks:
+        index.set_bookmarked(bookmark["url"], bookmark["title"], True)
+    if profile in _indexes:
+        return _indexes[profile]
+    _indexes[profile] = index
+    while len(_indexes) > MAX_LOADED_PROFILES:
+        _indexes.popitem(last=False)
+    return index
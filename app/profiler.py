@@ -0,0 +1,162 @@
+import contextlib
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import TypedDict
+
+from reflex.event import Event
+from reflex.middleware import Middleware
+from reflex.state import BaseState, StateUpdate
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("TAVIAD_PROFILE_SAMPLE_RATE", "0.05"))
+PROFILE_RING_SIZE = 256
+_MAX_PENDING_SAMPLES = 1024
+
+
+class HandlerSummary(TypedDict):
+    name: str
+    calls: int
+    samples: int
+    p50_ms: float
+    p99_ms: float
+    delta_bytes: int
+    state_bytes: int
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _mean(values) -> int:
+    return round(sum(values) / len(values)) if values else 0
+
+
+class HandlerProfile:
+    __slots__ = ("calls", "wall_ms", "delta_bytes", "state_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_ms: deque[float] = deque(maxlen=PROFILE_RING_SIZE)
+        self.delta_bytes: deque[int] = deque(maxlen=PROFILE_RING_SIZE)
+        self.state_bytes: deque[int] = deque(maxlen=PROFILE_RING_SIZE)
+
+    def summary(self, name: str) -> HandlerSummary:
+        wall_ms = list(self.wall_ms)
+        return {
+            "name": name,
+            "calls": self.calls,
+            "samples": len(wall_ms),
+            "p50_ms": round(_percentile(wall_ms, 50), 2),
+            "p99_ms": round(_percentile(wall_ms, 99), 2),
+            "delta_bytes": _mean(self.delta_bytes),
+            "state_bytes": _mean(self.state_bytes),
+        }
+
+
+class Profiler:
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self.started_at = time.time()
+        self.handlers: dict[str, HandlerProfile] = {}
+        self.recomputes: Counter[str] = Counter()
+        self.background_tasks = 0
+        self.peak_background_tasks = 0
+
+    def _handler(self, name: str) -> HandlerProfile:
+        profile = self.handlers.get(name)
+        if profile is None:
+            profile = self.handlers[name] = HandlerProfile()
+        return profile
+
+    def sampled(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def call(self, name: str):
+        self._handler(name).calls += 1
+
+    def record(
+        self,
+        name: str,
+        wall_ms: float,
+        delta_bytes: int | None = None,
+        state_bytes: int | None = None,
+    ):
+        profile = self._handler(name)
+        profile.wall_ms.append(wall_ms)
+        if delta_bytes is not None:
+            profile.delta_bytes.append(delta_bytes)
+        if state_bytes is not None:
+            profile.state_bytes.append(state_bytes)
+
+    def recompute(self, name: str):
+        self.recomputes[name] += 1
+
+    def set_background_tasks(self, count: int):
+        self.background_tasks = count
+        self.peak_background_tasks = max(self.peak_background_tasks, count)
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        self.call(name)
+        if not self.sampled():
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started_at),
+            "sample_rate": self.sample_rate,
+            "handlers": sorted(
+                (profile.summary(name) for name, profile in self.handlers.items()),
+                key=lambda row: row["calls"],
+                reverse=True,
+            ),
+            "recomputes": dict(self.recomputes.most_common()),
+            "background_tasks": self.background_tasks,
+            "peak_background_tasks": self.peak_background_tasks,
+        }
+
+
+class ProfilingMiddleware(Middleware):
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+        self._started: dict[int, float] = {}
+
+    async def preprocess(self, app, state: BaseState, event: Event) -> None:
+        self.profiler.call(event.name.rpartition(".")[2])
+        self.profiler.set_background_tasks(len(app._background_tasks))
+        if self.profiler.sampled():
+            if len(self._started) >= _MAX_PENDING_SAMPLES:
+                del self._started[next(iter(self._started))]
+            self._started[id(event)] = time.perf_counter()
+
+    async def postprocess(
+        self, app, state: BaseState, event: Event, update: StateUpdate
+    ) -> StateUpdate:
+        started = self._started.pop(id(event), None)
+        if started is None:
+            return update
+        wall_ms = (time.perf_counter() - started) * 1000
+        substate, _ = state._get_event_handler(event)
+        self.profiler.record(
+            event.name.rpartition(".")[2],
+            wall_ms,
+            delta_bytes=len(update.json()),
+            state_bytes=len(substate._serialize()),
+        )
+        if not update.final:
+            self._started[id(event)] = time.perf_counter()
+        return update
+
+
+profiler = Profiler(PROFILE_SAMPLE_RATE)
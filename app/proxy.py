@@ -0,0 +1,585 @@
+import asyncio
+import contextlib
+import email.utils
+import functools
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import re
+import secrets
+import socket
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+PROXY_PATH = "/_proxy"
+PROXY_CACHE_DIR = os.environ.get("TAVIAD_PROXY_CACHE_DIR", "proxy_cache")
+PROXY_CACHE_SIZE = int(os.environ.get("TAVIAD_PROXY_CACHE_SIZE", str(256 * 2**20)))
+PROXY_ALLOW_PRIVATE = os.environ.get("TAVIAD_PROXY_ALLOW_PRIVATE", "") == "1"
+PROXY_TOKEN_COOKIE = "taviad_proxy_token"
+PROXY_SANDBOX_FLAGS = "allow-scripts allow-forms"
+MAX_BODY_SIZE = 32 * 2**20
+MAX_REDIRECTS = 10
+HEURISTIC_FRESHNESS_LIMIT = 24 * 60 * 60
+PREFETCH_REUSE_WINDOW = 60.0
+PREFETCH_MEMORY = 512
+USER_AGENT = "Mozilla/5.0 (compatible; TaviadSurf)"
+
+_DROPPED_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+        "content-encoding",
+        "content-length",
+        "set-cookie",
+        "strict-transport-security",
+        "x-frame-options",
+    }
+)
+_FRAME_ANCESTORS_RE = re.compile(r"frame-ancestors[^;]*;?\s*", re.IGNORECASE)
+_HEAD_RE = re.compile(rb"<head[^>]*>", re.IGNORECASE)
+
+
+class ProxyError(Exception):
+    pass
+
+
+class PrivateAddressError(ProxyError):
+    pass
+
+
+def _cache_control(headers: dict[str, str]) -> dict[str, str]:
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _freshness_lifetime(headers: dict[str, str]) -> float:
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in directives:
+            try:
+                return max(0, int(directives[directive]))
+            except ValueError:
+                return 0
+    date = _http_date(headers.get("date")) or time.time()
+    if "expires" in headers:
+        expires = _http_date(headers["expires"])
+        return max(0, expires - date) if expires is not None else 0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(max(0, date - last_modified) / 10, HEURISTIC_FRESHNESS_LIMIT)
+    return 0
+
+
+def _is_cacheable(status: int, headers: dict[str, str], size: int) -> bool:
+    directives = _cache_control(headers)
+    vary = headers.get("vary", "").lower().replace(" ", "")
+    return (
+        status == 200
+        and "no-store" not in directives
+        and "private" not in directives
+        and vary in ("", "accept-encoding")
+        and size <= PROXY_CACHE_SIZE // 8
+    )
+
+
+def _frameable_headers(headers: httpx.Headers) -> dict[str, str]:
+    kept = {}
+    for name, value in headers.items():
+        name = name.lower()
+        if name in _DROPPED_HEADERS:
+            continue
+        if name == "content-security-policy":
+            value = _FRAME_ANCESTORS_RE.sub("", value).strip()
+            if not value:
+                continue
+        kept[name] = value
+    return kept
+
+
+def _is_private_address(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return (
+        address.is_private
+        or address.is_loopback
+        or address.is_link_local
+        or address.is_multicast
+        or address.is_reserved
+        or address.is_unspecified
+    )
+
+
+def _ip_literal(host: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address | None:
+    try:
+        return ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    try:
+        return ipaddress.IPv4Address(socket.inet_aton(host))
+    except OSError:
+        return None
+
+
+def _is_private_host(host: str) -> bool:
+    if host == "localhost" or host.endswith(".localhost"):
+        return True
+    address = _ip_literal(host)
+    return address is not None and _is_private_address(address)
+
+
+def is_proxyable(url: str) -> bool:
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+    except ValueError:
+        return False
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    return PROXY_ALLOW_PRIVATE or not _is_private_host(host)
+
+
+async def _resolve(host: str) -> list[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, None, type=socket.SOCK_STREAM
+    )
+    return [info[4][0] for info in infos]
+
+
+async def _public_addresses(host: str) -> list[str]:
+    if not PROXY_ALLOW_PRIVATE and _is_private_host(host):
+        raise PrivateAddressError("Refusing to proxy a private address.")
+    literal = _ip_literal(host)
+    if literal is not None:
+        return [str(literal)]
+    addresses = list(dict.fromkeys(await _resolve(host)))
+    if not PROXY_ALLOW_PRIVATE:
+        for address in addresses:
+            if _is_private_address(ipaddress.ip_address(address.partition("%")[0])):
+                raise PrivateAddressError("Refusing to proxy a private address.")
+    return addresses
+
+
+async def check_public(url: str):
+    if not is_proxyable(url):
+        raise PrivateAddressError("Refusing to proxy a private address.")
+    if PROXY_ALLOW_PRIVATE:
+        return
+    host = urlsplit(url).hostname
+    try:
+        await _public_addresses(host)
+    except (OSError, ValueError) as e:
+        raise httpx.ConnectError(f"Could not resolve {host}") from e
+
+
+class _PublicNetworkBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self):
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options=None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await _public_addresses(host)
+        except (OSError, ValueError) as e:
+            raise httpcore.ConnectError(f"Could not resolve {host}") from e
+        error = httpcore.ConnectError(f"Could not resolve {host}")
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout, local_address, socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+def public_transport(limits: httpx.Limits) -> httpx.AsyncHTTPTransport:
+    transport = httpx.AsyncHTTPTransport(limits=limits)
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(),
+        max_connections=limits.max_connections,
+        max_keepalive_connections=limits.max_keepalive_connections,
+        keepalive_expiry=limits.keepalive_expiry,
+        network_backend=_PublicNetworkBackend(),
+    )
+    return transport
+
+
+@contextlib.asynccontextmanager
+async def open_public(
+    client: httpx.AsyncClient, url: str, headers: dict[str, str] | None = None
+):
+    request = client.build_request("GET", url, headers=headers)
+    for _ in range(MAX_REDIRECTS + 1):
+        await check_public(str(request.url))
+        response = await client.send(request, stream=True)
+        if response.next_request is None:
+            break
+        await response.aclose()
+        request = response.next_request
+    else:
+        raise httpx.TooManyRedirects("Too many redirects", request=request)
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+@functools.cache
+def _proxy_secret() -> bytes:
+    secret = os.environ.get("TAVIAD_PROXY_SECRET", "")
+    if secret:
+        return secret.encode()
+    os.makedirs(PROXY_CACHE_DIR, exist_ok=True)
+    path = os.path.join(PROXY_CACHE_DIR, "secret")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(secrets.token_bytes(32))
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temp_path)
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def proxy_token(profile: str) -> str:
+    mac = hmac.new(_proxy_secret(), profile.encode(), hashlib.sha256).hexdigest()
+    return f"{profile}.{mac}"
+
+
+def has_proxy_access(token: str) -> bool:
+    profile = token.rpartition(".")[0]
+    return bool(profile) and hmac.compare_digest(
+        proxy_token(profile).encode(), token.encode()
+    )
+
+
+class CachedResponse:
+    __slots__ = ("url", "status", "headers", "body", "stored_at")
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        headers: dict[str, str],
+        body: bytes,
+        stored_at: float,
+    ):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.stored_at < _freshness_lifetime(self.headers)
+
+    def validators(self) -> dict[str, str]:
+        validators = {}
+        if "etag" in self.headers:
+            validators["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            validators["If-Modified-Since"] = self.headers["last-modified"]
+        return validators
+
+    def encode(self) -> bytes:
+        meta = [self.url, self.status, self.headers, self.stored_at]
+        return json.dumps(meta, separators=(",", ":")).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        url, status, headers, stored_at = json.loads(meta)
+        return cls(url, status, headers, body, stored_at)
+
+
+def _read_entry(path: str) -> bytes:
+    with open(path, "rb") as file:
+        data = file.read()
+    os.utime(path)
+    return data
+
+
+def _write_entry(path: str, data: bytes):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _remove_entries(paths: list[str]):
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _scan_entries(directory: str) -> list[tuple[str, int]]:
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".entry"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name[:-6], stat.st_size))
+    entries.sort()
+    return [(key, size) for _, key, size in entries]
+
+
+class ProxyCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._index: OrderedDict[str, int] | None = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.entry")
+
+    async def _load_index(self) -> OrderedDict[str, int]:
+        if self._index is None:
+            entries = await asyncio.to_thread(_scan_entries, self.directory)
+            if self._index is None:
+                self._index = OrderedDict(entries)
+                self.size = sum(self._index.values())
+        return self._index
+
+    async def get(self, key: str) -> CachedResponse | None:
+        index = await self._load_index()
+        if key not in index:
+            return None
+        try:
+            data = await asyncio.to_thread(_read_entry, self._path(key))
+            entry = CachedResponse.decode(data)
+        except (OSError, ValueError):
+            self.size -= index.pop(key, 0)
+            return None
+        index.move_to_end(key)
+        return entry
+
+    async def put(self, key: str, entry: CachedResponse):
+        index = await self._load_index()
+        data = entry.encode()
+        await asyncio.to_thread(_write_entry, self._path(key), data)
+        self.size += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        evicted = []
+        while self.size > self.max_bytes and len(index) > 1:
+            old_key, old_size = index.popitem(last=False)
+            self.size -= old_size
+            evicted.append(self._path(old_key))
+        if evicted:
+            await asyncio.to_thread(_remove_entries, evicted)
+
+
+class CachingProxy:
+    def __init__(self, cache: ProxyCache):
+        self.cache = cache
+        self._client: httpx.AsyncClient | None = None
+        self._inflight: dict[
+            str, tuple[asyncio.Task[tuple[CachedResponse, str]], int]
+        ] = {}
+        self._prefetched: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.prefetches = 0
+        self.prefetches_used = 0
+        self.ttfb_saved_ms = 0.0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                timeout=httpx.Timeout(15.0, read=30.0),
+                transport=public_transport(
+                    httpx.Limits(
+                        max_connections=100,
+                        max_keepalive_connections=32,
+                        keepalive_expiry=60.0,
+                    )
+                ),
+            )
+        return self._client
+
+    async def fetch(
+        self, url: str, max_size: int = MAX_BODY_SIZE
+    ) -> tuple[CachedResponse, str]:
+        inflight = self._inflight.get(url)
+        if inflight is not None:
+            task, limit = inflight
+            try:
+                return await asyncio.shield(task)
+            except ProxyError:
+                if limit >= max_size:
+                    raise
+        task = asyncio.create_task(self._fetch(url, max_size))
+        if url not in self._inflight:
+            self._inflight[url] = task, max_size
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def prefetch(self, url: str, max_size: int) -> int:
+        if not is_proxyable(url):
+            return 0
+        started = time.perf_counter()
+        try:
+            entry, cache_status = await self.fetch(url, max_size)
+        except PrivateAddressError:
+            return 0
+        except ProxyError:
+            return max_size
+        except httpx.HTTPError:
+            return 0
+        if cache_status == "HIT":
+            return 0
+        self.prefetches += 1
+        self._prefetched[url] = (time.perf_counter() - started) * 1000, time.time()
+        while len(self._prefetched) > PREFETCH_MEMORY:
+            self._prefetched.popitem(last=False)
+        return len(entry.body)
+
+    def _recently_prefetched(self, url: str, now: float) -> bool:
+        prefetched = self._prefetched.get(url)
+        return prefetched is not None and now - prefetched[1] < PREFETCH_REUSE_WINDOW
+
+    def record_served(self, url: str, served_ms: float):
+        prefetched = self._prefetched.pop(url, None)
+        if prefetched is not None:
+            self.prefetches_used += 1
+            self.ttfb_saved_ms += max(0.0, prefetched[0] - served_ms)
+
+    def prefetch_stats(self) -> dict:
+        used = self.prefetches_used
+        return {
+            "prefetches": self.prefetches,
+            "used": used,
+            "ttfb_saved_ms": round(self.ttfb_saved_ms),
+            "mean_ttfb_saved_ms": round(self.ttfb_saved_ms / used, 1) if used else 0,
+        }
+
+    async def _fetch(self, url: str, max_size: int) -> tuple[CachedResponse, str]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        cached = await self.cache.get(key)
+        now = time.time()
+        if cached is not None and (
+            cached.is_fresh(now) or self._recently_prefetched(url, now)
+        ):
+            return cached, "HIT"
+        headers = cached.validators() if cached is not None else {}
+        try:
+            async with open_public(self._get_client(), url, headers) as response:
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > max_size:
+                        raise ProxyError("Response is too large to proxy")
+        except httpx.HTTPError:
+            if cached is None:
+                raise
+            return cached, "STALE"
+        if response.status_code == 304 and cached is not None:
+            cached.headers.update(_frameable_headers(response.headers))
+            cached.stored_at = now
+            await self.cache.put(key, cached)
+            return cached, "REVALIDATED"
+        entry = CachedResponse(
+            str(response.url),
+            response.status_code,
+            _frameable_headers(response.headers),
+            bytes(body),
+            now,
+        )
+        if _is_cacheable(entry.status, entry.headers, len(entry.body)):
+            await self.cache.put(key, entry)
+        return entry, "MISS"
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            await self.close()
+
+
+def _with_base(entry: CachedResponse) -> bytes:
+    if "html" not in entry.headers.get("content-type", ""):
+        return entry.body
+    base = b'<base href="%s">' % entry.url.replace('"', "%22").encode()
+    match = _HEAD_RE.search(entry.body, 0, 4096)
+    if match is None:
+        return base + entry.body
+    return entry.body[: match.end()] + base + entry.body[match.end() :]
+
+
+def _sandboxed(headers: dict[str, str]) -> dict[str, str]:
+    sandbox = f"sandbox {PROXY_SANDBOX_FLAGS}"
+    policy = headers.get("content-security-policy")
+    return {
+        **headers,
+        "content-security-policy": f"{policy}, {sandbox}" if policy else sandbox,
+    }
+
+
+async def handle_proxy(request: Request) -> Response:
+    if not has_proxy_access(request.cookies.get(PROXY_TOKEN_COOKIE, "")):
+        return PlainTextResponse("Proxy access requires a browser session.", 401)
+    url = request.query_params.get("url", "")
+    if not url.startswith(("http://", "https://")):
+        return PlainTextResponse("Expected an absolute http(s) URL.", 400)
+    started = time.perf_counter()
+    try:
+        entry, cache_status = await caching_proxy.fetch(url)
+    except PrivateAddressError as e:
+        return PlainTextResponse(str(e), 403)
+    except (httpx.HTTPError, ProxyError) as e:
+        return PlainTextResponse(f"Could not load {url}: {e}", 502)
+    caching_proxy.record_served(url, (time.perf_counter() - started) * 1000)
+    headers = _sandboxed({**entry.headers, "x-cache": cache_status})
+    return Response(_with_base(entry), entry.status, headers)
+
+
+caching_proxy = CachingProxy(ProxyCache(PROXY_CACHE_DIR, PROXY_CACHE_SIZE))
+proxy_api = Starlette(routes=[Route(PROXY_PATH, handle_proxy, methods=["GET"])])
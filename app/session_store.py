@@ -0,0 +1,241 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+
+SESSION_DIR = os.environ.get("TAVIAD_SESSION_DIR", "sessions")
+FLUSH_INTERVAL = 1.0
+COMPACT_MIN_RECORDS = 1000
+MAX_SESSION_HISTORY = 1000
+MAX_WINDOW_LOGS = 16
+
+_UNSAFE_PROFILE_RE = re.compile(r"[^\w-]")
+
+logger = logging.getLogger(__name__)
+
+
+class SavedTab:
+    __slots__ = ("id", "title", "url", "position", "entries")
+
+    def __init__(
+        self, tab_id: int, title: str, url: str, position: int, entries: list[str]
+    ):
+        self.id = tab_id
+        self.title = title
+        self.url = url
+        self.position = position
+        self.entries = entries
+
+    def record(self) -> list:
+        return ["t", self.id, self.title, self.url, self.position, self.entries]
+
+
+class SavedSession:
+    __slots__ = ("tabs", "active_id", "records")
+
+    def __init__(self):
+        self.tabs: dict[int, SavedTab] = {}
+        self.active_id: int | None = None
+        self.records = 0
+
+    def apply(self, record: list):
+        kind, tab_id = record[0], record[1]
+        self.records += 1
+        if kind == "t":
+            tab = SavedTab(*record[1:])
+            entries = tab.entries
+            if not isinstance(entries, list) or not entries:
+                raise ValueError(f"Tab {tab_id} has no history entries")
+            if not all(isinstance(url, str) for url in entries):
+                raise ValueError(f"Tab {tab_id} has invalid history entries")
+            tab.position = max(0, min(tab.position, len(tab.entries) - 1))
+            self.tabs[tab_id] = tab
+            return
+        if kind == "a":
+            self.active_id = tab_id
+            return
+        tab = self.tabs.get(tab_id)
+        if tab is None:
+            return
+        if kind == "p":
+            tab.title, tab.url, entry = record[2:]
+            del tab.entries[tab.position + 1 :]
+            tab.entries.append(entry)
+            del tab.entries[:-MAX_SESSION_HISTORY]
+            tab.position = len(tab.entries) - 1
+        elif kind == "g":
+            tab.title, tab.url, position = record[2:]
+            tab.position = max(0, min(position, len(tab.entries) - 1))
+        elif kind == "c":
+            del self.tabs[tab_id]
+        elif kind == "m":
+            order = [other for other in self.tabs if other != tab_id]
+            order.insert(record[2], tab_id)
+            self.tabs = {other: self.tabs[other] for other in order}
+
+    def snapshot(self) -> list[list]:
+        records = [tab.record() for tab in self.tabs.values()]
+        if self.active_id is not None:
+            records.append(["a", self.active_id])
+        return records
+
+
+def _read_session(path: str) -> SavedSession | None:
+    session = SavedSession()
+    try:
+        file = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    with file:
+        for line in file:
+            try:
+                session.apply(json.loads(line))
+            except (ValueError, TypeError, IndexError, KeyError):
+                continue
+    return session
+
+
+def _encode(records: list[list]) -> str:
+    return "".join(
+        json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        for record in records
+    )
+
+
+def _append(path: str, data: str):
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(data)
+
+
+def _window_logs(directory: str) -> list[str]:
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return []
+    logs = [
+        (entry.stat().st_mtime, entry.path)
+        for entry in entries
+        if entry.name.endswith(".session")
+    ]
+    return [path for _, path in sorted(logs, reverse=True)]
+
+
+def _load_window(path: str, legacy_path: str) -> SavedSession | None:
+    session = _read_session(path)
+    if session is not None:
+        return session
+    directory = os.path.dirname(path)
+    logs = _window_logs(directory)
+    for stale in logs[MAX_WINDOW_LOGS - 1 :]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(stale)
+    source = logs[0] if logs else legacy_path
+    session = _read_session(source)
+    if session is None:
+        return None
+    records = session.snapshot()
+    os.makedirs(directory, exist_ok=True)
+    _append(path, _encode(records))
+    session.records = len(records)
+    return session
+
+
+def _compact(path: str) -> int:
+    session = _read_session(path)
+    if session is None:
+        return 0
+    records = session.snapshot()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(_encode(records))
+    os.replace(temp_path, path)
+    return len(records)
+
+
+class SessionStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pending: dict[str, list[list]] = {}
+        self._record_counts: dict[str, int] = {}
+        self._snapshot_sizes: dict[str, int] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+
+    def _path(self, profile: str, window: str) -> str:
+        window_name = hashlib.sha256(window.encode()).hexdigest()[:16]
+        return os.path.join(
+            self.directory,
+            _UNSAFE_PROFILE_RE.sub("_", profile),
+            f"{window_name}.session",
+        )
+
+    def _legacy_path(self, profile: str) -> str:
+        return os.path.join(
+            self.directory, f"{_UNSAFE_PROFILE_RE.sub('_', profile)}.session"
+        )
+
+    async def load(self, profile: str, window: str) -> SavedSession | None:
+        await self.flush()
+        path = self._path(profile, window)
+        session = await asyncio.to_thread(
+            _load_window, path, self._legacy_path(profile)
+        )
+        self._record_counts[path] = session.records if session else 0
+        self._snapshot_sizes[path] = len(session.tabs) + 1 if session else 0
+        return session
+
+    def record(self, profile: str, window: str, *record):
+        path = self._path(profile, window)
+        self._pending.setdefault(path, []).append(list(record))
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                FLUSH_INTERVAL, self._start_flush
+            )
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Could not write session", exc_info=task.exception())
+
+    async def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            for path, records in pending.items():
+                await asyncio.to_thread(
+                    os.makedirs, os.path.dirname(path), exist_ok=True
+                )
+                await asyncio.to_thread(_append, path, _encode(records))
+                count = self._record_counts.get(path, 0) + len(records)
+                snapshot_size = self._snapshot_sizes.get(path, 0)
+                if count > max(COMPACT_MIN_RECORDS, 2 * snapshot_size):
+                    count = await asyncio.to_thread(_compact, path)
+                    self._snapshot_sizes[path] = count
+                self._record_counts[path] = count
+
+    async def close(self):
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            await self.close()
+
+
+session_store = SessionStore(SESSION_DIR)
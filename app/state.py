@@ -1,5 +1,83 @@
 import reflex as rx
+import asyncio
+import contextlib
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from collections.abc import Iterable
 from typing import TypedDict
+from app.bookmarks import BOOKMARK_BAR_ID, Bookmark, BookmarkStore, default_bookmarks
+from app.history import DEFAULT_HISTORY_LIMIT, MAX_HISTORY_LIMIT, TabHistory
+from app.history_store import HistoryEntry, history_store
+from app.session_store import SavedTab, session_store
+from app.importer import (
+    ImportFormatError,
+    count_visits,
+    detect_format,
+    read_bookmarks,
+    read_visits,
+)
+from app import omnibox, stats, urls
+from app.stats import SiteCount, SiteLoadTime
+from app.profiler import HandlerSummary, profiler
+from app.proxy import PROXY_PATH, PROXY_TOKEN_COOKIE, caching_proxy, proxy_token
+from app.favicons import favicon_service, site_origin
+
+HISTORY_PAGE_SIZE = 25
+TOP_SITES_COUNT = 10
+BOOKMARK_BAR_LIMIT = 50
+BOOKMARK_PAGE_SIZE = 50
+DEFAULT_KEEP_ALIVE_TABS = 4
+MAX_KEEP_ALIVE_TABS = 16
+CLOSED_TABS_LIMIT = 25
+RECENT_TAB_LABELS_LIMIT = 32
+SPECULATION_BUDGET = int(os.environ.get("TAVIAD_SPECULATION_BUDGET", str(4 * 2**20)))
+SPECULATION_MEMORY = 32
+PREFETCH_MAX_BYTES = 2**20
+HOTKEYS = [
+    "Mod+t",
+    "Mod+w",
+    "Mod+Shift+t",
+    "Mod+Tab",
+    "Mod+Shift+Tab",
+    "Mod+PageDown",
+    "Mod+PageUp",
+    "Mod+l",
+    "Alt+d",
+    "F6",
+]
+FOCUS_ADDRESS_BAR_SCRIPT = (
+    "const addressBar = document.getElementById('address_bar');"
+    " addressBar?.focus(); addressBar?.select();"
+)
+PRECONNECT_HINT_SCRIPT = (
+    "(() => { const origin = new URL(%s).origin;"
+    " const hints = (window.taviadHints ??= []);"
+    " if (hints.includes(origin)) return; hints.push(origin);"
+    " for (const rel of ['dns-prefetch', 'preconnect']) {"
+    " const link = document.createElement('link'); link.rel = rel;"
+    " link.href = origin; link.dataset.taviadHint = origin;"
+    " document.head.appendChild(link); }"
+    " if (hints.length > 6) { const stale = hints.shift();"
+    " document.querySelectorAll('link[data-taviad-hint]').forEach((link) =>"
+    " link.dataset.taviadHint === stale && link.remove()); } })()"
+)
+RELOAD_FRAME_SCRIPT = "const frame = document.getElementById('tab_frame_%d'); if (frame) frame.src = frame.src"
+PAGE_LOAD_MARK_SCRIPT = (
+    "(() => { const id = %d; let url;"
+    " try { url = new URL(%s).href; } catch { return; }"
+    " if (window.taviadFrameUrls?.[id] === url) return;"
+    " (window.taviadPageLoads ??= {})[id] = {url, start: performance.now()}; })()"
+)
+TAB_PAINTED_SCRIPT = (
+    "new Promise((resolve) => requestAnimationFrame(() => requestAnimationFrame("
+    "() => resolve(performance.now() - window.taviadTabSwitchStart))))"
+)
 
 
 class Tab(TypedDict):
@@ -7,53 +85,137 @@ class Tab(TypedDict):
     title: str
     url: str
     content_url: str
-    history: list[str]
-    history_index: int
+    can_go_back: bool
+    can_go_forward: bool
 
 
-class Bookmark(TypedDict):
+class TabLabel(TypedDict):
     title: str
-    url: str
-    icon: str
+    content_url: str
+
+
+def _tab_label(tab: Tab) -> TabLabel:
+    return {"title": tab["title"], "content_url": tab["content_url"]}
+
+
+def _unproxied(value):
+    return getattr(value, "__wrapped__", value)
+
+
+def _bookmark_urls(bookmarks: list[Bookmark]) -> list[str]:
+    return [bookmark["url"] for bookmark in bookmarks if not bookmark["is_folder"]]
+
+
+class BookmarkStoreState(rx.State):
+    _bookmarks: BookmarkStore = default_bookmarks()
+
+    def _mark_changed(self):
+        self.dirty_vars.add("_bookmarks")
 
 
 class BrowserState(rx.State):
-    tabs: list[Tab] = [
+    _tabs: list[Tab] = [
         {
             "id": 1,
             "title": "New Tab",
             "url": "",
             "content_url": "about:blank",
-            "history": ["about:blank"],
-            "history_index": 0,
+            "can_go_back": False,
+            "can_go_forward": False,
         }
     ]
+    tab_ids: list[int] = [1]
+    tab_labels: dict[int, TabLabel] = {
+        1: {"title": "New Tab", "content_url": "about:blank"}
+    }
+    recent_tab_labels: dict[int, TabLabel] = {}
     active_tab_id: int = 1
     next_tab_id: int = 2
+    _tab_index: dict[int, int] = {1: 0}
+    _histories: dict[int, TabHistory] = {1: TabHistory("about:blank")}
+    history_limit: int = DEFAULT_HISTORY_LIMIT
+    live_tab_ids: list[int] = [1]
+    _session_restored: bool = False
+    _closed_tabs: list[tuple[int, SavedTab]] = []
+    keep_alive_limit: int = DEFAULT_KEEP_ALIVE_TABS
+    proxy_pages: bool = False
+    proxy_token: str = rx.Cookie(
+        "",
+        name=PROXY_TOKEN_COOKIE,
+        path=PROXY_PATH,
+        max_age=60 * 60 * 24 * 365,
+        same_site="strict",
+    )
+    favicons: dict[str, str] = {}
+    _tab_origins: dict[int, str] = {}
+    _origin_refs: dict[str, int] = {}
+    _favicon_requests: list[str] = []
+    _speculated_urls: list[str] = []
+    _speculation_bytes: int = 0
+    tab_switch_ms: float = 0.0
+    tab_switch_warm: bool = False
     homepage: str = rx.Cookie("https://google.com", name="browser_homepage")
     search_engine: str = rx.Cookie("Google", name="browser_search_engine")
+    profile_id: str = rx.Cookie(
+        "", name="browser_profile", max_age=60 * 60 * 24 * 365 * 10
+    )
     show_settings: bool = False
-    search_engines: list[str] = ["Google", "DuckDuckGo", "Bing"]
-    bookmarks: list[Bookmark] = [
-        {"title": "Reflex", "url": "https://reflex.dev", "icon": "box"},
-        {"title": "GitHub", "url": "https://github.com", "icon": "github"},
-        {"title": "Google", "url": "https://google.com", "icon": "search"},
-        {
-            "title": "Docs",
-            "url": "https://reflex.dev/docs/getting-started/introduction/",
-            "icon": "book-open",
-        },
-    ]
+    search_engines: list[str] = list(urls.SEARCH_ENGINES)
+    bookmark_bar_items: list[Bookmark] = default_bookmarks().items(
+        BOOKMARK_BAR_ID, BOOKMARK_BAR_LIMIT
+    )
     show_bookmark_manager: bool = False
+    bookmark_folder_id: int = BOOKMARK_BAR_ID
+    bookmark_folder_path: list[Bookmark] = []
+    bookmark_folder_items: list[Bookmark] = []
+    bookmark_query: str = ""
+    bookmark_page_number: int = 0
+    bookmark_item_count: int = 0
+    _bookmark_matches: list[int] = []
     show_dev_tools: bool = False
+    profile_handlers: list[HandlerSummary] = []
+    profile_recomputes: dict[str, int] = {}
+    profile_background_tasks: int = 0
+    profile_peak_background_tasks: int = 0
+    profile_sample_rate: float = 0.0
+    prefetch_stats: dict[str, float] = {
+        "prefetches": 0,
+        "used": 0,
+        "ttfb_saved_ms": 0,
+        "mean_ttfb_saved_ms": 0,
+    }
     show_statistics: bool = False
+    history_query: str = ""
+    top_sites: list[SiteCount] = []
+    site_load_times: list[SiteLoadTime] = []
+    total_visits: int = 0
+    unique_domains: int = 0
+    history_page: list[HistoryEntry] = []
+    history_page_number: int = 0
+    has_older_history: bool = False
+    _history_page_cursors: list[float] = []
+    omnibox_suggestions: list[omnibox.Suggestion] = []
+    omnibox_generation: int = 0
+    history_search_results: list[HistoryEntry] = []
+    importing: bool = False
+    import_status: str = ""
+    import_progress: int = 0
 
     @rx.var
     def active_tab(self) -> Tab | None:
-        for tab in self.tabs:
-            if tab["id"] == self.active_tab_id:
-                return tab
-        return None
+        profiler.recompute("active_tab")
+        tab_index = self._tab_index.get(self.active_tab_id)
+        if tab_index is None:
+            return None
+        return self._tabs[tab_index]
+
+    @rx.var
+    def live_tabs(self) -> list[Tab]:
+        return [
+            self._tabs[self._tab_index[tab_id]]
+            for tab_id in sorted(self.live_tab_ids)
+            if tab_id in self._tab_index
+        ]
 
     @rx.var
     def active_tab_url(self) -> str:
@@ -62,16 +224,15 @@ class BrowserState(rx.State):
 
     @rx.var
     def can_go_back(self) -> bool:
+        profiler.recompute("can_go_back")
         active_tab = self.active_tab
-        return active_tab is not None and active_tab["history_index"] > 0
+        return active_tab is not None and active_tab["can_go_back"]
 
     @rx.var
     def can_go_forward(self) -> bool:
+        profiler.recompute("can_go_forward")
         active_tab = self.active_tab
-        return (
-            active_tab is not None
-            and active_tab["history_index"] < len(active_tab["history"]) - 1
-        )
+        return active_tab is not None and active_tab["can_go_forward"]
 
     @rx.event
     def add_tab(self):
@@ -80,66 +241,513 @@ class BrowserState(rx.State):
             "title": "New Tab",
             "url": "",
             "content_url": self.homepage,
-            "history": [self.homepage],
-            "history_index": 0,
+            "can_go_back": False,
+            "can_go_forward": False,
         }
-        self.tabs.append(new_tab)
+        self._tabs.append(new_tab)
+        self.tab_ids.append(self.next_tab_id)
+        self._tab_index[self.next_tab_id] = len(self._tabs) - 1
+        self._touch_tab(new_tab)
+        self._histories[self.next_tab_id] = TabHistory(
+            self.homepage, self.history_limit
+        )
         self.active_tab_id = self.next_tab_id
+        self._keep_tab_alive(self.next_tab_id)
+        self._log_tab(new_tab)
+        self._log_session("a", self.next_tab_id)
         self.next_tab_id += 1
+        return self._with_favicons([new_tab["content_url"]])
+
+    def _touch_tab(self, tab: Tab):
+        self.recent_tab_labels[tab["id"]] = _tab_label(tab)
+        if len(self.recent_tab_labels) > RECENT_TAB_LABELS_LIMIT:
+            self._flush_tab_labels()
+        self._set_tab_origin(tab["id"], site_origin(tab["content_url"]))
+
+    def _flush_tab_labels(self):
+        self.tab_labels = {tab["id"]: _tab_label(tab) for tab in _unproxied(self._tabs)}
+        self.recent_tab_labels = {}
+
+    def _set_tab_origin(self, tab_id: int, origin: str):
+        previous = self._tab_origins.get(tab_id, "")
+        if previous == origin:
+            return
+        if previous:
+            del self._tab_origins[tab_id]
+            self._origin_refs[previous] -= 1
+            if not self._origin_refs[previous]:
+                del self._origin_refs[previous]
+                if (
+                    previous in self.favicons
+                    and previous not in self._bookmark_origins()
+                ):
+                    del self.favicons[previous]
+        if origin:
+            self._tab_origins[tab_id] = origin
+            self._origin_refs[origin] = self._origin_refs.get(origin, 0) + 1
+
+    def _log_session(self, *record):
+        session_store.record(self._profile(), self.router.session.client_token, *record)
+
+    def _log_tab(self, tab: Tab):
+        history = self._histories[tab["id"]]
+        self._log_session(
+            "t", tab["id"], tab["title"], tab["url"], history.position, list(history)
+        )
+
+    @rx.event
+    async def restore_session(self):
+        if self._session_restored:
+            return
+        self._session_restored = True
+        session = await session_store.load(
+            self._profile(), self.router.session.client_token
+        )
+        if session is None or not session.tabs:
+            for tab in self._tabs:
+                self._log_tab(tab)
+            self._log_session("a", self.active_tab_id)
+            return self._with_favicons(self._session_urls())
+        tabs: list[Tab] = []
+        histories: dict[int, TabHistory] = {}
+        for saved in session.tabs.values():
+            history = TabHistory.restore(
+                saved.entries, saved.position, self.history_limit
+            )
+            histories[saved.id] = history
+            tabs.append(
+                {
+                    "id": saved.id,
+                    "title": saved.title,
+                    "url": saved.url,
+                    "content_url": history.current,
+                    "can_go_back": history.can_go_back,
+                    "can_go_forward": history.can_go_forward,
+                }
+            )
+        self._tabs = tabs
+        self.tab_ids = [tab["id"] for tab in tabs]
+        self._flush_tab_labels()
+        self._tab_origins = {}
+        self._origin_refs = {}
+        for tab in tabs:
+            self._set_tab_origin(tab["id"], site_origin(tab["content_url"]))
+        self._histories = histories
+        self._tab_index = {tab["id"]: i for i, tab in enumerate(tabs)}
+        if session.active_id in self._tab_index:
+            self.active_tab_id = session.active_id
+        else:
+            self.active_tab_id = self._tabs[-1]["id"]
+        self.next_tab_id = max(histories) + 1
+        self.live_tab_ids = [self.active_tab_id]
+        self._prune_favicons()
+        return self._with_favicons(self._session_urls())
+
+    def _keep_tab_alive(self, tab_id: int) -> bool:
+        was_live = tab_id in self.live_tab_ids
+        if was_live:
+            self.live_tab_ids.remove(tab_id)
+        self.live_tab_ids.insert(0, tab_id)
+        del self.live_tab_ids[self.keep_alive_limit :]
+        return was_live
+
+    def _reindex_tabs(self, start: int = 0, stop: int | None = None):
+        tabs = _unproxied(self._tabs)
+        tab_index = _unproxied(self._tab_index)
+        for i in range(start, len(tabs) if stop is None else stop):
+            tab_index[tabs[i]["id"]] = i
+        self._tab_index = tab_index
+
+    def _active_tab_index(self) -> int:
+        return self._tab_index.get(self.active_tab_id, -1)
+
+    def _load_history_entry(self, tab_index: int):
+        tab = self._tabs[tab_index]
+        history = self._histories[tab["id"]]
+        url = history.current
+        tab["content_url"] = url
+        tab["url"] = url
+        tab["title"] = urls.display_host(url)
+        tab["can_go_back"] = history.can_go_back
+        tab["can_go_forward"] = history.can_go_forward
+        self._touch_tab(tab)
+        self._log_session("g", tab["id"], tab["title"], url, history.position)
+        self._record_visit(tab_index)
+
+    def _profile(self) -> str:
+        if not self.profile_id:
+            self.profile_id = uuid.uuid4().hex
+        return str(self.profile_id)
+
+    def _record_visit(self, tab_index: int):
+        tab = self._tabs[tab_index]
+        url = tab["content_url"]
+        if url == "about:blank":
+            return
+        visited_at = time.time()
+        history_store.record(self._profile(), url, tab["title"], visited_at)
+        index = omnibox.get_loaded_index(self._profile())
+        if index is not None:
+            index.visit(url, tab["title"], visited_at)
+        stats.record_visit(self._profile(), url)
+        if self.show_statistics:
+            self._refresh_statistics()
+            if self.history_page_number == 0:
+                self._prepend_history_entry(
+                    {
+                        "url": url,
+                        "title": tab["title"],
+                        "visit_count": 0,
+                        "last_visit": visited_at,
+                    }
+                )
+
+    def _sync_bookmark_suggestion(self, url: str, title: str, bookmarked: bool):
+        index = omnibox.get_loaded_index(self._profile())
+        if index is not None:
+            index.set_bookmarked(url, title, bookmarked)
+
+    def _refresh_statistics(self):
+        profile_stats = stats.get_loaded_stats(self._profile())
+        if profile_stats is None:
+            return
+        self.top_sites = profile_stats.visits.top(TOP_SITES_COUNT)
+        self.total_visits = profile_stats.visits.total_visits
+        self.unique_domains = profile_stats.visits.unique_domains
+        self.site_load_times = profile_stats.load_times.top(TOP_SITES_COUNT)
+
+    def _mark_page_load(self, tab_id: int, previous_url: str, url: str):
+        if url == previous_url or not url.startswith(("http://", "https://")):
+            return None
+        return rx.call_script(PAGE_LOAD_MARK_SCRIPT % (tab_id, json.dumps(url)))
+
+    def _session_urls(self) -> list[str]:
+        return [
+            *(tab["content_url"] for tab in self._tabs),
+            *_bookmark_urls(self.bookmark_bar_items),
+        ]
+
+    def _bookmark_origins(self) -> set[str]:
+        return {
+            site_origin(url)
+            for url in _bookmark_urls(
+                [*self.bookmark_bar_items, *self.bookmark_folder_items]
+            )
+        }
+
+    def _prune_favicons(self):
+        bookmarked = self._bookmark_origins()
+        favicons = {
+            origin: name
+            for origin, name in self.favicons.items()
+            if origin in self._origin_refs or origin in bookmarked
+        }
+        if len(favicons) < len(self.favicons):
+            self.favicons = favicons
+
+    def _sync_favicons(self, urls: Iterable[str]) -> list[str]:
+        missing = []
+        bookmarked = self._bookmark_origins()
+        for origin in {site_origin(url) for url in urls}:
+            if not origin or origin in self.favicons:
+                continue
+            if origin not in self._origin_refs and origin not in bookmarked:
+                continue
+            name = favicon_service.cached(origin)
+            if name is None:
+                missing.append(origin)
+            elif name:
+                self.favicons[origin] = name
+        return sorted(missing)
+
+    def _with_favicons(self, urls: Iterable[str], *events):
+        events = [event for event in events if event is not None]
+        origins = [
+            origin
+            for origin in self._sync_favicons(urls)
+            if origin not in self._favicon_requests
+        ]
+        if origins:
+            self._favicon_requests = [*self._favicon_requests, *origins]
+            events.append(BrowserState.load_favicons(origins))
+        return events
+
+    @rx.event(background=True)
+    async def load_favicons(self, origins: list[str]):
+        names = {}
+        try:
+            names = await favicon_service.lookup(origins)
+        finally:
+            async with self:
+                self._favicon_requests = [
+                    origin for origin in self._favicon_requests if origin not in origins
+                ]
+                bookmarked = self._bookmark_origins()
+                found = {
+                    origin: name
+                    for origin, name in names.items()
+                    if name and (origin in self._origin_refs or origin in bookmarked)
+                }
+                if found:
+                    self.favicons = {**self.favicons, **found}
+
+    async def _load_history_page(self, page_number: int):
+        del self._history_page_cursors[page_number + 1 :]
+        if not self._history_page_cursors:
+            self._history_page_cursors.append(math.inf)
+        before = self._history_page_cursors[page_number]
+        entries = await history_store.recent(
+            self._profile(), before, HISTORY_PAGE_SIZE + 1
+        )
+        self._show_history_page(page_number, entries)
+
+    def _show_history_page(self, page_number: int, entries: list[HistoryEntry]):
+        self.history_page = entries[:HISTORY_PAGE_SIZE]
+        self.history_page_number = page_number
+        self.has_older_history = len(entries) > HISTORY_PAGE_SIZE
+        if self.has_older_history:
+            self._history_page_cursors.append(self.history_page[-1]["last_visit"])
+
+    def _prepend_history_entry(self, entry: HistoryEntry):
+        self.history_page.insert(0, entry)
+        if len(self.history_page) > HISTORY_PAGE_SIZE:
+            del self.history_page[HISTORY_PAGE_SIZE:]
+            self.has_older_history = True
+            del self._history_page_cursors[1:]
+            self._history_page_cursors.append(self.history_page[-1]["last_visit"])
 
     @rx.event
     def close_tab(self, tab_id: int):
-        self.tabs = [tab for tab in self.tabs if tab["id"] != tab_id]
-        if self.active_tab_id == tab_id and self.tabs:
-            self.active_tab_id = self.tabs[-1]["id"]
-        elif not self.tabs:
-            self.add_tab()
+        tab_index = self._tab_index.pop(tab_id, None)
+        if tab_index is None:
+            return
+        tab = self._tabs.pop(tab_index)
+        self.tab_ids.pop(tab_index)
+        self._reindex_tabs(tab_index)
+        if tab_id in self.recent_tab_labels:
+            del self.recent_tab_labels[tab_id]
+        self._set_tab_origin(tab_id, "")
+        history = self._histories.pop(tab_id, None)
+        if history is not None and tab["content_url"] != "about:blank":
+            self._closed_tabs.append(
+                (
+                    tab_index,
+                    SavedTab(
+                        tab_id,
+                        tab["title"],
+                        tab["url"],
+                        history.position,
+                        list(history),
+                    ),
+                )
+            )
+            del self._closed_tabs[:-CLOSED_TABS_LIMIT]
+        self._log_session("c", tab_id)
+        if tab_id in self.live_tab_ids:
+            self.live_tab_ids.remove(tab_id)
+        if self.active_tab_id == tab_id and self._tabs:
+            self.active_tab_id = self._tabs[-1]["id"]
+            self._keep_tab_alive(self.active_tab_id)
+            self._log_session("a", self.active_tab_id)
+        elif not self._tabs:
+            return self.add_tab()
+
+    @rx.event
+    def reopen_closed_tab(self):
+        if not self._closed_tabs:
+            return
+        tab_index, saved = self._closed_tabs.pop()
+        tab_index = min(tab_index, len(self._tabs))
+        tab_id = self.next_tab_id
+        self.next_tab_id += 1
+        history = TabHistory.restore(saved.entries, saved.position, self.history_limit)
+        tab: Tab = {
+            "id": tab_id,
+            "title": saved.title,
+            "url": saved.url,
+            "content_url": history.current,
+            "can_go_back": history.can_go_back,
+            "can_go_forward": history.can_go_forward,
+        }
+        self._tabs.insert(tab_index, tab)
+        self.tab_ids.insert(tab_index, tab_id)
+        self._histories[tab_id] = history
+        self._reindex_tabs(tab_index)
+        self._touch_tab(tab)
+        self.active_tab_id = tab_id
+        self._keep_tab_alive(tab_id)
+        self._log_tab(tab)
+        self._log_session("m", tab_id, tab_index)
+        self._log_session("a", tab_id)
+        return self._with_favicons([tab["content_url"]])
+
+    def _cycle_tab(self, step: int):
+        tab_index = self._active_tab_index()
+        if tab_index != -1 and len(self._tabs) > 1:
+            return self.switch_tab(
+                self._tabs[(tab_index + step) % len(self._tabs)]["id"]
+            )
+
+    @rx.event
+    def move_tab(self, tab_id: int, new_index: int):
+        tab_index = self._tab_index.get(tab_id)
+        if tab_index is None:
+            return
+        new_index = max(0, min(new_index, len(self._tabs) - 1))
+        if new_index == tab_index:
+            return
+        self._tabs.insert(new_index, self._tabs.pop(tab_index))
+        self.tab_ids.insert(new_index, self.tab_ids.pop(tab_index))
+        self._reindex_tabs(min(tab_index, new_index), max(tab_index, new_index) + 1)
+        self._log_session("m", tab_id, new_index)
 
     @rx.event
     def switch_tab(self, tab_id: int):
+        if tab_id not in self._tab_index or tab_id == self.active_tab_id:
+            return
         self.active_tab_id = tab_id
+        self.tab_switch_warm = self._keep_tab_alive(tab_id)
+        self._log_session("a", tab_id)
+        if self.tab_switch_warm:
+            return rx.call_script(
+                TAB_PAINTED_SCRIPT, callback=BrowserState.record_tab_switch
+            )
+        return rx.call_script(
+            f"window.taviadTabSwitch = {{id: {tab_id}, start: window.taviadTabSwitchStart}}"
+        )
+
+    @rx.event
+    def record_tab_switch(self, elapsed_ms: float | None):
+        if elapsed_ms is not None:
+            self.tab_switch_ms = round(elapsed_ms, 1)
+
+    @rx.event
+    def record_frame_load(self, timing: dict | None):
+        if not timing:
+            return
+        if "switch_ms" in timing:
+            self.record_tab_switch(timing["switch_ms"])
+        if "load_ms" in timing:
+            stats.record_load_time(self._profile(), timing["url"], timing["load_ms"])
+            if self.show_statistics:
+                self._refresh_statistics()
+
+    @rx.event
+    def set_keep_alive_limit(self, value: str):
+        try:
+            limit = int(value)
+        except ValueError:
+            return
+        self.keep_alive_limit = max(1, min(limit, MAX_KEEP_ALIVE_TABS))
+        del self.live_tab_ids[self.keep_alive_limit :]
+
+    @rx.event
+    def toggle_proxy_pages(self):
+        self.proxy_pages = not self.proxy_pages
+        if self.proxy_pages:
+            self.proxy_token = proxy_token(self._profile())
 
     @rx.event
     def navigate(self, form_data: dict[str, str]):
         url = form_data.get("url", "")
+        self.omnibox_suggestions = []
+        self.omnibox_generation += 1
         if not url:
             return
-        tab_index = -1
-        for i, tab in enumerate(self.tabs):
-            if tab["id"] == self.active_tab_id:
-                tab_index = i
-                break
+        tab_index = self._active_tab_index()
         if tab_index != -1:
-            search_urls = {
-                "Google": "https://www.google.com/search?q=",
-                "DuckDuckGo": "https://duckduckgo.com/?q=",
-                "Bing": "https://www.bing.com/search?q=",
-            }
-            url_to_load = url
-            if ("." not in url or " " in url) and (not url.startswith("http")):
-                url_to_load = (
-                    f"{search_urls[self.search_engine]}{url.replace(' ', '+')}"
-                )
-            elif not url_to_load.startswith("http://") and (
-                not url_to_load.startswith("https://")
-            ):
-                url_to_load = f"https://{url_to_load}"
-            current_history = self.tabs[tab_index]["history"]
-            current_index = self.tabs[tab_index]["history_index"]
-            if current_index < len(current_history) - 1:
-                self.tabs[tab_index]["history"] = current_history[: current_index + 1]
-            self.tabs[tab_index]["history"].append(url_to_load)
-            self.tabs[tab_index]["history_index"] += 1
-            self.tabs[tab_index]["url"] = url
-            self.tabs[tab_index]["content_url"] = url_to_load
-            self.tabs[tab_index]["title"] = self._get_domain(url)
-
-    def _get_domain(self, url: str) -> str:
-        if "//" in url:
-            domain = url.split("//")[1].split("/")[0]
-        else:
-            domain = url.split("/")[0]
-        return domain.replace("www.", "")
+            url_to_load, is_search = urls.resolve(url, self.search_engine)
+            tab_id = self._tabs[tab_index]["id"]
+            history = self._histories[tab_id]
+            previous_url = self._tabs[tab_index]["content_url"]
+            self._tabs[tab_index]["url"] = url.strip() if is_search else url_to_load
+            self._tabs[tab_index]["content_url"] = history.push(url_to_load)
+            self._tabs[tab_index]["title"] = (
+                url.strip() if is_search else urls.display_host(url_to_load)
+            )
+            self._tabs[tab_index]["can_go_back"] = history.can_go_back
+            self._tabs[tab_index]["can_go_forward"] = False
+            self._touch_tab(self._tabs[tab_index])
+            self._log_session(
+                "p",
+                tab_id,
+                self._tabs[tab_index]["title"],
+                self._tabs[tab_index]["url"],
+                url_to_load,
+            )
+            self._record_visit(tab_index)
+            return self._with_favicons(
+                [url_to_load], self._mark_page_load(tab_id, previous_url, url_to_load)
+            )
+
+    @rx.event
+    def set_history_limit(self, value: str):
+        try:
+            limit = int(value)
+        except ValueError:
+            return
+        self.history_limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+        for tab in self._tabs:
+            history = self._histories[tab["id"]]
+            history.resize(self.history_limit)
+            tab["can_go_back"] = history.can_go_back
+            tab["can_go_forward"] = history.can_go_forward
+            self._log_tab(tab)
+
+    @rx.event
+    async def update_suggestions(self, text: str, generation: int):
+        if generation != self.omnibox_generation:
+            return
+        if not text.strip() or text == self.active_tab_url:
+            self.omnibox_suggestions = []
+            return
+        bookmarks = (await self.get_state(BookmarkStoreState))._bookmarks
+        index = await omnibox.load_index(self._profile(), bookmarks.bookmarks())
+        self.omnibox_suggestions = index.suggest(text)
+        url, is_search = urls.resolve(text, self.search_engine)
+        if is_search:
+            return
+        top = self.omnibox_suggestions[0]["url"] if self.omnibox_suggestions else ""
+        if top and urls.display_host(top) == urls.display_host(url):
+            return self.speculate(top)
+        return self.speculate(url, prefetch=False)
+
+    @rx.event
+    def speculate(self, url: str, prefetch: bool = True):
+        if not url.startswith(("http://", "https://")):
+            return
+        events = [rx.call_script(PRECONNECT_HINT_SCRIPT % json.dumps(url))]
+        if (
+            prefetch
+            and self.proxy_pages
+            and url not in self._speculated_urls
+            and self._speculation_bytes < SPECULATION_BUDGET
+        ):
+            self._speculated_urls = [
+                *self._speculated_urls[1 - SPECULATION_MEMORY :],
+                url,
+            ]
+            events.append(BrowserState.prefetch_page(url))
+        return events
+
+    @rx.event(background=True)
+    async def prefetch_page(self, url: str):
+        async with self:
+            if not self.proxy_pages or url not in self._speculated_urls:
+                return
+            reserved = min(
+                PREFETCH_MAX_BYTES, SPECULATION_BUDGET - self._speculation_bytes
+            )
+            if reserved <= 0:
+                return
+            self._speculation_bytes += reserved
+        spent = await caching_proxy.prefetch(url, reserved)
+        async with self:
+            self._speculation_bytes += spent - reserved
+
+    @rx.event
+    def clear_suggestions(self):
+        self.omnibox_suggestions = []
 
     @rx.event
     def go_home(self):
@@ -147,55 +755,56 @@ class BrowserState(rx.State):
 
     @rx.event
     def refresh(self):
-        active_tab = self.active_tab
-        if active_tab:
-            current_content_url = active_tab["content_url"]
-            active_tab["content_url"] = "about:blank"
-            yield
-            active_tab["content_url"] = current_content_url
+        if self.active_tab:
+            return rx.call_script(RELOAD_FRAME_SCRIPT % self.active_tab_id)
 
     @rx.event
     def go_back(self):
-        tab_index = -1
-        for i, tab in enumerate(self.tabs):
-            if tab["id"] == self.active_tab_id:
-                tab_index = i
-                break
-        if tab_index != -1 and self.tabs[tab_index]["history_index"] > 0:
-            self.tabs[tab_index]["history_index"] -= 1
-            url = self.tabs[tab_index]["history"][self.tabs[tab_index]["history_index"]]
-            self.tabs[tab_index]["content_url"] = url
-            self.tabs[tab_index]["url"] = url
-            self.tabs[tab_index]["title"] = self._get_domain(url)
+        tab_index = self._active_tab_index()
+        if tab_index != -1 and self._tabs[tab_index]["can_go_back"]:
+            previous_url = self._tabs[tab_index]["content_url"]
+            self._histories[self.active_tab_id].back()
+            self._load_history_entry(tab_index)
+            return self._with_favicons(
+                [self._tabs[tab_index]["content_url"]],
+                self._mark_page_load(
+                    self.active_tab_id,
+                    previous_url,
+                    self._tabs[tab_index]["content_url"],
+                ),
+            )
 
     @rx.event
     def go_forward(self):
-        tab_index = -1
-        for i, tab in enumerate(self.tabs):
-            if tab["id"] == self.active_tab_id:
-                tab_index = i
-                break
-        if (
-            tab_index != -1
-            and self.tabs[tab_index]["history_index"]
-            < len(self.tabs[tab_index]["history"]) - 1
-        ):
-            self.tabs[tab_index]["history_index"] += 1
-            url = self.tabs[tab_index]["history"][self.tabs[tab_index]["history_index"]]
-            self.tabs[tab_index]["content_url"] = url
-            self.tabs[tab_index]["url"] = url
-            self.tabs[tab_index]["title"] = self._get_domain(url)
-
-    @rx.event
-    def handle_key_down(self, key: str):
-        meta = self.get_client_meta()
-        ctrl_key = meta.get("ctrlKey", False)
-        meta_key = meta.get("metaKey", False)
-        if (meta_key or ctrl_key) and key == "t":
-            return BrowserState.add_tab
-        if (meta_key or ctrl_key) and key == "w":
+        tab_index = self._active_tab_index()
+        if tab_index != -1 and self._tabs[tab_index]["can_go_forward"]:
+            previous_url = self._tabs[tab_index]["content_url"]
+            self._histories[self.active_tab_id].forward()
+            self._load_history_entry(tab_index)
+            return self._with_favicons(
+                [self._tabs[tab_index]["content_url"]],
+                self._mark_page_load(
+                    self.active_tab_id,
+                    previous_url,
+                    self._tabs[tab_index]["content_url"],
+                ),
+            )
+
+    @rx.event
+    def handle_hotkey(self, combo: str):
+        if combo == "Mod+t":
+            return self.add_tab()
+        elif combo == "Mod+w":
             if self.active_tab:
-                return BrowserState.close_tab(self.active_tab_id)
+                return self.close_tab(self.active_tab_id)
+        elif combo == "Mod+Shift+t":
+            return self.reopen_closed_tab()
+        elif combo in ("Mod+Tab", "Mod+PageDown"):
+            return self._cycle_tab(1)
+        elif combo in ("Mod+Shift+Tab", "Mod+PageUp"):
+            return self._cycle_tab(-1)
+        elif combo in ("Mod+l", "Alt+d", "F6"):
+            return rx.call_script(FOCUS_ADDRESS_BAR_SCRIPT)
 
     @rx.event
     def navigate_to_bookmark(self, url: str):
@@ -204,32 +813,307 @@ class BrowserState(rx.State):
     @rx.event
     def toggle_dev_tools(self):
         self.show_dev_tools = not self.show_dev_tools
+        if self.show_dev_tools:
+            self.refresh_profile()
+
+    @rx.event
+    def refresh_profile(self):
+        snapshot = profiler.snapshot()
+        self.profile_handlers = snapshot["handlers"]
+        self.profile_recomputes = snapshot["recomputes"]
+        self.profile_background_tasks = snapshot["background_tasks"]
+        self.profile_peak_background_tasks = snapshot["peak_background_tasks"]
+        self.profile_sample_rate = snapshot["sample_rate"]
+        self.prefetch_stats = caching_proxy.prefetch_stats()
 
     @rx.event
-    def toggle_statistics(self):
+    def export_profile(self):
+        snapshot = {**profiler.snapshot(), "prefetch": caching_proxy.prefetch_stats()}
+        return rx.download(
+            data=json.dumps(snapshot, indent=2), filename="taviad-profile.json"
+        )
+
+    @rx.event
+    async def toggle_statistics(self):
         self.show_statistics = not self.show_statistics
+        if self.show_statistics:
+            await stats.load_stats(self._profile())
+            self._refresh_statistics()
+            await self._load_history_page(0)
+        else:
+            self.history_page = []
 
     @rx.event
-    def add_bookmark(self):
+    async def older_history_page(self):
+        if self.has_older_history:
+            await self._load_history_page(self.history_page_number + 1)
+
+    @rx.event
+    async def newer_history_page(self):
+        if self.history_page_number > 0:
+            await self._load_history_page(self.history_page_number - 1)
+
+    @rx.event
+    async def search_history(self, query: str):
+        self.history_query = query
+        self.history_search_results = await history_store.search(self._profile(), query)
+
+    @rx.var
+    def bookmark_page_label(self) -> str:
+        if not self.bookmark_item_count:
+            return "No bookmarks"
+        start = self.bookmark_page_number * BOOKMARK_PAGE_SIZE
+        stop = min(start + BOOKMARK_PAGE_SIZE, self.bookmark_item_count)
+        return f"{start + 1}–{stop} of {self.bookmark_item_count}"
+
+    @rx.var
+    def has_more_bookmarks(self) -> bool:
+        stop = (self.bookmark_page_number + 1) * BOOKMARK_PAGE_SIZE
+        return stop < self.bookmark_item_count
+
+    def _load_bookmark_page(self, bookmarks: BookmarkStore, page_number: int):
+        searching = bool(self.bookmark_query.strip())
+        if searching:
+            total = len(self._bookmark_matches)
+        else:
+            total = bookmarks.count(self.bookmark_folder_id)
+        page_number = max(0, min(page_number, (total - 1) // BOOKMARK_PAGE_SIZE))
+        offset = page_number * BOOKMARK_PAGE_SIZE
+        if searching:
+            self.bookmark_folder_items = bookmarks.lookup(
+                self._bookmark_matches[offset : offset + BOOKMARK_PAGE_SIZE]
+            )
+        else:
+            self.bookmark_folder_items = bookmarks.items(
+                self.bookmark_folder_id, BOOKMARK_PAGE_SIZE, offset
+            )
+        self.bookmark_page_number = page_number
+        self.bookmark_item_count = total
+        self._prune_favicons()
+
+    def _refresh_bookmark_views(self, bookmarks: BookmarkStore, *folder_ids: int):
+        if BOOKMARK_BAR_ID in folder_ids:
+            self.bookmark_bar_items = bookmarks.items(
+                BOOKMARK_BAR_ID, BOOKMARK_BAR_LIMIT
+            )
+            self._prune_favicons()
+        if not self.show_bookmark_manager:
+            return
+        if self.bookmark_query.strip():
+            self._bookmark_matches = bookmarks.search(self.bookmark_query)
+            self._load_bookmark_page(bookmarks, self.bookmark_page_number)
+        elif self.bookmark_folder_id in folder_ids:
+            self._load_bookmark_page(bookmarks, self.bookmark_page_number)
+
+    async def _add_bookmark(self, folder_id: int):
         active_tab = self.active_tab
-        if active_tab and (
-            not any((b["url"] == active_tab["url"] for b in self.bookmarks))
-        ):
-            new_bookmark = {
-                "title": active_tab["title"],
-                "url": active_tab["url"],
-                "icon": "file-text",
-            }
-            self.bookmarks.append(new_bookmark)
+        if not active_tab or not active_tab["url"]:
+            return
+        store = await self.get_state(BookmarkStoreState)
+        bookmark = store._bookmarks.add(
+            active_tab["url"], active_tab["title"], folder_id=folder_id
+        )
+        if bookmark is not None:
+            store._mark_changed()
+            self._sync_bookmark_suggestion(bookmark["url"], bookmark["title"], True)
+            self._refresh_bookmark_views(store._bookmarks, folder_id)
+            return self._with_favicons([bookmark["url"]])
+
+    @rx.event
+    async def add_bookmark(self):
+        return await self._add_bookmark(BOOKMARK_BAR_ID)
+
+    @rx.event
+    async def add_bookmark_to_folder(self):
+        return await self._add_bookmark(self.bookmark_folder_id)
+
+    @rx.event
+    async def add_bookmark_folder(self, form_data: dict[str, str]):
+        title = form_data.get("title", "").strip()
+        if not title:
+            return
+        store = await self.get_state(BookmarkStoreState)
+        if store._bookmarks.add_folder(title, self.bookmark_folder_id):
+            store._mark_changed()
+            self._refresh_bookmark_views(store._bookmarks, self.bookmark_folder_id)
+
+    @rx.event
+    async def set_bookmark_manager_open(self, is_open: bool):
+        self.show_bookmark_manager = is_open
+        if is_open:
+            await self._open_bookmark_folder(self.bookmark_folder_id)
+            return self._with_favicons(_bookmark_urls(self.bookmark_folder_items))
+        self.bookmark_folder_items = []
+        self._bookmark_matches = []
+        self._prune_favicons()
 
     @rx.event
-    def remove_bookmark(self, url: str):
-        self.bookmarks = [b for b in self.bookmarks if b["url"] != url]
+    async def open_bookmark_folder(self, folder_id: int):
+        self.show_bookmark_manager = True
+        await self._open_bookmark_folder(folder_id)
+        return self._with_favicons(_bookmark_urls(self.bookmark_folder_items))
+
+    async def _open_bookmark_folder(self, folder_id: int):
+        bookmarks = (await self.get_state(BookmarkStoreState))._bookmarks
+        if not bookmarks.is_folder(folder_id):
+            folder_id = BOOKMARK_BAR_ID
+        self.bookmark_folder_id = folder_id
+        self.bookmark_folder_path = bookmarks.path(folder_id)
+        self.bookmark_query = ""
+        self._bookmark_matches = []
+        self._load_bookmark_page(bookmarks, 0)
+
+    @rx.event
+    async def search_bookmarks(self, query: str):
+        bookmarks = (await self.get_state(BookmarkStoreState))._bookmarks
+        self.bookmark_query = query
+        self._bookmark_matches = bookmarks.search(self.bookmark_query)
+        self._load_bookmark_page(bookmarks, 0)
+        return self._with_favicons(_bookmark_urls(self.bookmark_folder_items))
+
+    @rx.event
+    async def next_bookmark_page(self):
+        bookmarks = (await self.get_state(BookmarkStoreState))._bookmarks
+        self._load_bookmark_page(bookmarks, self.bookmark_page_number + 1)
+        return self._with_favicons(_bookmark_urls(self.bookmark_folder_items))
+
+    @rx.event
+    async def previous_bookmark_page(self):
+        bookmarks = (await self.get_state(BookmarkStoreState))._bookmarks
+        self._load_bookmark_page(bookmarks, self.bookmark_page_number - 1)
+        return self._with_favicons(_bookmark_urls(self.bookmark_folder_items))
+
+    @rx.event
+    async def remove_bookmark(self, bookmark_id: int):
+        store = await self.get_state(BookmarkStoreState)
+        bookmark = store._bookmarks.get(bookmark_id)
+        if bookmark is None:
+            return
+        for removed in store._bookmarks.remove(bookmark_id):
+            self._sync_bookmark_suggestion(removed["url"], "", False)
+        store._mark_changed()
+        self._refresh_bookmark_views(store._bookmarks, bookmark["folder_id"])
 
     @rx.event
-    def edit_bookmark(self, old_url: str, new_title: str, new_url: str):
-        for bookmark in self.bookmarks:
-            if bookmark["url"] == old_url:
-                bookmark["title"] = new_title
-                bookmark["url"] = new_url
-                break
\ No newline at end of file
+    async def edit_bookmark(self, bookmark_id: int, new_title: str, new_url: str):
+        store = await self.get_state(BookmarkStoreState)
+        bookmark = store._bookmarks.get(bookmark_id)
+        if bookmark is None:
+            return
+        old_url = bookmark["url"]
+        if not bookmark["is_folder"] and not urls.is_navigable(new_url):
+            return rx.toast.error(f"{new_url} is not a web address.")
+        if not store._bookmarks.update(bookmark_id, new_title, new_url):
+            return rx.toast.error(f"{new_url} is already bookmarked.")
+        store._mark_changed()
+        if not bookmark["is_folder"]:
+            self._sync_bookmark_suggestion(old_url, "", False)
+            self._sync_bookmark_suggestion(new_url, new_title, True)
+        self._refresh_bookmark_views(store._bookmarks, bookmark["folder_id"])
+        return self._with_favicons([new_url])
+
+    @rx.event
+    async def move_bookmark(self, bookmark_id: int, folder_id: int):
+        store = await self.get_state(BookmarkStoreState)
+        bookmark = store._bookmarks.get(bookmark_id)
+        if bookmark is None:
+            return
+        old_folder_id = bookmark["folder_id"]
+        if store._bookmarks.move(bookmark_id, folder_id):
+            store._mark_changed()
+            self._refresh_bookmark_views(store._bookmarks, old_folder_id, folder_id)
+            return self._with_favicons([bookmark["url"]])
+
+    @rx.event
+    async def upload_import(self, files: list[rx.UploadFile]):
+        if self.importing or not files:
+            return
+        fd, path = tempfile.mkstemp(prefix="taviad-import-")
+        with os.fdopen(fd, "wb") as out:
+            await asyncio.to_thread(shutil.copyfileobj, files[0].file, out)
+        self.importing = True
+        self.import_progress = 0
+        self.import_status = f"Reading {files[0].name or 'file'}"
+        return BrowserState.run_import(path)
+
+    @rx.event(background=True)
+    async def run_import(self, path: str):
+        imported_visits = 0
+        imported_bookmarks = 0
+        profile = None
+        status = "Import failed."
+        try:
+            source = await asyncio.to_thread(detect_format, path)
+            async with self:
+                profile = self._profile()
+            total = await count_visits(path, source)
+            async with contextlib.aclosing(read_visits(path, source)) as batches:
+                async for visits in batches:
+                    await history_store.import_visits(profile, visits)
+                    imported_visits += len(visits)
+                    async with self:
+                        if total:
+                            self.import_progress = imported_visits * 100 // total
+                        self.import_status = (
+                            f"Imported {imported_visits:,} of {total:,} visits"
+                        )
+            folders: dict[str, int] = {}
+            root_id = None
+            async with contextlib.aclosing(read_bookmarks(path, source)) as batches:
+                async for items in batches:
+                    async with self:
+                        store = await self.get_state(BookmarkStoreState)
+                        if root_id is None:
+                            root_id = store._bookmarks.add_folder(
+                                f"Imported ({source.title()})"
+                            )["id"]
+                            folders[""] = root_id
+                        for item in items:
+                            parent_id = folders.get(item["parent"], root_id)
+                            if item["url"]:
+                                if store._bookmarks.add(
+                                    item["url"], item["title"], folder_id=parent_id
+                                ):
+                                    imported_bookmarks += 1
+                            else:
+                                folder = store._bookmarks.add_folder(
+                                    item["title"], parent_id
+                                )
+                                folders[item["key"]] = folder["id"]
+                        store._mark_changed()
+                        self.import_status = (
+                            f"Imported {imported_bookmarks:,} bookmarks"
+                        )
+                        self._refresh_bookmark_views(store._bookmarks, BOOKMARK_BAR_ID)
+            omnibox.invalidate_index(profile)
+            stats.invalidate_stats(profile)
+            status = (
+                f"Imported {imported_visits:,} visits and "
+                f"{imported_bookmarks:,} bookmarks."
+            )
+        except (ImportFormatError, sqlite3.Error, OSError) as e:
+            status = f"Import failed: {e}"
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            history = None
+            if profile is not None:
+                with contextlib.suppress(sqlite3.Error):
+                    await stats.load_stats(profile)
+                    history = await history_store.recent(
+                        profile, math.inf, HISTORY_PAGE_SIZE + 1
+                    )
+            async with self:
+                self.importing = False
+                self.import_progress = 100
+                self.import_status = status
+                if self.show_statistics and history is not None:
+                    self._refresh_statistics()
+                    self._history_page_cursors = [math.inf]
+                    self._show_history_page(0, history)
+                favicon_events = self._with_favicons(
+                    _bookmark_urls(
+                        [*self.bookmark_bar_items, *self.bookmark_folder_items]
+                    )
+                )
+        return favicon_events
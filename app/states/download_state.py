@@ -1,93 +1,240 @@
 import reflex as rx
-import asyncio
+import contextlib
+import httpx
 from typing import TypedDict, Literal
+from app.download_engine import (
+    SHA256_RE,
+    DownloadError,
+    IntegrityError,
+    filename_for,
+    finish_control,
+    get_control,
+    new_download_path,
+    remove_download_files,
+    run_transfer,
+    start_control,
+)
+from app.profiler import profiler
+from app.proxy import ProxyError, is_proxyable
 
 
 class DownloadItem(TypedDict):
     id: int
     name: str
-    status: Literal["In Progress", "Completed", "Paused", "Cancelled"]
+    status: Literal[
+        "Queued",
+        "In Progress",
+        "Verifying",
+        "Completed",
+        "Paused",
+        "Cancelled",
+        "Failed",
+        "Corrupt",
+    ]
+    priority: int
     progress: int
     url: str
+    sha256: str
+    size_text: str
+
+
+ACTIVE_STATUSES = ("Queued", "In Progress", "Verifying")
+PHASE_STATUSES = {"downloading": "In Progress", "verifying": "Verifying"}
+
+
+def _format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    value = float(size)
+    for unit in ("KB", "MB", "GB"):
+        value /= 1024
+        if value < 1024:
+            break
+    return f"{value:.1f} {unit}"
+
+
+def _size_text(received: int, total: int) -> str:
+    if total:
+        return f"{_format_size(received)} of {_format_size(total)}"
+    return _format_size(received)
 
 
 class DownloadState(rx.State):
     downloads: list[DownloadItem] = []
     next_download_id: int = 1
+    _download_index: dict[int, int] = {}
+    _download_paths: dict[int, str] = {}
+
+    def _find_download(self, download_id: int) -> DownloadItem | None:
+        download_index = self._download_index.get(download_id)
+        if download_index is None:
+            return None
+        return self.downloads[download_index]
+
+    def _remove_downloads(self, download_ids: set[int]):
+        self.downloads = [d for d in self.downloads if d["id"] not in download_ids]
+        self._download_index = {d["id"]: i for i, d in enumerate(self.downloads)}
+
+    @rx.event
+    def start_download(self, form_data: dict[str, str]):
+        url = form_data.get("url", "").strip()
+        if not url.startswith(("http://", "https://")):
+            return rx.toast.error("Enter an http:// or https:// URL to download.")
+        try:
+            httpx.URL(url)
+        except httpx.InvalidURL:
+            return rx.toast.error(f"{url} is not a valid URL.")
+        if not is_proxyable(url):
+            return rx.toast.error("Downloads from private addresses are not allowed.")
+        sha256 = form_data.get("sha256", "").strip()
+        if sha256 and not SHA256_RE.fullmatch(sha256):
+            return rx.toast.error("SHA-256 digests are 64 hexadecimal characters.")
+        download_id = self.next_download_id
+        self.next_download_id += 1
+        name = filename_for(url)
+        self._download_paths[download_id] = new_download_path(name)
+        new_download = {
+            "id": download_id,
+            "name": name,
+            "status": "Queued",
+            "priority": download_id,
+            "progress": 0,
+            "url": url,
+            "sha256": sha256.lower(),
+            "size_text": "",
+        }
+        self.downloads.append(new_download)
+        self._download_index[download_id] = len(self.downloads) - 1
+        return DownloadState.run_download(download_id)
 
     @rx.event(background=True)
-    async def start_dummy_download(self):
+    async def run_download(self, download_id: int):
+        token = self.router.session.client_token
         async with self:
-            download_id = self.next_download_id
-            self.next_download_id += 1
-            new_download = {
-                "id": download_id,
-                "name": f"dummy_file_{download_id}.zip",
-                "status": "In Progress",
-                "progress": 0,
-                "url": "/placeholder.svg",
-            }
-            self.downloads.insert(0, new_download)
-        for i in range(101):
-            if i > 50:
-                async with self:
-                    is_paused = any(
-                        (
-                            d["id"] == download_id and d["status"] == "Paused"
-                            for d in self.downloads
-                        )
-                    )
-                if is_paused:
-                    while True:
-                        await asyncio.sleep(0.5)
+            d = self._find_download(download_id)
+            if d is None or d["status"] not in ACTIVE_STATUSES:
+                return
+            control = start_control(token, download_id, d["priority"], d["sha256"])
+            if control is None:
+                return
+            url = d["url"]
+            path = self._download_paths[download_id]
+        status = None
+        try:
+            transfer = run_transfer(url, path, control)
+            async with contextlib.aclosing(transfer) as frames:
+                async for phase, received, total in frames:
+                    with profiler.measure("download_tick"):
                         async with self:
-                            is_still_paused = any(
-                                (
-                                    d["id"] == download_id and d["status"] == "Paused"
-                                    for d in self.downloads
-                                )
-                            )
-                            is_cancelled = not any(
-                                (d["id"] == download_id for d in self.downloads)
-                            )
-                        if not is_still_paused or is_cancelled:
-                            break
-                        if is_cancelled:
-                            return
-            await asyncio.sleep(0.05)
-            async with self:
-                found = False
-                for d in self.downloads:
-                    if d["id"] == download_id:
-                        d["progress"] = i
-                        found = True
-                        break
-                if not found:
-                    return
+                            d = self._find_download(download_id)
+                            if d is not None:
+                                if (
+                                    phase in PHASE_STATUSES
+                                    and d["status"] in ACTIVE_STATUSES
+                                ):
+                                    d["status"] = PHASE_STATUSES[phase]
+                                d["progress"] = received * 100 // total if total else 0
+                                d["size_text"] = _size_text(received, total)
+            if control.action is None:
+                status = "Completed"
+        except IntegrityError:
+            status = "Corrupt"
+        except (
+            DownloadError,
+            ProxyError,
+            httpx.HTTPError,
+            httpx.InvalidURL,
+            OSError,
+            ValueError,
+        ):
+            status = "Failed"
+        finally:
+            finish_control(token, download_id)
+        if control.action == "cancel":
+            remove_download_files(path)
+            return
         async with self:
-            for d in self.downloads:
-                if d["id"] == download_id:
-                    d["status"] = "Completed"
-                    break
+            d = self._find_download(download_id)
+            if d is None:
+                return
+            if status is not None:
+                d["status"] = status
+                if status == "Completed":
+                    d["progress"] = 100
+            elif d["status"] in ACTIVE_STATUSES:
+                return DownloadState.run_download(download_id)
 
     @rx.event
     def pause_download(self, download_id: int):
-        for d in self.downloads:
-            if d["id"] == download_id and d["status"] == "In Progress":
-                d["status"] = "Paused"
-                break
+        d = self._find_download(download_id)
+        if d is not None and d["status"] in ACTIVE_STATUSES:
+            d["status"] = "Paused"
+            control = get_control(self.router.session.client_token, download_id)
+            if control is not None:
+                control.stop("pause")
 
     @rx.event
     def resume_download(self, download_id: int):
-        for d in self.downloads:
-            if d["id"] == download_id and d["status"] == "Paused":
-                d["status"] = "In Progress"
-                break
+        d = self._find_download(download_id)
+        if d is not None and d["status"] in ("Paused", "Failed", "Corrupt"):
+            d["status"] = "Queued"
+            return DownloadState.run_download(download_id)
+
+    def _set_priority(self, d: DownloadItem, priority: int):
+        d["priority"] = priority
+        control = get_control(self.router.session.client_token, d["id"])
+        if control is not None:
+            control.reprioritize(priority)
+
+    @rx.event
+    def move_download(self, download_id: int, delta: int):
+        d = self._find_download(download_id)
+        if d is None or d["status"] != "Queued":
+            return
+        queued = sorted(
+            (q for q in self.downloads if q["status"] == "Queued"),
+            key=lambda q: q["priority"],
+        )
+        position = next(i for i, q in enumerate(queued) if q["id"] == download_id)
+        if not 0 <= position + delta < len(queued):
+            return
+        other = queued[position + delta]
+        priority = d["priority"]
+        self._set_priority(d, other["priority"])
+        self._set_priority(other, priority)
+        i = self._download_index[download_id]
+        j = self._download_index[other["id"]]
+        self.downloads[i], self.downloads[j] = self.downloads[j], self.downloads[i]
+        self._download_index[download_id] = j
+        self._download_index[other["id"]] = i
+
+    @rx.event
+    def download_next(self, download_id: int):
+        d = self._find_download(download_id)
+        if d is None or d["status"] != "Queued":
+            return
+        first = min(q["priority"] for q in self.downloads if q["status"] == "Queued")
+        if d["priority"] != first:
+            self._set_priority(d, first - 1)
 
     @rx.event
     def cancel_download(self, download_id: int):
-        self.downloads = [d for d in self.downloads if d["id"] != download_id]
+        d = self._find_download(download_id)
+        if d is None:
+            return
+        self._remove_downloads({download_id})
+        path = self._download_paths.pop(download_id, "")
+        if d["status"] == "Completed":
+            return
+        control = get_control(self.router.session.client_token, download_id)
+        if control is not None:
+            control.stop("cancel")
+        else:
+            remove_download_files(path)
 
     @rx.event
     def clear_completed_downloads(self):
-        self.downloads = [d for d in self.downloads if d["status"] != "Completed"]
\ No newline at end of file
+        completed = {d["id"] for d in self.downloads if d["status"] == "Completed"}
+        for download_id in completed:
+            self._download_paths.pop(download_id, None)
+        self._remove_downloads(completed)
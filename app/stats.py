@@ -0,0 +1,203 @@
+import bisect
+import math
+from collections import Counter, OrderedDict
+from typing import TypedDict
+
+from app import urls
+from app.history_store import history_store
+
+
+class SiteCount(TypedDict):
+    domain: str
+    visits: int
+
+
+class SiteLoadTime(TypedDict):
+    domain: str
+    loads: int
+    p50_ms: int
+    p95_ms: int
+
+
+LOAD_TIME_MIN_MS = 10.0
+LOAD_TIME_GROWTH = 1.2
+LOAD_TIME_BUCKETS = 53
+MAX_LOAD_TIME_DOMAINS = 200
+MAX_LOADED_PROFILES = 64
+_LOG_GROWTH = math.log(LOAD_TIME_GROWTH)
+
+
+def load_time_bucket(elapsed_ms: float) -> int:
+    if elapsed_ms <= LOAD_TIME_MIN_MS:
+        return 0
+    bucket = math.ceil(math.log(elapsed_ms / LOAD_TIME_MIN_MS) / _LOG_GROWTH)
+    return min(bucket, LOAD_TIME_BUCKETS)
+
+
+class LoadTimeHistogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * (LOAD_TIME_BUCKETS + 1)
+        self.total = 0
+
+    def add(self, bucket: int, count: int = 1):
+        self.counts[max(0, min(bucket, LOAD_TIME_BUCKETS))] += count
+        self.total += count
+
+    def percentile(self, percent: float) -> int:
+        rank = math.ceil(self.total * percent / 100)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return round(
+                    LOAD_TIME_MIN_MS * LOAD_TIME_GROWTH ** max(0, bucket - 0.5)
+                )
+        return 0
+
+
+class LoadTimeStats:
+    __slots__ = ("histograms",)
+
+    def __init__(self):
+        self.histograms: dict[str, LoadTimeHistogram] = {}
+
+    def record(self, domain: str, bucket: int, count: int = 1):
+        if not domain or count <= 0:
+            return
+        histogram = self.histograms.pop(domain, None)
+        if histogram is None:
+            histogram = LoadTimeHistogram()
+            if len(self.histograms) >= MAX_LOAD_TIME_DOMAINS:
+                del self.histograms[next(iter(self.histograms))]
+        self.histograms[domain] = histogram
+        histogram.add(bucket, count)
+
+    def top(self, k: int) -> list[SiteLoadTime]:
+        busiest = sorted(
+            self.histograms.items(), key=lambda item: item[1].total, reverse=True
+        )
+        return [
+            {
+                "domain": domain,
+                "loads": histogram.total,
+                "p50_ms": histogram.percentile(50),
+                "p95_ms": histogram.percentile(95),
+            }
+            for domain, histogram in busiest[:k]
+        ]
+
+
+class VisitStats:
+    __slots__ = ("counts", "buckets", "levels", "total_visits")
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.buckets: dict[int, dict[str, None]] = {}
+        self.levels: list[int] = []
+        self.total_visits = 0
+
+    def __getstate__(self):
+        return self.counts, self.total_visits
+
+    def __setstate__(self, state):
+        counts, total_visits = state
+        self.counts = counts
+        self.total_visits = total_visits
+        self.buckets = {}
+        for domain, count in counts.items():
+            self.buckets.setdefault(count, {})[domain] = None
+        self.levels = sorted(self.buckets)
+
+    @property
+    def unique_domains(self) -> int:
+        return len(self.counts)
+
+    def _move(self, domain: str, old: int, new: int):
+        if old:
+            bucket = self.buckets[old]
+            del bucket[domain]
+            if not bucket:
+                del self.buckets[old]
+                del self.levels[bisect.bisect_left(self.levels, old)]
+        bucket = self.buckets.get(new)
+        if bucket is None:
+            bucket = self.buckets[new] = {}
+            bisect.insort(self.levels, new)
+        bucket[domain] = None
+
+    def record(self, domain: str, visits: int = 1):
+        if not domain or visits <= 0:
+            return
+        old = self.counts.get(domain, 0)
+        self.counts[domain] = old + visits
+        self.total_visits += visits
+        self._move(domain, old, old + visits)
+
+    def top(self, k: int) -> list[SiteCount]:
+        result: list[SiteCount] = []
+        for level in reversed(self.levels):
+            for domain in self.buckets[level]:
+                result.append({"domain": domain, "visits": level})
+                if len(result) == k:
+                    return result
+        return result
+
+
+class ProfileStats:
+    __slots__ = ("load_times", "visits")
+
+    def __init__(self):
+        self.visits = VisitStats()
+        self.load_times = LoadTimeStats()
+
+
+_profiles: "OrderedDict[str, ProfileStats]" = OrderedDict()
+
+
+def get_loaded_stats(profile: str) -> ProfileStats | None:
+    return _profiles.get(profile)
+
+
+def invalidate_stats(profile: str):
+    _profiles.pop(profile, None)
+
+
+def record_visit(profile: str, url: str):
+    stats = _profiles.get(profile)
+    if stats is not None:
+        stats.visits.record(urls.registrable_domain(url))
+
+
+def record_load_time(profile: str, url: str, load_ms: float):
+    domain = urls.registrable_domain(url)
+    if not domain or load_ms < 0:
+        return
+    bucket = load_time_bucket(load_ms)
+    history_store.record_load_time(profile, domain, bucket)
+    stats = _profiles.get(profile)
+    if stats is not None:
+        stats.load_times.record(domain, bucket)
+
+
+async def load_stats(profile: str) -> ProfileStats:
+    stats = _profiles.get(profile)
+    if stats is not None:
+        _profiles.move_to_end(profile)
+        return stats
+    await history_store.flush()
+    stats = ProfileStats()
+    domains = Counter()
+    for host, visit_count in await history_store.host_visit_counts(profile):
+        domains[urls.registrable_domain(f"https://{host}/")] += visit_count
+    for domain, visit_count in domains.items():
+        stats.visits.record(domain, visit_count)
+    for domain, bucket, count in await history_store.load_times(profile):
+        stats.load_times.record(domain, bucket, count)
+    if profile in _profiles:
+        return _profiles[profile]
+    _profiles[profile] = stats
+    while len(_profiles) > MAX_LOADED_PROFILES:
+        _profiles.popitem(last=False)
+    return stats
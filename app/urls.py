@@ -0,0 +1,170 @@
+import functools
+import ipaddress
+import re
+
+from yarl import URL
+
+URL_CACHE_SIZE = 4096
+
+SEARCH_ENGINES = {
+    "Google": "https://www.google.com/search",
+    "DuckDuckGo": "https://duckduckgo.com/",
+    "Bing": "https://www.bing.com/search",
+}
+
+PUBLIC_SUFFIXES = frozenset(
+    """
+    com net org edu gov mil int info biz name pro mobi asia tel travel jobs aero
+    coop museum cat post xxx arpa
+    app dev io ai co me tv cc ws fm gg ly to sh ac la vc so is im am nu tk ml ga cf
+    xyz top site online store shop tech blog news page cloud art live link club
+    website space fun icu vip work life world today email solutions agency design
+    digital studio media network systems zone wiki social one run host press
+    academy center company consulting group guru ninja photography plus tools
+    ad ae af ag al ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo
+    br bs bt bw by bz ca cd cg ch ci ck cl cm cn cr cu cv cw cx cy cz de dj dk dm
+    do dz ec ee eg er es et eu fi fj fk fo fr gb gd ge gf gh gi gl gm gn gp gq gr
+    gt gu gw gy hk hn hr ht hu id ie il in iq ir it je jm jo jp ke kg kh ki km kn
+    kp kr kw ky kz lb lc li lk lr ls lt lu lv ma mc md mg mh mk mm mn mo mp mq mr
+    ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nz om pa pe pf pg ph pk
+    pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg si sk sl sm sn sr
+    ss st su sv sx sy sz tc td tf tg th tj tl tm tn tr tt tw tz ua ug uk us uy uz
+    va ve vg vi vn vu wf ye yt za zm zw
+    co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk nhs.uk police.uk
+    com.au net.au org.au edu.au gov.au asn.au id.au
+    co.jp ne.jp or.jp ac.jp go.jp ed.jp gr.jp lg.jp
+    co.nz net.nz org.nz govt.nz ac.nz school.nz
+    com.br net.br org.br gov.br edu.br art.br
+    com.cn net.cn org.cn gov.cn edu.cn ac.cn
+    com.tw net.tw org.tw edu.tw gov.tw idv.tw
+    com.hk net.hk org.hk edu.hk gov.hk idv.hk
+    co.in net.in org.in gov.in ac.in edu.in firm.in gen.in ind.in
+    co.kr or.kr ne.kr ac.kr go.kr re.kr
+    co.za org.za gov.za ac.za net.za web.za
+    co.il org.il net.il ac.il gov.il muni.il
+    co.id or.id ac.id go.id web.id my.id
+    co.th in.th ac.th go.th or.th
+    com.mx org.mx gob.mx edu.mx net.mx
+    com.ar net.ar org.ar gob.ar edu.ar
+    com.tr net.tr org.tr gov.tr edu.tr bel.tr
+    com.sg net.sg org.sg gov.sg edu.sg
+    com.my net.my org.my gov.my edu.my
+    com.ua net.ua org.ua gov.ua edu.ua in.ua kiev.ua
+    com.ru net.ru org.ru msk.ru spb.ru
+    com.pl net.pl org.pl gov.pl edu.pl waw.pl
+    com.es org.es nom.es gob.es edu.es
+    com.pt org.pt gov.pt edu.pt
+    com.vn net.vn org.vn gov.vn edu.vn
+    com.ph net.ph org.ph gov.ph edu.ph
+    com.pk net.pk org.pk gov.pk edu.pk
+    com.eg org.eg gov.eg edu.eg
+    com.sa net.sa org.sa gov.sa edu.sa
+    co.ke or.ke ac.ke go.ke
+    com.ng org.ng gov.ng edu.ng
+    com.co net.co org.co gov.co edu.co
+    com.pe org.pe gob.pe edu.pe
+    com.ve org.ve gob.ve
+    co.at or.at ac.at gv.at
+    github.io gitlab.io githubusercontent.com herokuapp.com vercel.app
+    netlify.app pages.dev workers.dev web.app firebaseapp.com appspot.com
+    blogspot.com cloudfront.net azurewebsites.net s3.amazonaws.com fly.dev
+    onrender.com glitch.me repl.co ngrok.io ngrok-free.app readthedocs.io
+    """.split()
+)
+
+_SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+_LABEL_RE = re.compile(r"^(?!-)[a-z0-9-]{1,63}(?<!-)$")
+_NAVIGABLE_SCHEMES = ("http", "https")
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_local(host: str) -> bool:
+    return host == "localhost" or host.endswith(".localhost") or _is_ip(host)
+
+
+def _is_public_host(host: str) -> bool:
+    labels = host.split(".")
+    if len(labels) < 2 or not all(_LABEL_RE.match(label) for label in labels):
+        return False
+    return labels[-1] in PUBLIC_SUFFIXES or labels[-1].startswith("xn--")
+
+
+def _parse(text: str, has_scheme: bool) -> URL | None:
+    try:
+        url = URL(text if has_scheme else f"http://{text}")
+        host = url.raw_host
+    except (ValueError, UnicodeError):
+        return None
+    if not host or url.scheme not in _NAVIGABLE_SCHEMES:
+        return None
+    if has_scheme or _is_local(host) or _is_public_host(host):
+        if not has_scheme and not _is_local(host):
+            url = url.with_scheme("https")
+        return url
+    return None
+
+
+def is_navigable(url: str) -> bool:
+    return _SCHEME_RE.match(url) is not None and _parse(url, True) is not None
+
+
+def search_url(query: str, search_engine: str) -> str:
+    base = SEARCH_ENGINES.get(search_engine, SEARCH_ENGINES["Google"])
+    return str(URL(base).with_query(q=query))
+
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
+def resolve(text: str, search_engine: str) -> tuple[str, bool]:
+    text = text.strip()
+    has_scheme = _SCHEME_RE.match(text) is not None
+    if text.lower().startswith("about:") and " " not in text:
+        return text.lower(), False
+    if has_scheme or not any(char.isspace() for char in text):
+        url = _parse(text, has_scheme)
+        if url is not None:
+            return str(url), False
+    return search_url(text, search_engine), True
+
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
+def display_host(url: str) -> str:
+    try:
+        host = URL(url).host
+    except (ValueError, UnicodeError):
+        return url
+    if not host:
+        return url
+    return host.removeprefix("www.")
+
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
+def registrable_domain(url: str) -> str:
+    try:
+        host = URL(url).raw_host
+    except (ValueError, UnicodeError):
+        return ""
+    if not host:
+        return ""
+    host = host.rstrip(".").lower()
+    if _is_local(host):
+        return host
+    labels = host.split(".")
+    for start in range(len(labels)):
+        if ".".join(labels[start:]) in PUBLIC_SUFFIXES:
+            break
+    else:
+        start = len(labels) - 1
+    if start == 0:
+        return host
+    domain = ".".join(labels[start - 1 :])
+    try:
+        return domain.encode("ascii").decode("idna")
+    except UnicodeError:
+        return domain
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+
+from aiohttp import web
+from reflex.constants import RouteVar
+from reflex.istate.data import RouterData
+from reflex.istate.proxy import StateProxy
+from reflex.state import State, _substate_key
+
+from app import download_engine, proxy
+from app.app import app
+from app.download_scheduler import scheduler
+from app.states.download_state import DownloadState
+
+TOKEN = "benchmark"
+CHUNK_SIZE = 64 * 2**10
+
+
+class DeltaCounter:
+    def __init__(self):
+        self.deltas = 0
+
+    async def emit_update(self, update, token=None, sid=None):
+        if update.delta:
+            self.deltas += 1
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _file_server(size: int, delay: float) -> web.Application:
+    data = os.urandom(size)
+
+    async def serve(request: web.Request) -> web.StreamResponse:
+        if request.path.endswith(".sha256"):
+            return web.Response(status=404)
+        if "Range" in request.headers:
+            return web.Response(status=416)
+        response = web.StreamResponse(headers={"Content-Type": "text/plain"})
+        response.content_length = len(data)
+        await response.prepare(request)
+        for start in range(0, len(data), CHUNK_SIZE):
+            await response.write(data[start : start + CHUNK_SIZE])
+            await asyncio.sleep(delay)
+        return response
+
+    server = web.Application()
+    server.router.add_get("/{name}", serve)
+    return server
+
+
+def _time_lock_holds(holds: list[float]):
+    modify_state = app.modify_state
+
+    @contextlib.asynccontextmanager
+    async def timed_modify_state(token: str, background: bool = False):
+        async with modify_state(token, background) as state:
+            started = time.perf_counter()
+            try:
+                yield state
+            finally:
+                holds.append(time.perf_counter() - started)
+
+    app.modify_state = timed_modify_state
+
+
+async def _state() -> DownloadState:
+    root = await app.state_manager.get_state(_substate_key(TOKEN, DownloadState))
+    return root.get_substate(DownloadState.get_full_name().split(".")[1:])
+
+
+async def run(args) -> dict:
+    from reflex.istate.manager.memory import StateManagerMemory
+
+    app._state_manager = StateManagerMemory(state=State)
+    runner = web.AppRunner(_file_server(args.size_kb * 2**10, args.delay))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    counter = DeltaCounter()
+    holds: list[float] = []
+    app._event_namespace = counter
+    _time_lock_holds(holds)
+    async with app.modify_state(_substate_key(TOKEN, DownloadState)) as root:
+        root.router = RouterData.from_router_data({RouteVar.CLIENT_TOKEN: TOKEN})
+        state = root.get_substate(DownloadState.get_full_name().split(".")[1:])
+        for index in range(args.downloads):
+            DownloadState.start_download.fn(state, {"url": f"{base_url}/{index}.txt"})
+    holds.clear()
+    counter.deltas = 0
+    proxy = StateProxy(await _state())
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            DownloadState.run_download.fn(proxy, download_id)
+            for download_id in range(1, args.downloads + 1)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    await download_engine.get_client().aclose()
+    statuses = [download["status"] for download in (await _state()).downloads]
+    return {
+        "elapsed": elapsed,
+        "completed": statuses.count("Completed"),
+        "deltas": counter.deltas,
+        "lock_holds": len(holds),
+        "lock_total_ms": sum(holds) * 1000,
+        "lock_p50_ms": _percentile(holds, 50) * 1000,
+        "lock_p99_ms": _percentile(holds, 99) * 1000,
+        "lock_max_ms": max(holds, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run simultaneous downloads in one session and report state "
+        "lock hold times and websocket deltas. "
+        "Run from the repository root: python -m benchmarks.downloads"
+    )
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--delay", type=float, default=0.01)
+    args = parser.parse_args()
+    scheduler.max_active = scheduler.max_per_host = args.downloads
+    proxy.PROXY_ALLOW_PRIVATE = True
+    with tempfile.TemporaryDirectory() as directory:
+        download_engine.DOWNLOAD_DIR = directory
+        summary = asyncio.run(run(args))
+    print(
+        f"{args.downloads} simultaneous downloads x {args.size_kb} KB, "
+        f"{args.delay * 1000:.0f} ms between 64 KB chunks"
+    )
+    print(f"  completed:        {summary['completed']}/{args.downloads}")
+    print(f"  elapsed:          {summary['elapsed']:.2f} s")
+    print(f"  websocket deltas: {summary['deltas']}")
+    print(
+        f"  state lock holds: {summary['lock_holds']}, "
+        f"{summary['lock_total_ms']:.1f} ms total, "
+        f"p50 {summary['lock_p50_ms']:.3f} ms, "
+        f"p99 {summary['lock_p99_ms']:.3f} ms, "
+        f"max {summary['lock_max_ms']:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
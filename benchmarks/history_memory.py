@@ -0,0 +1,66 @@
+import argparse
+import gc
+import tracemalloc
+
+from app.history import DEFAULT_HISTORY_LIMIT, TabHistory
+
+
+def _visit_url(visit: int, sites: int) -> str:
+    site = visit % sites
+    return f"https://popular{site}.example.com/articles/{site}"
+
+
+def _list_session(tabs: int, visits: int, sites: int, limit: int) -> list[list[str]]:
+    return [
+        ["about:blank", *(_visit_url(visit, sites) for visit in range(visits))]
+        for _ in range(tabs)
+    ]
+
+
+def _history_session(
+    tabs: int, visits: int, sites: int, limit: int
+) -> dict[int, TabHistory]:
+    histories = {}
+    for tab_id in range(tabs):
+        history = histories[tab_id] = TabHistory("about:blank", limit)
+        for visit in range(visits):
+            history.push(_visit_url(visit, sites))
+    return histories
+
+
+def _measure(build, sessions: int, *shape) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(*shape) for _ in range(sessions)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / sessions / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure per-session tab history memory with tracemalloc. "
+        "Run from the repository root: python -m benchmarks.history_memory"
+    )
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--tabs", type=int, default=10)
+    parser.add_argument("--visits", type=int, default=300)
+    parser.add_argument("--sites", type=int, default=40)
+    parser.add_argument("--limit", type=int, default=DEFAULT_HISTORY_LIMIT)
+    args = parser.parse_args()
+    shape = (args.tabs, args.visits, args.sites, args.limit)
+    lists_kb = _measure(_list_session, args.sessions, *shape)
+    history_kb = _measure(_history_session, args.sessions, *shape)
+    print(
+        f"{args.sessions} sessions x {args.tabs} tabs x {args.visits} visits "
+        f"over {args.sites} sites, limit {args.limit}"
+    )
+    print(f"  unbounded url lists: {lists_kb:8.1f} KB/session")
+    print(f"  TabHistory:          {history_kb:8.1f} KB/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import psutil
+
+from app.bookmarks import BookmarkStore
+from app.history_store import HistoryStore
+from app.importer import (
+    CHROME_EPOCH_OFFSET,
+    count_visits,
+    detect_format,
+    read_bookmarks,
+    read_visits,
+)
+
+CHROME_SCHEMA = """
+CREATE TABLE urls (
+    id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+    visit_count INTEGER DEFAULT 0 NOT NULL, last_visit_time INTEGER NOT NULL
+);
+CREATE TABLE visits (
+    id INTEGER PRIMARY KEY, url INTEGER NOT NULL, visit_time INTEGER NOT NULL
+);
+"""
+
+
+def _write_chrome_history(path: str, urls: int, visits: int):
+    rng = random.Random(1)
+    base = (1_700_000_000 + CHROME_EPOCH_OFFSET) * 10**6
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        conn.executescript(CHROME_SCHEMA)
+        conn.executemany(
+            "INSERT INTO urls (id, url, title, last_visit_time) VALUES (?, ?, ?, 0)",
+            (
+                (i, f"https://host{i % 3000}.example.com/page/{i}", f"Page {i}")
+                for i in range(1, urls + 1)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO visits (id, url, visit_time) VALUES (?, ?, ?)",
+            ((i, rng.randint(1, urls), base + i * 10**6) for i in range(1, visits + 1)),
+        )
+        conn.commit()
+
+
+def _write_netscape_bookmarks(path: str, bookmarks: int):
+    with open(path, "w") as file:
+        file.write("<!DOCTYPE NETSCAPE-Bookmark-file-1>\n<H1>Bookmarks</H1>\n<DL><p>\n")
+        for folder in range(0, bookmarks, 1000):
+            file.write(f"<DT><H3>Folder {folder}</H3>\n<DL><p>\n")
+            file.writelines(
+                f'<DT><A HREF="https://nb{folder}.example/{i}">Item {i}</A>\n'
+                for i in range(folder, min(folder + 1000, bookmarks))
+            )
+            file.write("</DL><p>\n")
+        file.write("</DL><p>\n")
+
+
+async def _watch_stalls(stalls: list[float], interval: float = 0.01):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def _import_visits(source_path: str, store: HistoryStore) -> int:
+    source = detect_format(source_path)
+    imported = 0
+    async with contextlib.aclosing(read_visits(source_path, source)) as batches:
+        async for visits in batches:
+            await store.import_visits("benchmark", visits)
+            imported += len(visits)
+    return imported
+
+
+async def _import_bookmarks(source_path: str) -> int:
+    store = BookmarkStore()
+    folders: dict[str, int] = {}
+    root_id = store.add_folder("Imported")["id"]
+    imported = 0
+    async with contextlib.aclosing(read_bookmarks(source_path, "netscape")) as batches:
+        async for items in batches:
+            for item in items:
+                parent_id = folders.get(item["parent"], root_id)
+                if not item["url"]:
+                    folder = store.add_folder(item["title"], parent_id)
+                    folders[item["key"]] = folder["id"]
+                elif store.add(item["url"], item["title"], folder_id=parent_id):
+                    imported += 1
+    return imported
+
+
+async def _measure(label: str, run) -> None:
+    stalls: list[float] = []
+    watcher = asyncio.create_task(_watch_stalls(stalls))
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    started = time.perf_counter()
+    count = await run
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    rss_after = process.memory_info().rss
+    print(
+        f"  {label}: {count:,} rows in {elapsed:.2f} s "
+        f"({count / elapsed:,.0f}/s), max event-loop stall "
+        f"{max(stalls, default=0.0) * 1000:.0f} ms, "
+        f"RSS +{(rss_after - rss_before) / 2**20:.0f} MB"
+    )
+
+
+async def run(args, directory: str):
+    chrome_path = os.path.join(directory, "History")
+    netscape_path = os.path.join(directory, "bookmarks.html")
+    _write_chrome_history(chrome_path, args.urls, args.visits)
+    _write_netscape_bookmarks(netscape_path, args.bookmarks)
+    store = HistoryStore(os.path.join(directory, "history.db"))
+    try:
+        print(f"Chrome History: {await count_visits(chrome_path, 'chrome'):,} visits")
+        await _measure("history import", _import_visits(chrome_path, store))
+        print(f"Netscape bookmarks: {args.bookmarks:,}")
+        await _measure("bookmark import", _import_bookmarks(netscape_path))
+    finally:
+        await store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate Chrome History and Netscape bookmark fixtures and "
+        "time importing them. "
+        "Run from the repository root: python -m benchmarks.importer"
+    )
+    parser.add_argument("--visits", type=int, default=1_000_000)
+    parser.add_argument("--urls", type=int, default=50_000)
+    parser.add_argument("--bookmarks", type=int, default=20_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+import psutil
+import socketio
+from aiohttp import web
+
+from app.state import BrowserState
+from app.states.download_state import DownloadState
+
+EVENT_NAMESPACE = "/_event"
+HYDRATE = "reflex___state____state.hydrate"
+BROWSER = BrowserState.get_full_name()
+DOWNLOADS = DownloadState.get_full_name()
+ROUTER_DATA = {"pathname": "/", "query": {}, "asPath": "/"}
+EVENT_TIMEOUT = 30.0
+
+SITES = [
+    "github.com/reflex-dev/reflex",
+    "news.ycombinator.com",
+    "en.wikipedia.org/wiki/Web_browser",
+    "docs.python.org/3/library/asyncio.html",
+    "stackoverflow.com/questions",
+    "www.bbc.co.uk/news",
+    "developer.mozilla.org/en-US/docs/Web/API",
+    "reflex.dev/docs",
+]
+QUERIES = ["python asyncio", "reflex state", "websocket latency", "rust vs go"]
+
+MIX = {
+    "navigate": 30,
+    "update_suggestions": 14,
+    "switch_tab": 14,
+    "add_tab": 8,
+    "close_tab": 6,
+    "go_back": 5,
+    "hotkey": 3,
+    "add_bookmark": 4,
+    "search_bookmarks": 5,
+    "toggle_statistics": 2,
+    "start_download": 3,
+}
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.delta_bytes: dict[str, list[int]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.timeouts = 0
+
+    def record(self, label: str, latency: float, delta_bytes: int):
+        self.latencies[label].append(latency)
+        self.delta_bytes[label].append(delta_bytes)
+
+    def summary(self, sessions: int, elapsed: float) -> dict:
+        labels = {}
+        for label in sorted(self.latencies):
+            latencies = self.latencies[label]
+            sizes = self.delta_bytes[label]
+            labels[label] = {
+                "count": len(latencies),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+                "mean_delta_bytes": round(sum(sizes) / len(sizes)),
+            }
+        latencies = [value for values in self.latencies.values() for value in values]
+        sizes = [value for values in self.delta_bytes.values() for value in values]
+        return {
+            "sessions": sessions,
+            "elapsed_s": round(elapsed, 1),
+            "events": len(latencies),
+            "events_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+            "delta_bytes_per_event": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "delta_bytes_per_session": round(sum(sizes) / sessions) if sessions else 0,
+            "errors": sum(self.errors.values()),
+            "error_reasons": dict(self.errors),
+            "timeouts": self.timeouts,
+            "events_by_type": labels,
+        }
+
+
+class SimulatedSession:
+    def __init__(self, url: str, stats: Stats, download_url: str | None):
+        self.url = url
+        self.stats = stats
+        self.download_url = download_url
+        self.token = str(uuid.uuid4())
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.client.on("event", self._on_update, namespace=EVENT_NAMESPACE)
+        self.browser: dict = {}
+        self._waiter: asyncio.Future | None = None
+        self._delta_bytes = 0
+        self._chained: list[tuple[str, dict]] = []
+
+    async def _on_update(self, update: dict):
+        delta = update.get("delta") or {}
+        self._delta_bytes += len(json.dumps(delta, separators=(",", ":")))
+        for name, values in delta.items():
+            if name == BROWSER:
+                for key, value in values.items():
+                    self.browser[key.removesuffix("_rx_state_")] = value
+        for event in update.get("events") or ():
+            if not event["name"].startswith("_"):
+                self._chained.append((event["name"], event.get("payload") or {}))
+        if update.get("final", True) and self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def send(self, label: str, name: str, payload: dict):
+        queue = [(name, payload)]
+        while queue:
+            name, payload = queue.pop(0)
+            self._chained = []
+            self._delta_bytes = 0
+            self._waiter = asyncio.get_running_loop().create_future()
+            started = time.perf_counter()
+            await self.client.emit(
+                "event",
+                {
+                    "token": self.token,
+                    "name": name,
+                    "payload": payload,
+                    "router_data": ROUTER_DATA,
+                },
+                namespace=EVENT_NAMESPACE,
+            )
+            try:
+                await asyncio.wait_for(self._waiter, EVENT_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                return
+            self.stats.record(label, time.perf_counter() - started, self._delta_bytes)
+            queue.extend(self._chained)
+            label = name.rpartition(".")[2]
+
+    def _next_action(self) -> tuple[str, str, dict]:
+        tab_ids = self.browser.get("tab_ids") or []
+        action = random.choices(list(MIX), weights=list(MIX.values()))[0]
+        if action == "navigate":
+            url = random.choice(SITES + QUERIES)
+            return action, f"{BROWSER}.navigate", {"form_data": {"url": url}}
+        if action == "update_suggestions":
+            text = random.choice(SITES)[: random.randint(1, 8)]
+            generation = self.browser.get("omnibox_generation", 0)
+            return (
+                action,
+                f"{BROWSER}.update_suggestions",
+                {"text": text, "generation": generation},
+            )
+        if action == "switch_tab" and tab_ids:
+            tab_id = random.choice(tab_ids)
+            return action, f"{BROWSER}.switch_tab", {"tab_id": tab_id}
+        if action == "close_tab" and len(tab_ids) > 1:
+            tab_id = random.choice(tab_ids)
+            return action, f"{BROWSER}.close_tab", {"tab_id": tab_id}
+        if action == "go_back":
+            return action, f"{BROWSER}.go_back", {}
+        if action == "hotkey":
+            combo = random.choice(["Mod+Tab", "Mod+Shift+Tab", "Mod+Shift+t"])
+            return action, f"{BROWSER}.handle_hotkey", {"combo": combo}
+        if action == "add_bookmark":
+            return action, f"{BROWSER}.add_bookmark", {}
+        if action == "search_bookmarks":
+            query = random.choice(["git", "reflex", "docs", "news"])
+            return action, f"{BROWSER}.search_bookmarks", {"query": query}
+        if action == "toggle_statistics":
+            return action, f"{BROWSER}.toggle_statistics", {}
+        if action == "start_download" and self.download_url:
+            form_data = {"url": self.download_url, "sha256": ""}
+            return action, f"{DOWNLOADS}.start_download", {"form_data": form_data}
+        return "add_tab", f"{BROWSER}.add_tab", {}
+
+    async def run(self, deadline: float, think_time: float, connected: asyncio.Event):
+        try:
+            await self.client.connect(
+                f"{self.url}?token={self.token}",
+                socketio_path=EVENT_NAMESPACE,
+                transports=["websocket"],
+                namespaces=[EVENT_NAMESPACE],
+            )
+            await self.send("hydrate", HYDRATE, {})
+        except (socketio.exceptions.ConnectionError, OSError) as e:
+            self.stats.errors[f"connect: {e}"[:80]] += 1
+            return
+        finally:
+            connected.set()
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(random.expovariate(1 / think_time))
+                if not self.client.connected:
+                    self.stats.errors["disconnected by server"] += 1
+                    return
+                await self.send(*self._next_action())
+        finally:
+            await self.client.disconnect()
+
+
+def _server_rss(pid: int | None) -> int:
+    if pid is None:
+        return 0
+    try:
+        process = psutil.Process(pid)
+        processes = [process, *process.children(recursive=True)]
+    except psutil.NoSuchProcess:
+        return 0
+    total = 0
+    for process in processes:
+        with contextlib.suppress(psutil.NoSuchProcess):
+            total += process.memory_info().rss
+    return total
+
+
+@contextlib.asynccontextmanager
+async def _download_server(size: int):
+    payload = os.urandom(size)
+
+    async def serve(request: web.Request) -> web.Response:
+        if request.path.endswith(".sha256"):
+            raise web.HTTPNotFound()
+        return web.Response(body=payload, content_type="application/octet-stream")
+
+    app = web.Application()
+    app.router.add_get("/{name}", serve)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}/file.bin"
+    finally:
+        await runner.cleanup()
+
+
+@contextlib.contextmanager
+def _spawn(command: list[str], env: dict[str, str] | None = None):
+    process = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        yield process
+    finally:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            pass
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+@contextlib.contextmanager
+def _spawn_redis_standin(port: int, timeout: float):
+    script = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "redis_standin.py"
+    )
+    with _spawn([sys.executable, script, "--port", str(port)]):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"Redis stand-in did not start on port {port}")
+                time.sleep(0.1)
+        yield f"redis://127.0.0.1:{port}/0"
+
+
+@contextlib.contextmanager
+def _spawn_backend(port: int, workers: int | None, redis_url: str | None):
+    data_dir = tempfile.mkdtemp(prefix="taviad-loadtest-")
+    env = {
+        **os.environ,
+        "TAVIAD_DOWNLOAD_DIR": os.path.join(data_dir, "downloads"),
+        "TAVIAD_HISTORY_DB": os.path.join(data_dir, "history.db"),
+        "TAVIAD_SESSION_DIR": os.path.join(data_dir, "sessions"),
+        "TAVIAD_PROXY_ALLOW_PRIVATE": "1",
+    }
+    if workers is not None:
+        env["GRANIAN_WORKERS"] = str(workers)
+    if redis_url is not None:
+        env["TAVIAD_REDIS_URL"] = redis_url
+    command = [
+        sys.executable, "-m", "reflex", "run", "--env", "prod", "--backend-only",
+        "--backend-port", str(port), "--loglevel", "warning",
+    ]  # fmt: skip
+    with _spawn(command, env) as process:
+        yield process
+
+
+async def _wait_until_up(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(f"{url}/ping")).status_code == 200:
+                    return
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Backend at {url} did not come up within {timeout:.0f}s")
+
+
+async def run_load(args: argparse.Namespace, url: str, server_pid: int | None) -> dict:
+    await _wait_until_up(url, args.startup_timeout)
+    stats = Stats()
+    async with contextlib.AsyncExitStack() as stack:
+        download_url = None
+        if args.download_size:
+            download_url = await stack.enter_async_context(
+                _download_server(args.download_size)
+            )
+        baseline_rss = _server_rss(server_pid)
+        started = time.monotonic()
+        deadline = started + args.ramp + args.duration
+        tasks = []
+        connected = []
+        for index in range(args.sessions):
+            session = SimulatedSession(url, stats, download_url)
+            event = asyncio.Event()
+            connected.append(event)
+            tasks.append(
+                asyncio.create_task(session.run(deadline, args.think_time, event))
+            )
+            await asyncio.sleep(args.ramp / args.sessions)
+        await asyncio.gather(*(event.wait() for event in connected))
+        loaded_rss = _server_rss(server_pid)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.monotonic() - started
+    summary = stats.summary(args.sessions, elapsed)
+    if server_pid is not None:
+        summary["server_rss_mb"] = round(loaded_rss / 2**20, 1)
+        summary["rss_per_session_kb"] = round(
+            (loaded_rss - baseline_rss) / 1024 / args.sessions, 1
+        )
+    return summary
+
+
+def _print_summary(summary: dict):
+    print(
+        f"{summary['sessions']} sessions, {summary['events']} events in "
+        f"{summary['elapsed_s']}s ({summary['events_per_s']}/s), "
+        f"{summary['errors']} errors, {summary['timeouts']} timeouts"
+    )
+    for reason, count in summary["error_reasons"].items():
+        print(f"  {count} x {reason}")
+    print(
+        f"latency p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, "
+        f"max {summary['max_ms']} ms"
+    )
+    print(
+        f"delta {summary['delta_bytes_per_event']} B/event, "
+        f"{summary['delta_bytes_per_session']} B/session"
+    )
+    if "rss_per_session_kb" in summary:
+        print(
+            f"server RSS {summary['server_rss_mb']} MB, "
+            f"{summary['rss_per_session_kb']} KB/session"
+        )
+    print(f"{'event':<22}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'delta B':>10}")
+    for label, row in summary["events_by_type"].items():
+        print(
+            f"{label:<22}{row['count']:>8}{row['p50_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['mean_delta_bytes']:>10}"
+        )
+
+
+def _compare(summary: dict, baseline: dict, tolerance: float) -> bool:
+    regressed = False
+    for key in ("p50_ms", "p99_ms", "delta_bytes_per_event", "rss_per_session_kb"):
+        if key not in summary or not baseline.get(key):
+            continue
+        change = (summary[key] - baseline[key]) / baseline[key] * 100
+        marker = ""
+        if change > tolerance:
+            marker = "  REGRESSION"
+            regressed = True
+        print(
+            f"{key:<24}{baseline[key]:>10} -> {summary[key]:<10} {change:+.1f}%{marker}"
+        )
+    return not regressed
+
+
+def _print_scaling(summaries: dict[int, dict]):
+    base = next(iter(summaries.values()))["events_per_s"] or 1
+    print(f"{'workers':<10}{'events/s':>10}{'speedup':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for workers, summary in summaries.items():
+        print(
+            f"{workers:<10}{summary['events_per_s']:>10}"
+            f"{summary['events_per_s'] / base:>10.2f}"
+            f"{summary['p50_ms']:>10}{summary['p99_ms']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive simulated browser sessions against the Reflex backend. "
+        "Run from the repository root: python -m benchmarks.loadtest"
+    )
+    parser.add_argument("--url", default=None, help="backend URL of a running app")
+    parser.add_argument("--port", type=int, default=8123, help="port when spawning")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--ramp", type=float, default=20.0, help="seconds")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds")
+    parser.add_argument("--download-size", type=int, default=256 * 1024)
+    parser.add_argument("--server-pid", type=int, default=None)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--save", help="write the summary as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="percent")
+    parser.add_argument(
+        "--workers",
+        help="comma-separated granian worker counts to sweep in Redis mode",
+    )
+    parser.add_argument(
+        "--redis-url", help="Redis for spawned backends instead of the stand-in"
+    )
+    parser.add_argument("--redis-port", type=int, default=6399, help="stand-in port")
+    args = parser.parse_args()
+    if args.workers and args.url:
+        parser.error("--workers spawns its own backends; drop --url")
+
+    worker_counts = [None]
+    if args.workers:
+        worker_counts = [int(count) for count in args.workers.split(",")]
+    summaries = {}
+    for workers in worker_counts:
+        with contextlib.ExitStack() as stack:
+            url, server_pid = args.url, args.server_pid
+            if url is None:
+                url = f"http://localhost:{args.port}"
+                redis_url = args.redis_url
+                if workers is not None and redis_url is None:
+                    redis_url = stack.enter_context(
+                        _spawn_redis_standin(args.redis_port, args.startup_timeout)
+                    )
+                backend = _spawn_backend(args.port, workers, redis_url)
+                server_pid = stack.enter_context(backend).pid
+            summary = asyncio.run(run_load(args, url, server_pid))
+        if workers is not None:
+            print(f"--- {workers} worker(s)")
+        _print_summary(summary)
+        summaries[workers] = summary
+    if args.workers:
+        _print_scaling(summaries)
+        summary = {"workers": {str(count): s for count, s in summaries.items()}}
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(summary, file, indent=2)
+    if args.compare and not args.workers:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if not _compare(summary, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
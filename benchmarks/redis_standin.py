@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import fnmatch
+import time
+
+
+class SimpleString(str):
+    pass
+
+
+class ReplyError(str):
+    pass
+
+
+OK = SimpleString("OK")
+QUEUED = SimpleString("QUEUED")
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, ReplyError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, SimpleString):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bool) or isinstance(value, int):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+class RedisStandIn:
+    def __init__(self):
+        self.data: dict[bytes, bytes] = {}
+        self.expires: dict[bytes, float] = {}
+        self.subscribers: dict[bytes, set[asyncio.StreamWriter]] = {}
+
+    def _publish(self, channel: bytes, message: bytes) -> int:
+        receivers = 0
+        for pattern, writers in self.subscribers.items():
+            if fnmatch.fnmatchcase(channel.decode(), pattern.decode()):
+                for writer in writers:
+                    writer.write(_encode([b"pmessage", pattern, channel, message]))
+                    receivers += 1
+        return receivers
+
+    def _notify(self, key: bytes, event: bytes):
+        if self.subscribers:
+            self._publish(b"__keyspace@0__:" + key, event)
+
+    def _expire(self, key: bytes) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is None or expires_at > time.monotonic():
+            return False
+        del self.expires[key]
+        self.data.pop(key, None)
+        self._notify(key, b"expired")
+        return True
+
+    async def sweep(self):
+        while True:
+            await asyncio.sleep(0.05)
+            for key in list(self.expires):
+                self._expire(key)
+
+    def _delete(self, key: bytes) -> bool:
+        self._expire(key)
+        self.expires.pop(key, None)
+        if self.data.pop(key, None) is None:
+            return False
+        self._notify(key, b"del")
+        return True
+
+    def execute(self, args: list[bytes]):
+        command = args[0].upper()
+        if command == b"PING":
+            return SimpleString("PONG")
+        if command in (b"SELECT", b"CLIENT", b"CONFIG", b"FLUSHALL"):
+            if command == b"FLUSHALL":
+                self.data.clear()
+                self.expires.clear()
+            return OK
+        if command == b"GET":
+            self._expire(args[1])
+            return self.data.get(args[1])
+        if command == b"MGET":
+            return [self.execute([b"GET", key]) for key in args[1:]]
+        if command == b"SET":
+            return self._set(args[1], args[2], [arg.upper() for arg in args[3:]])
+        if command == b"DEL":
+            return sum(self._delete(key) for key in args[1:])
+        if command == b"EXISTS":
+            return sum(not self._expire(key) and key in self.data for key in args[1:])
+        if command in (b"TTL", b"PTTL"):
+            key = args[1]
+            if self._expire(key) or key not in self.data:
+                return -2
+            if key not in self.expires:
+                return -1
+            remaining = self.expires[key] - time.monotonic()
+            return int(remaining * (1000 if command == b"PTTL" else 1))
+        if command in (b"EXPIRE", b"PEXPIRE"):
+            if args[1] not in self.data:
+                return 0
+            scale = 1000 if command == b"PEXPIRE" else 1
+            self.expires[args[1]] = time.monotonic() + int(args[2]) / scale
+            return 1
+        if command == b"PUBLISH":
+            return self._publish(args[1], args[2])
+        if command == b"DBSIZE":
+            return len(self.data)
+        return ReplyError(f"ERR unknown command '{command.decode()}'")
+
+    def _set(self, key: bytes, value: bytes, options: list[bytes]):
+        self._expire(key)
+        if b"NX" in options and key in self.data:
+            return None
+        if b"XX" in options and key not in self.data:
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in ((b"EX", 1), (b"PX", 1000)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) / scale
+                self.expires[key] = time.monotonic() + ttl
+        self._notify(key, b"set")
+        return OK
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        transaction: list[list[bytes]] | None = None
+        patterns: set[bytes] = set()
+        try:
+            while (args := await _read_command(reader)) is not None:
+                if not args:
+                    continue
+                command = args[0].upper()
+                if command == b"MULTI":
+                    transaction = []
+                    reply = OK
+                elif command == b"EXEC":
+                    reply = [self.execute(queued) for queued in transaction or []]
+                    transaction = None
+                elif command == b"DISCARD":
+                    transaction = None
+                    reply = OK
+                elif transaction is not None:
+                    transaction.append(args)
+                    reply = QUEUED
+                elif command in (b"PSUBSCRIBE", b"PUNSUBSCRIBE"):
+                    subscribe = command == b"PSUBSCRIBE"
+                    for pattern in args[1:] or list(patterns):
+                        if subscribe:
+                            patterns.add(pattern)
+                            self.subscribers.setdefault(pattern, set()).add(writer)
+                        else:
+                            patterns.discard(pattern)
+                            self.subscribers.get(pattern, set()).discard(writer)
+                            if not self.subscribers.get(pattern, True):
+                                del self.subscribers[pattern]
+                        writer.write(_encode([command.lower(), pattern, len(patterns)]))
+                    await writer.drain()
+                    continue
+                elif command == b"QUIT":
+                    writer.write(_encode(OK))
+                    break
+                else:
+                    reply = self.execute(args)
+                writer.write(_encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for pattern in patterns:
+                self.subscribers.get(pattern, set()).discard(writer)
+                if not self.subscribers.get(pattern, True):
+                    del self.subscribers[pattern]
+            writer.close()
+
+
+async def serve(host: str, port: int):
+    standin = RedisStandIn()
+    server = await asyncio.start_server(standin.handle, host, port)
+    sweeper = asyncio.create_task(standin.sweep())
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="In-memory stand-in for redis-server covering the commands "
+        "Reflex's Redis state manager uses. "
+        "Run from the repository root: python -m benchmarks.redis_standin"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from reflex.constants import RouteVar
+from reflex.istate.data import RouterData
+from reflex.state import State, _substate_key
+from reflex.utils.format import json_dumps
+
+from app.app import app
+from app.history_store import history_store
+from app.session_store import session_store
+from app.state import BrowserState
+
+OPERATIONS = (
+    "navigate",
+    "go_back",
+    "switch_tab",
+    "move_tab",
+    "close_reopen",
+    "add_tab",
+)
+
+
+def _operation(state: BrowserState, name: str, round_number: int, tabs: int):
+    if name == "navigate":
+        BrowserState.navigate.fn(
+            state, {"url": f"https://site{round_number}.example.com/"}
+        )
+    elif name == "go_back":
+        BrowserState.go_back.fn(state)
+        BrowserState.go_forward.fn(state)
+    elif name == "switch_tab":
+        BrowserState.switch_tab.fn(state, state.tab_ids[round_number % tabs])
+    elif name == "move_tab":
+        BrowserState.move_tab.fn(state, state.tab_ids[0], tabs - 1)
+    elif name == "close_reopen":
+        BrowserState.close_tab.fn(state, state.tab_ids[tabs // 2])
+        BrowserState.reopen_closed_tab.fn(state)
+    elif name == "add_tab":
+        BrowserState.add_tab.fn(state)
+        BrowserState.close_tab.fn(state, state.active_tab_id)
+
+
+async def _measure(tabs: int, rounds: int) -> dict[str, tuple[float, float]]:
+    token = f"benchmark-{tabs}"
+    results = {}
+    async with app.modify_state(_substate_key(token, BrowserState)) as root:
+        root.router = RouterData.from_router_data({RouteVar.CLIENT_TOKEN: token})
+        state = root.get_substate(BrowserState.get_full_name().split(".")[1:])
+        for _ in range(tabs - 1):
+            BrowserState.add_tab.fn(state)
+        BrowserState.navigate.fn(state, {"url": "https://start.example.com/"})
+        root.get_delta()
+        root._clean()
+        for name in OPERATIONS:
+            elapsed = 0.0
+            delta_bytes = 0
+            for round_number in range(rounds):
+                started = time.perf_counter()
+                _operation(state, name, round_number, tabs)
+                delta = root.get_delta()
+                elapsed += time.perf_counter() - started
+                delta_bytes += len(json_dumps(delta))
+                root._clean()
+            results[name] = elapsed / rounds, delta_bytes / rounds
+    return results
+
+
+async def run(args) -> dict[int, dict[str, tuple[float, float]]]:
+    from reflex.istate.manager.memory import StateManagerMemory
+
+    app._state_manager = StateManagerMemory(state=State)
+    results = {tabs: await _measure(tabs, args.rounds) for tabs in args.tabs}
+    await session_store.close()
+    await history_store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time tab operations and their websocket delta sizes as the "
+        "number of open tabs grows. "
+        "Run from the repository root: python -m benchmarks.tabs"
+    )
+    parser.add_argument("--tabs", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        session_store.directory = os.path.join(directory, "sessions")
+        history_store.path = os.path.join(directory, "history.db")
+        results = asyncio.run(run(args))
+    print(f"{args.rounds} rounds per operation; mean time incl. delta, mean delta")
+    print(f"  {'operation':<14}" + "".join(f"{tabs:>20,} tabs" for tabs in args.tabs))
+    for name in OPERATIONS:
+        cells = "".join(
+            f"{results[tabs][name][0] * 1e6:>11.0f} us {results[tabs][name][1] / 1024:>7.1f} KB"
+            for tabs in args.tabs
+        )
+        print(f"  {name:<14}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import random
+import sys
+import time
+
+from app import urls
+
+CORPUS = [
+    ("github.com", False),
+    ("github.com/reflex-dev/reflex/issues?q=is%3Aopen", False),
+    ("https://news.ycombinator.com/item?id=38471822", False),
+    ("www.bbc.co.uk/news/technology", False),
+    ("en.wikipedia.org/wiki/Web_browser", False),
+    ("docs.python.org/3/library/asyncio.html", False),
+    ("stackoverflow.com/questions/tagged/python", False),
+    ("developer.mozilla.org/en-US/docs/Web/API/fetch", False),
+    ("http://localhost:3000/admin", False),
+    ("127.0.0.1:8000", False),
+    ("[::1]:8080/health", False),
+    ("bücher.de", False),
+    ("https://münchen.de/straße", False),
+    ("my-project.readthedocs.io/en/latest/", False),
+    ("user.github.io/blog/2024/01/post.html", False),
+    ("about:blank", False),
+    ("python asyncio gather timeout", True),
+    ("how to center a div", True),
+    ("C++ templates tutorial", True),
+    ("weather tomorrow", True),
+    ("what is 2+2?", True),
+    ("reflex", True),
+    ("example.invalidtld", True),
+    ("ftp://files.example.com/pub", True),
+    ("1.2", True),
+]
+
+
+def _inputs(count: int) -> list[tuple[str, bool]]:
+    rng = random.Random(1)
+    inputs = []
+    for i in range(count):
+        text, is_search = rng.choice(CORPUS)
+        if is_search:
+            inputs.append((f"{text} {i}", True))
+        else:
+            inputs.append((f"{text}{'&' if '?' in text else '?'}v={i}", False))
+    return inputs
+
+
+def _throughput(function, inputs: list) -> float:
+    started = time.perf_counter()
+    for args in inputs:
+        function(*args)
+    return len(inputs) / (time.perf_counter() - started)
+
+
+def _misclassified(inputs: list[tuple[str, bool]]) -> list[str]:
+    wrong = []
+    for text, expected in inputs:
+        resolved, is_search = urls.resolve(text, "Google")
+        if is_search != expected or not resolved.startswith(
+            ("http://", "https://", "about:")
+        ):
+            wrong.append(text)
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure URL resolution and domain classification throughput "
+        "over a corpus of address bar inputs. "
+        "Run from the repository root: python -m benchmarks.urls"
+    )
+    parser.add_argument("--inputs", type=int, default=100_000)
+    args = parser.parse_args()
+    inputs = _inputs(args.inputs)
+    resolve_args = [(text, "Google") for text, _ in inputs]
+    resolved = [(urls.resolve(text, "Google")[0],) for text, _ in inputs]
+    print(f"{args.inputs:,} inputs from a {len(CORPUS)}-entry corpus")
+    for name, function, calls in (
+        ("resolve", urls.resolve, resolve_args),
+        ("registrable_domain", urls.registrable_domain, resolved),
+        ("display_host", urls.display_host, resolved),
+    ):
+        function.cache_clear()
+        cold = _throughput(function, calls)
+        warm_calls = calls[: urls.URL_CACHE_SIZE]
+        _throughput(function, warm_calls)
+        warm = _throughput(function, warm_calls * (len(calls) // len(warm_calls)))
+        print(f"  {name:<19} cold {cold:>11,.0f}/s  cached {warm:>11,.0f}/s")
+    wrong = _misclassified(inputs)
+    print(f"  misclassified inputs: {len(wrong)}")
+    for text in wrong[:10]:
+        print(f"    {text!r}")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,35 @@
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import reflex as rx
 
-config = rx.Config(app_name="app", plugins=[rx.plugins.TailwindV3Plugin()])
+REDIS_URL = os.environ.get("TAVIAD_REDIS_URL", "")
+REDIS_POOL_OPTIONS = {
+    "max_connections": os.environ.get("TAVIAD_REDIS_MAX_CONNECTIONS", "512"),
+    "health_check_interval": "30",
+    "socket_keepalive": "true",
+    "socket_connect_timeout": "5",
+}
+REDIS_LOCK_EXPIRATION = int(os.environ.get("TAVIAD_REDIS_LOCK_EXPIRATION", "30000"))
+
+
+def _pooled_redis_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    for option, value in REDIS_POOL_OPTIONS.items():
+        query.setdefault(option, value)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+redis_options = {}
+if REDIS_URL:
+    redis_options = {
+        "redis_url": _pooled_redis_url(REDIS_URL),
+        "state_manager_mode": "redis",
+        "redis_lock_expiration": REDIS_LOCK_EXPIRATION,
+        "redis_lock_warning_threshold": REDIS_LOCK_EXPIRATION // 10,
+    }
+
+config = rx.Config(
+    app_name="app", plugins=[rx.plugins.TailwindV3Plugin()], **redis_options
+)
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import os
+import re
+from collections import Counter
+
+import pytest
+from aiohttp import web
+
+from app import proxy
+
+FILE_DATA = os.urandom(8 * 2**20)
+FILE_SHA256 = hashlib.sha256(FILE_DATA).hexdigest()
+PAGE_MODIFIED = "Tue, 01 Sep 2026 10:00:00 GMT"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FileServer:
+    def __init__(self):
+        self.url = ""
+        self.data = FILE_DATA
+        self.sha256 = FILE_SHA256
+        self.ranges: list[str] = []
+
+    async def serve_file(self, request: web.Request) -> web.StreamResponse:
+        self.ranges.append(request.headers.get("Range", ""))
+        return await _serve_file(request)
+
+
+class OriginServer:
+    def __init__(self):
+        self.url = ""
+        self.hits: Counter[str] = Counter()
+        self.not_modified = 0
+        self.hosts: list[str] = []
+
+    async def serve_page(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.hits[name] += 1
+        self.hosts.append(request.headers.get("Host", ""))
+        await asyncio.sleep(float(request.query.get("delay", "0")))
+        headers = {
+            "Content-Type": "text/html",
+            "Cache-Control": request.query.get("cache", "max-age=60"),
+        }
+        validators = {}
+        if "etag" in request.query:
+            headers["ETag"] = validators["If-None-Match"] = f'"{name}-1"'
+        if "modified" in request.query:
+            headers["Last-Modified"] = validators["If-Modified-Since"] = PAGE_MODIFIED
+        if validators and all(
+            request.headers.get(name) == value for name, value in validators.items()
+        ):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        body = f"<html><head></head><body>{name}</body></html>"
+        size = int(request.query.get("size", "0"))
+        return web.Response(text=body.ljust(size), headers=headers)
+
+
+async def _serve_file(request: web.Request) -> web.StreamResponse:
+    delay = float(request.query.get("delay", "0"))
+    cut = int(request.query.get("cut", "0")) or None
+    start, end = 0, len(FILE_DATA) - 1
+    headers = {"Accept-Ranges": "bytes"}
+    status = 200
+    match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+    if match and "norange" not in request.query:
+        start = int(match.group(1))
+        if start >= len(FILE_DATA):
+            return web.Response(status=416)
+        end = min(int(match.group(2) or end), end)
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(FILE_DATA)}"
+        status = 206
+    response = web.StreamResponse(status=status, headers=headers)
+    response.content_length = end - start + 1
+    await response.prepare(request)
+    position = start
+    while position <= end:
+        if cut is not None and position - start >= cut:
+            request.transport.close()
+            return response
+        chunk = FILE_DATA[position : min(end + 1, position + 64 * 2**10)]
+        await response.write(chunk)
+        position += len(chunk)
+        if delay:
+            await asyncio.sleep(delay)
+    return response
+
+
+async def _serve_digest(request: web.Request) -> web.Response:
+    return web.Response(text=f"{FILE_SHA256}  file.bin\n")
+
+
+async def _serve_endless(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse()
+    await response.prepare(request)
+    while True:
+        await response.write(b"0" * 64 * 2**10)
+
+
+@pytest.fixture
+async def file_server(monkeypatch):
+    monkeypatch.setattr(proxy, "PROXY_ALLOW_PRIVATE", True)
+    server = FileServer()
+    app = web.Application()
+    app.router.add_get("/file.bin", server.serve_file)
+    app.router.add_get("/file.bin.sha256", _serve_digest)
+    app.router.add_get("/endless.sha256", _serve_endless)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server.url = f"http://127.0.0.1:{runner.addresses[0][1]}/file.bin"
+    yield server
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def origin_server(monkeypatch):
+    monkeypatch.setattr(proxy, "PROXY_ALLOW_PRIVATE", True)
+    server = OriginServer()
+    app = web.Application()
+    app.router.add_get("/{name}", server.serve_page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server.url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    yield server
+    await runner.cleanup()
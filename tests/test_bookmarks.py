@@ -0,0 +1,140 @@
+import pickle
+
+from app.bookmarks import BOOKMARK_BAR_ID, BookmarkStore, _tokens, default_bookmarks
+
+
+def _assert_consistent(store: BookmarkStore):
+    postings: dict[str, set[int]] = {}
+    for node in store.nodes.values():
+        for term in _tokens(f"{node['title']} {node['url']}"):
+            postings.setdefault(term, set()).add(node["id"])
+    assert store.postings == postings
+    assert store.terms == sorted(postings)
+    assert store.by_url == {
+        node["url"]: node_id
+        for node_id, node in store.nodes.items()
+        if not node["is_folder"]
+    }
+    children = {BOOKMARK_BAR_ID: []}
+    for node_id, node in store.nodes.items():
+        children.setdefault(node["folder_id"], []).append(node_id)
+        if node["is_folder"]:
+            children.setdefault(node_id, [])
+    assert {folder_id: sorted(ids) for folder_id, ids in store.children.items()} == {
+        folder_id: sorted(ids) for folder_id, ids in children.items()
+    }
+
+
+def _titles(bookmarks) -> list[str]:
+    return [bookmark["title"] for bookmark in bookmarks]
+
+
+def test_add_lists_items_in_order():
+    store = BookmarkStore()
+    folder = store.add_folder("Work")
+    store.add("https://a.com", "A")
+    store.add("https://b.com", "B", folder_id=folder["id"])
+    store.add("https://c.com", "C")
+    assert _titles(store.items(BOOKMARK_BAR_ID)) == ["Work", "A", "C"]
+    assert _titles(store.items(BOOKMARK_BAR_ID, 1, 1)) == ["A"]
+    assert _titles(store.items(folder["id"])) == ["B"]
+    assert store.count(BOOKMARK_BAR_ID) == 3
+    assert len(store) == 3
+    assert "https://b.com" in store
+    assert store.find("https://b.com")["folder_id"] == folder["id"]
+    _assert_consistent(store)
+
+
+def test_items_are_copies():
+    store = BookmarkStore()
+    store.add("https://a.com", "A")
+    store.items(BOOKMARK_BAR_ID)[0]["title"] = "Changed"
+    assert store.find("https://a.com")["title"] == "A"
+
+
+def test_duplicate_urls_and_missing_folders_are_refused():
+    store = BookmarkStore()
+    first = store.add("https://a.com", "A")
+    assert store.add("https://a.com", "Again") is None
+    assert store.add("https://b.com", "B", folder_id=999) is None
+    assert store.add_folder("Lost", 999) is None
+    second = store.add("https://b.com", "B")
+    assert not store.update(second["id"], "B", "https://a.com")
+    assert store.find("https://a.com")["id"] == first["id"]
+    assert store.find("https://b.com")["id"] == second["id"]
+    _assert_consistent(store)
+
+
+def test_rename_and_change_url_reindex():
+    store = BookmarkStore()
+    bookmark = store.add("https://old.example.com", "Old title")
+    assert store.update(bookmark["id"], "Fresh name", "https://new.example.org")
+    assert store.search("old") == []
+    assert store.search("fresh") == [bookmark["id"]]
+    assert store.search("example org") == [bookmark["id"]]
+    assert "https://old.example.com" not in store
+    assert store.find("https://new.example.org")["title"] == "Fresh name"
+    folder = store.add_folder("Reading")
+    assert store.update(folder["id"], "Later", "https://ignored.com")
+    assert store.get(folder["id"])["url"] == ""
+    assert not store.update(999, "Missing")
+    _assert_consistent(store)
+
+
+def test_move_between_folders():
+    store = BookmarkStore()
+    outer = store.add_folder("Outer")
+    inner = store.add_folder("Inner", outer["id"])
+    bookmark = store.add("https://a.com", "A")
+    assert store.move(bookmark["id"], inner["id"])
+    assert _titles(store.items(inner["id"])) == ["A"]
+    assert _titles(store.path(inner["id"])) == ["Outer", "Inner"]
+    assert not store.move(outer["id"], inner["id"])
+    assert not store.move(outer["id"], outer["id"])
+    assert not store.move(bookmark["id"], 999)
+    assert store.move(inner["id"], BOOKMARK_BAR_ID)
+    assert _titles(store.items(BOOKMARK_BAR_ID)) == ["Outer", "Inner"]
+    _assert_consistent(store)
+
+
+def test_delete_folder_removes_descendants():
+    store = BookmarkStore()
+    folder = store.add_folder("Projects")
+    nested = store.add_folder("Archive", folder["id"])
+    store.add("https://a.com/reflex", "Reflex notes", folder_id=folder["id"])
+    store.add("https://b.com/reflex", "Old reflex", folder_id=nested["id"])
+    kept = store.add("https://c.com/reflex", "Reflex docs")
+    removed = store.remove(folder["id"])
+    assert sorted(bookmark["url"] for bookmark in removed) == [
+        "https://a.com/reflex",
+        "https://b.com/reflex",
+    ]
+    assert not store.is_folder(nested["id"])
+    assert store.search("reflex") == [kept["id"]]
+    assert store.search("notes") == []
+    assert "archive" not in store.terms
+    assert store.remove(folder["id"]) == []
+    _assert_consistent(store)
+
+
+def test_prefix_and_multi_term_search():
+    store = BookmarkStore()
+    python = store.add("https://docs.python.org/3/", "Python documentation")
+    pypi = store.add("https://pypi.org", "Python Package Index")
+    rust = store.add("https://doc.rust-lang.org", "Rust documentation")
+    assert store.search("pyth") == [python["id"], pypi["id"]]
+    assert store.search("doc") == [python["id"], rust["id"]]
+    assert store.search("python doc") == [python["id"]]
+    assert store.search("PYTHON  Package") == [pypi["id"]]
+    assert store.search("https://www.pypi") == [pypi["id"]]
+    assert store.search("python golang") == []
+    assert store.search("") == []
+
+
+def test_index_survives_pickling():
+    store = default_bookmarks()
+    restored = pickle.loads(pickle.dumps(store))
+    assert restored.search("reflex") == store.search("reflex")
+    added = restored.add("https://example.com", "Example")
+    assert added["id"] == store.next_id
+    _assert_consistent(restored)
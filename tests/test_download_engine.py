@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import json
+import os
+
+import httpx
+import pytest
+
+from app import download_engine, proxy
+from app.download_engine import (
+    DownloadControl,
+    DownloadError,
+    StreamHasher,
+    fetch_sidecar_digest,
+    segmented_download,
+    stream_download,
+)
+from app.proxy import PrivateAddressError
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def client():
+    yield
+    if download_engine._client is not None:
+        await download_engine._client.aclose()
+        download_engine._client = None
+
+
+async def _stream(url: str, path: str) -> tuple[list[tuple[int, int]], str]:
+    hasher = StreamHasher()
+    async with contextlib.aclosing(stream_download(url, path, hasher)) as chunks:
+        progress = [frame async for frame in chunks]
+    return progress, await hasher.hexdigest()
+
+
+async def _segmented(url: str, path: str, total: int) -> DownloadControl:
+    control = DownloadControl()
+    await segmented_download(url, path, total, control, 4)
+    return control
+
+
+async def test_streams_to_part_file(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    progress, digest = await _stream(file_server.url, path)
+    assert progress[0] == (0, len(file_server.data))
+    assert progress[-1] == (len(file_server.data), len(file_server.data))
+    assert digest == file_server.sha256
+    assert (tmp_path / "file.bin.part").read_bytes() == file_server.data
+
+
+async def test_resumes_from_part_file(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    (tmp_path / "file.bin.part").write_bytes(file_server.data[: 3 * 2**20])
+    progress, digest = await _stream(file_server.url, path)
+    assert file_server.ranges == [f"bytes={3 * 2**20}-"]
+    assert progress[0] == (3 * 2**20, len(file_server.data))
+    assert digest == file_server.sha256
+
+
+async def test_restarts_when_server_ignores_range(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    (tmp_path / "file.bin.part").write_bytes(b"stale bytes")
+    progress, digest = await _stream(f"{file_server.url}?norange", path)
+    assert progress[0] == (0, len(file_server.data))
+    assert digest == file_server.sha256
+
+
+async def test_complete_part_file_is_not_downloaded_again(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    (tmp_path / "file.bin.part").write_bytes(file_server.data)
+    progress, digest = await _stream(file_server.url, path)
+    assert progress == [(len(file_server.data), len(file_server.data))]
+    assert digest == file_server.sha256
+
+
+async def test_dropped_connection_keeps_part_for_resume(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    with pytest.raises((DownloadError, httpx.HTTPError)):
+        await _stream(f"{file_server.url}?cut={2**20}&delay=0.001", path)
+    received = len((tmp_path / "file.bin.part").read_bytes())
+    assert 0 < received < len(file_server.data)
+    progress, digest = await _stream(file_server.url, path)
+    assert progress[0][0] == received
+    assert digest == file_server.sha256
+
+
+async def test_download_verifies_sidecar_digest(file_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_engine, "SEGMENT_COUNT", 1)
+    path = str(tmp_path / "file.bin")
+    control = DownloadControl()
+    await download_engine.download(f"{file_server.url}?delay=0.0005", path, control)
+    assert control.received == control.total == len(file_server.data)
+    assert (tmp_path / "file.bin").read_bytes() == file_server.data
+    assert not (tmp_path / "file.bin.part").exists()
+
+
+async def test_sidecar_digest_is_read_with_a_size_cap(file_server):
+    assert await fetch_sidecar_digest(file_server.url) == file_server.sha256
+    endless_url = file_server.url.replace("file.bin", "endless")
+    assert await asyncio.wait_for(fetch_sidecar_digest(endless_url), 5.0) == ""
+
+
+async def test_segmented_download_fills_preallocated_file(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    total = len(file_server.data)
+    control = await _segmented(file_server.url, path, total)
+    assert control.received == total
+    assert sorted(file_server.ranges) == [
+        f"bytes={start}-{start + total // 4 - 1}"
+        for start in range(0, total, total // 4)
+    ]
+    assert (tmp_path / "file.bin.part").read_bytes() == file_server.data
+
+
+async def test_segmented_download_resumes_saved_segments(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    total = len(file_server.data)
+    with pytest.raises((DownloadError, httpx.HTTPError)):
+        await _segmented(f"{file_server.url}?cut={2**19}", path, total)
+    saved = json.loads((tmp_path / "file.bin.segments").read_text())["segments"]
+    assert all(0 < received < total // 4 for _, _, received in saved)
+    file_server.ranges.clear()
+    control = await _segmented(file_server.url, path, total)
+    assert control.received == total
+    assert sorted(file_server.ranges) == sorted(
+        f"bytes={start + received}-{end}" for start, end, received in saved
+    )
+    assert (tmp_path / "file.bin.part").read_bytes() == file_server.data
+
+
+async def test_segmented_download_keeps_single_stream_part(file_server, tmp_path):
+    path = str(tmp_path / "file.bin")
+    total = len(file_server.data)
+    (tmp_path / "file.bin.part").write_bytes(file_server.data[: 3 * 2**20])
+    await _segmented(file_server.url, path, total)
+    assert sorted(file_server.ranges) == [
+        f"bytes={3 * 2**20}-{4 * 2**20 - 1}",
+        f"bytes={4 * 2**20}-{6 * 2**20 - 1}",
+        f"bytes={6 * 2**20}-{total - 1}",
+    ]
+    assert (tmp_path / "file.bin.part").read_bytes() == file_server.data
+
+
+async def test_segmented_download_completes_short_writes(
+    file_server, tmp_path, monkeypatch
+):
+    pwrite = os.pwrite
+    monkeypatch.setattr(
+        os, "pwrite", lambda fd, data, offset: pwrite(fd, data[:4096], offset)
+    )
+    path = str(tmp_path / "file.bin")
+    await _segmented(file_server.url, path, len(file_server.data))
+    assert (tmp_path / "file.bin.part").read_bytes() == file_server.data
+
+
+def _metadata_redirect(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "files.example.com":
+        return httpx.Response(302, headers={"Location": "http://169.254.169.254/"})
+    raise AssertionError(f"requested {request.url}")
+
+
+async def test_downloads_refuse_private_addresses(file_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(proxy, "PROXY_ALLOW_PRIVATE", False)
+    with pytest.raises(PrivateAddressError):
+        await _stream(file_server.url, str(tmp_path / "file.bin"))
+    assert await fetch_sidecar_digest(file_server.url) == ""
+    assert file_server.ranges == []
+
+
+async def test_downloads_check_every_redirect_hop(tmp_path, monkeypatch):
+    async def resolve(host: str) -> list[str]:
+        return ["93.184.216.34"]
+
+    monkeypatch.setattr(proxy, "_resolve", resolve)
+    download_engine._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(_metadata_redirect)
+    )
+    url = "http://files.example.com/file.bin"
+    with pytest.raises(PrivateAddressError):
+        await _stream(url, str(tmp_path / "file.bin"))
+    assert await fetch_sidecar_digest(url) == ""
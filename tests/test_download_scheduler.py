@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from app.download_scheduler import DownloadScheduler
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_slots_cap_active_downloads_and_follow_priority():
+    scheduler = DownloadScheduler(max_active=2, max_per_host=6)
+    started = []
+    release = asyncio.Event()
+
+    async def download(key: str, priority: int):
+        async with scheduler.slot(key, "example.com", priority):
+            started.append(key)
+            await release.wait()
+
+    tasks = [
+        asyncio.create_task(download(key, priority))
+        for key, priority in (("a", 5), ("b", 5), ("c", 9), ("d", 1))
+    ]
+    await asyncio.sleep(0)
+    assert started == ["a", "b"]
+    assert scheduler.active == 2
+    assert scheduler.queued == 2
+    release.set()
+    await asyncio.gather(*tasks)
+    assert started == ["a", "b", "d", "c"]
+    assert scheduler.active == 0
+
+
+async def test_per_host_connection_cap():
+    scheduler = DownloadScheduler(max_active=8, max_per_host=3)
+    entered = asyncio.Event()
+
+    async def download():
+        async with scheduler.slot("b", "example.com", 0):
+            entered.set()
+
+    async with scheduler.slot("a", "example.com", 0):
+        assert scheduler.acquire_connections("example.com", 4) == 2
+        assert scheduler.acquire_connections("example.com", 1) == 0
+        task = asyncio.create_task(download())
+        await asyncio.sleep(0)
+        assert not entered.is_set()
+        scheduler.release_connections("example.com", 2)
+        await task
+    assert scheduler.active == 0
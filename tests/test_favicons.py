@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app import favicons
+from app.favicons import FaviconService, IconStore, site_origin
+
+pytestmark = pytest.mark.anyio
+
+ICON = b"\x89PNG\r\n\x1a\n icon"
+
+
+@pytest.mark.parametrize(
+    ("url", "origin"),
+    [
+        ("https://Example.COM/a", "https://example.com"),
+        ("https://user:pw@example.com:443/", "https://example.com"),
+        ("http://example.com:8080/x", "http://example.com:8080"),
+        ("https://bücher.de/", "https://xn--bcher-kva.de"),
+        ("http://[::1]:8000/", "http://[::1]:8000"),
+        ("https://[oops/", ""),
+        ("https://example.com:99999/", ""),
+        ("about:blank", ""),
+    ],
+)
+def test_site_origin_matches_url_origin(url, origin):
+    assert site_origin(url) == origin
+
+
+@pytest.fixture
+async def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(favicons, "ORIGINS_SAVE_DELAY", 0.05)
+    service = FaviconService(IconStore(str(tmp_path), 2**20), 4, max_origins=3)
+    service.downloads = []
+
+    async def download(origin: str) -> tuple[bytes, str]:
+        service.downloads.append(origin)
+        await asyncio.sleep(0.01)
+        return ICON, "png"
+
+    monkeypatch.setattr(service, "_download", download)
+    yield service
+    await service.close()
+
+
+async def test_concurrent_lookups_share_one_download(service):
+    first, second = "https://a.example", "https://b.example"
+    names = await asyncio.gather(
+        *(service.icon(first) for _ in range(5)), service.lookup([first, second])
+    )
+    assert service.downloads == [first, second]
+    assert names[:5] == [names[0]] * 5
+    assert names[5] == {first: names[0], second: names[0]}
+    assert list(service.store._index) == [names[0]]
+    assert await service.icon(first) == names[0]
+    assert service.downloads == [first, second]
+
+
+async def test_least_recently_used_origins_are_forgotten(service):
+    origins = [f"https://{name}.example" for name in "abcd"]
+    for origin in origins[:3]:
+        await service.icon(origin)
+    assert service.cached(origins[0])
+    await service.icon(origins[3])
+    assert service.cached(origins[1]) is None
+    assert all(service.cached(origin) for origin in (origins[0], *origins[2:]))
+    assert len(service._origins) == 3
+
+
+async def test_origins_are_saved_in_batches(service, monkeypatch):
+    writes = []
+    write_origins = favicons._write_origins
+
+    def counting_write(path: str, origins: list):
+        writes.append([origin for origin, _ in origins])
+        write_origins(path, origins)
+
+    monkeypatch.setattr(favicons, "_write_origins", counting_write)
+    origins = [f"https://{name}.example" for name in "abc"]
+    for origin in origins:
+        await service.icon(origin)
+    assert writes == []
+    await asyncio.sleep(0.2)
+    assert writes == [origins]
+    service.cached(origins[0])
+    await service.icon("https://d.example")
+    await service.close()
+    assert writes[-1] == [*origins[2:], origins[0], "https://d.example"]
+    restored = FaviconService(IconStore(service.store.directory, 2**20), 4, 2)
+    await restored._load_origins()
+    assert list(restored._origins) == [origins[0], "https://d.example"]
+    assert restored.cached("https://d.example") == service.cached("https://d.example")
@@ -0,0 +1,75 @@
+import pickle
+
+from app.history import TabHistory
+
+
+def make_history(*urls: str, limit: int = 100) -> TabHistory:
+    history = TabHistory(urls[0], limit)
+    for url in urls[1:]:
+        history.push(url)
+    return history
+
+
+def test_push_back_forward():
+    history = make_history("about:blank", "https://a.com", "https://b.com")
+    assert history.current == "https://b.com"
+    assert history.back() == "https://a.com"
+    assert history.back() == "about:blank"
+    assert history.back() is None
+    assert history.forward() == "https://a.com"
+    history.push("https://c.com")
+    assert list(history) == ["about:blank", "https://a.com", "https://c.com"]
+    assert not history.can_go_forward
+
+
+def test_limit_drops_oldest_entries():
+    history = make_history(*(f"https://{i}.com" for i in range(10)), limit=3)
+    assert list(history) == ["https://7.com", "https://8.com", "https://9.com"]
+    assert history.current == "https://9.com"
+
+
+def test_resize_trims_forward_entries_first():
+    history = make_history("about:blank", "https://example.com", "https://example.org")
+    history.back()
+    history.resize(1)
+    assert list(history) == ["https://example.com"]
+    assert history.current == "https://example.com"
+
+
+def test_resize_keeps_current_entry():
+    history = make_history(*(f"https://{i}.com" for i in range(6)))
+    history.back()
+    history.back()
+    history.resize(2)
+    assert list(history) == ["https://2.com", "https://3.com"]
+    assert history.current == "https://3.com"
+    assert history.can_go_back and not history.can_go_forward
+    history.resize(100)
+    history.push("https://6.com")
+    assert list(history) == ["https://2.com", "https://3.com", "https://6.com"]
+
+
+def test_restore_keeps_current_entry():
+    entries = ["about:blank", "https://a.com", "https://b.com", "https://c.com"]
+    history = TabHistory.restore(entries, 1, 2)
+    assert list(history) == ["about:blank", "https://a.com"]
+    assert history.current == "https://a.com"
+    history = TabHistory.restore(entries, 99, 2)
+    assert history.current == "https://c.com"
+
+
+def test_urls_are_interned_across_histories():
+    host = "shared.example.com"
+    first = make_history("about:blank", f"https://{host}/")
+    second = make_history("about:blank", f"https://{host}/")
+    assert first.current is second.current
+    restored = pickle.loads(pickle.dumps(first))
+    assert restored.current is second.current
+    assert list(restored) == list(first)
+    assert restored.entries.maxlen == first.entries.maxlen
+
+
+def test_restore_repairs_empty_entries():
+    history = TabHistory.restore([], 3, 10)
+    assert list(history) == ["about:blank"]
+    assert history.current == "about:blank"
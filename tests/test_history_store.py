@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.history_store import FLUSH_INTERVAL, HistoryStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    await store.close()
+
+
+async def test_visits_are_flushed_in_the_background(store):
+    store.record("p", "https://a.com", "A", 1.0)
+    store.record("p", "https://a.com", "A", 2.0)
+    store.record("p", "about:blank", "", 3.0)
+    await asyncio.sleep(FLUSH_INTERVAL + 0.2)
+    assert not store._flush_tasks
+    [entry] = await store.top_urls("p", 10)
+    assert entry == {
+        "url": "https://a.com",
+        "title": "A",
+        "visit_count": 2,
+        "last_visit": 2.0,
+    }
+    assert [visit["last_visit"] for visit in await store.recent("p")] == [2.0, 1.0]
+    assert await store.top_urls("other", 10) == []
+
+
+async def test_reads_do_not_wait_for_pending_writes(store):
+    await store.import_visits("p", [("https://old.com", "Old", 1.0)])
+    store.record("p", "https://new.com", "New", 2.0)
+    async with store._flush_lock:
+        entries = await asyncio.wait_for(store.recent("p"), 1.0)
+    assert [entry["url"] for entry in entries] == ["https://old.com"]
+    await store.flush()
+    assert len(await store.recent("p")) == 2
+
+
+async def test_search_matches_title_and_url_prefixes(store):
+    await store.import_visits(
+        "p",
+        [
+            ("https://docs.python.org/3/", "Python docs", 1.0),
+            ("https://reflex.dev/", "Reflex", 2.0),
+        ],
+    )
+    assert [entry["url"] for entry in await store.search("p", "pyth")] == [
+        "https://docs.python.org/3/"
+    ]
+    assert [entry["url"] for entry in await store.search("p", "reflex dev")] == [
+        "https://reflex.dev/"
+    ]
+    assert await store.search("p", "  ") == []
+
+
+async def test_failed_batch_is_logged(store, caplog):
+    conn = await store._connect()
+    await conn.execute(
+        "CREATE TRIGGER fail BEFORE INSERT ON urls"
+        " BEGIN SELECT raise(ABORT, 'disk full'); END"
+    )
+    store.record("p", "https://a.com", "A", 1.0)
+    with caplog.at_level(logging.ERROR, logger="app.history_store"):
+        await asyncio.sleep(FLUSH_INTERVAL + 0.2)
+    assert "Dropped 1 history visits" in caplog.text
+    assert not store._flush_tasks
@@ -0,0 +1,189 @@
+import contextlib
+import sqlite3
+
+import pytest
+
+from app import importer
+from app.importer import (
+    CHROME_EPOCH_OFFSET,
+    ImportFormatError,
+    count_visits,
+    detect_format,
+    read_bookmarks,
+    read_visits,
+)
+
+pytestmark = pytest.mark.anyio
+
+CHROME_SCHEMA = """
+CREATE TABLE urls (
+    id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+    visit_count INTEGER DEFAULT 0 NOT NULL, last_visit_time INTEGER NOT NULL
+);
+CREATE TABLE visits (
+    id INTEGER PRIMARY KEY, url INTEGER NOT NULL, visit_time INTEGER NOT NULL
+);
+"""
+FIREFOX_SCHEMA = """
+CREATE TABLE moz_places (
+    id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+    visit_count INTEGER DEFAULT 0
+);
+CREATE TABLE moz_historyvisits (
+    id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+    visit_date INTEGER, visit_type INTEGER
+);
+CREATE TABLE moz_bookmarks (
+    id INTEGER PRIMARY KEY, type INTEGER, fk INTEGER DEFAULT NULL,
+    parent INTEGER, position INTEGER, title LONGVARCHAR, guid TEXT
+);
+"""
+NETSCAPE = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><A HREF="https://top.example/">Top &amp; level</A>
+    <DT><H3 ADD_DATE="1">Work</H3>
+    <DL><p>
+        <DT><H3>Deep</H3>
+        <DL><p>
+            <DT><A HREF="https://deep.example/" ADD_DATE="1">Deep link</A>
+        </DL><p>
+        <DT><A HREF="https://work.example/"></A>
+    </DL><p>
+    <DT><A HREF="javascript:void(0)">Bookmarklet</A>
+    <DT><A HREF="https://[broken/">Broken</A>
+    <DT><A HREF="https://last.example/">Last</A>
+</DL><p>
+"""
+
+
+def _chrome(path) -> str:
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        conn.executescript(CHROME_SCHEMA)
+        conn.executemany(
+            "INSERT INTO urls (id, url, title, last_visit_time) VALUES (?, ?, ?, 0)",
+            [
+                (1, "https://a.example/", "A"),
+                (2, "http://b.example/", None),
+                (3, "chrome://settings", "Settings"),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO visits (id, url, visit_time) VALUES (?, ?, ?)",
+            [
+                (id_, url_id, (1_700_000_000 + id_ + CHROME_EPOCH_OFFSET) * 10**6)
+                for id_, url_id in ((1, 1), (2, 2), (3, 3), (4, 1))
+            ],
+        )
+        conn.commit()
+    return str(path)
+
+
+def _firefox(path) -> str:
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        conn.executescript(FIREFOX_SCHEMA)
+        conn.executemany(
+            "INSERT INTO moz_places VALUES (?, ?, ?, 0)",
+            [
+                (1, "https://one.example/", "One"),
+                (2, "https://two.example/", "Two"),
+                (3, "https://three.example/", None),
+                (4, "https://tagged.example/", "Tagged"),
+                (5, "place:sort=8", None),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO moz_historyvisits VALUES (?, 0, ?, ?, 1)",
+            [(1, 1, 1_700_000_001 * 10**6), (2, 5, 1_700_000_002 * 10**6)],
+        )
+        conn.executemany(
+            "INSERT INTO moz_bookmarks VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (1, 2, None, 0, 0, "", "root________"),
+                (2, 2, None, 1, 0, "menu", "menu________"),
+                (3, 2, None, 1, 1, "toolbar", "toolbar_____"),
+                (4, 2, None, 1, 2, "tags", "tags________"),
+                (10, 2, None, 3, 0, "Work", "w"),
+                (11, 2, None, 10, 0, "Deep", "d"),
+                (12, 1, 1, 3, 1, "One", "a"),
+                (13, 1, 2, 10, 0, "Two", "b"),
+                (14, 1, 3, 11, 0, None, "c"),
+                (15, 2, None, 4, 0, "sometag", "t"),
+                (16, 1, 4, 15, 0, "Tagged", "e"),
+                (17, 1, 5, 2, 0, "Query", "q"),
+            ],
+        )
+        conn.commit()
+    return str(path)
+
+
+async def _collect(batches) -> list:
+    async with contextlib.aclosing(batches) as items:
+        return [item async for batch in items for item in batch]
+
+
+async def test_chrome_history(tmp_path):
+    path = _chrome(tmp_path / "History")
+    assert detect_format(path) == "chrome"
+    assert await count_visits(path, "chrome") == 4
+    assert await _collect(read_visits(path, "chrome")) == [
+        ("https://a.example/", "A", 1_700_000_001.0),
+        ("http://b.example/", "", 1_700_000_002.0),
+        ("https://a.example/", "A", 1_700_000_004.0),
+    ]
+    assert await _collect(read_bookmarks(path, "chrome")) == []
+
+
+async def test_firefox_history_and_bookmark_tree(tmp_path):
+    path = _firefox(tmp_path / "places.sqlite")
+    assert detect_format(path) == "firefox"
+    assert await _collect(read_visits(path, "firefox")) == [
+        ("https://one.example/", "One", 1_700_000_001.0)
+    ]
+    bookmarks = await _collect(read_bookmarks(path, "firefox"))
+    assert [(item["title"], item["url"]) for item in bookmarks] == [
+        ("menu", ""),
+        ("toolbar", ""),
+        ("Work", ""),
+        ("One", "https://one.example/"),
+        ("Deep", ""),
+        ("Two", "https://two.example/"),
+        ("https://three.example/", "https://three.example/"),
+    ]
+    keys = {item["title"]: item["key"] for item in bookmarks}
+    parents = {item["title"]: item["parent"] for item in bookmarks}
+    assert parents["Two"] == keys["Work"]
+    assert parents["https://three.example/"] == keys["Deep"]
+
+
+async def test_netscape_bookmarks_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "HTML_CHUNK_SIZE", 7)
+    path = tmp_path / "bookmarks.html"
+    path.write_text(NETSCAPE)
+    assert detect_format(str(path)) == "netscape"
+    bookmarks = await _collect(read_bookmarks(str(path), "netscape"))
+    assert [(item["title"], item["url"]) for item in bookmarks] == [
+        ("Top & level", "https://top.example/"),
+        ("Work", ""),
+        ("Deep", ""),
+        ("Deep link", "https://deep.example/"),
+        ("https://work.example/", "https://work.example/"),
+        ("Last", "https://last.example/"),
+    ]
+    work, deep = bookmarks[1]["key"], bookmarks[2]["key"]
+    assert [item["parent"] for item in bookmarks] == ["", "", work, deep, work, ""]
+    assert await _collect(read_visits(str(path), "netscape")) == []
+
+
+def test_unknown_files_are_rejected(tmp_path):
+    text = tmp_path / "notes.txt"
+    text.write_text("hello")
+    with pytest.raises(ImportFormatError):
+        detect_format(str(text))
+    other = tmp_path / "other.sqlite"
+    with contextlib.closing(sqlite3.connect(other)) as conn:
+        conn.execute("CREATE TABLE things (id INTEGER)")
+    with pytest.raises(ImportFormatError):
+        detect_format(str(other))
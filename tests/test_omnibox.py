@@ -0,0 +1,32 @@
+from app.omnibox import SuggestionIndex
+
+NOW = 1_800_000_000.0
+
+
+def test_ranks_whole_prefix_range():
+    index = SuggestionIndex()
+    for i in range(1000):
+        index.seed(f"https://g{i:04d}.example.com/", "", 1, NOW - 365 * 86400)
+    index.seed("https://github.com/", "GitHub", 500, NOW - 60)
+    urls = [suggestion["url"] for suggestion in index.suggest("g", now=NOW)]
+    assert urls[0] == "https://github.com/"
+
+
+def test_bookmark_bonus_outranks_stale_visits():
+    index = SuggestionIndex()
+    index.seed("https://docs.example.com/", "", 3, NOW - 90 * 86400)
+    index.set_bookmarked("https://dev.example.com/", "Dev", True)
+    urls = [suggestion["url"] for suggestion in index.suggest("d", now=NOW)]
+    assert urls == ["https://dev.example.com/", "https://docs.example.com/"]
+
+
+def test_recent_visits_outrank_old_ones():
+    index = SuggestionIndex()
+    index.visit("https://news.example.org/", "", at=NOW - 30 * 86400)
+    index.visit("https://news.example.org/", "", at=NOW - 30 * 86400)
+    index.visit("https://news.example.com/", "", at=NOW - 60)
+    results = index.suggest("https://news", now=NOW)
+    assert [suggestion["url"] for suggestion in results] == [
+        "https://news.example.com/",
+        "https://news.example.org/",
+    ]
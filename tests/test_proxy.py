@@ -0,0 +1,223 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import proxy
+from app.proxy import (
+    PROXY_TOKEN_COOKIE,
+    CachingProxy,
+    PrivateAddressError,
+    ProxyCache,
+    is_proxyable,
+    proxy_api,
+    proxy_token,
+)
+
+pytestmark = pytest.mark.anyio
+
+PUBLIC_ADDRESSES = {
+    "example.com": ["93.184.216.34"],
+    "cdn.example.com": ["::ffff:93.184.216.35"],
+}
+
+
+def _upstream(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "example.com" and request.url.path == "/moved":
+        return httpx.Response(302, headers={"Location": "http://169.254.169.254/"})
+    if request.url.host == "example.com" and request.url.path == "/internal":
+        return httpx.Response(302, headers={"Location": "http://intranet.test/"})
+    if request.url.host == "example.com" and request.url.path == "/cdn":
+        return httpx.Response(301, headers={"Location": "http://cdn.example.com/"})
+    if request.url.host in PUBLIC_ADDRESSES:
+        return httpx.Response(
+            200,
+            headers={
+                "Content-Type": "text/html",
+                "Content-Security-Policy": "frame-ancestors 'none'; img-src *",
+                "X-Frame-Options": "DENY",
+                "Set-Cookie": "session=upstream",
+                "Strict-Transport-Security": "max-age=60",
+            },
+            content=b"<html><head></head><body>hello</body></html>",
+        )
+    raise AssertionError(f"requested {request.url}")
+
+
+@pytest.fixture
+async def caching_proxy(tmp_path, monkeypatch):
+    async def resolve(host: str) -> list[str]:
+        return PUBLIC_ADDRESSES.get(host, ["10.0.0.8"])
+
+    monkeypatch.setattr(proxy, "_resolve", resolve)
+    monkeypatch.setattr(proxy, "_proxy_secret", lambda: b"secret")
+    caching_proxy = CachingProxy(ProxyCache(str(tmp_path), 2**20))
+    caching_proxy._client = httpx.AsyncClient(transport=httpx.MockTransport(_upstream))
+    monkeypatch.setattr(proxy, "caching_proxy", caching_proxy)
+    yield caching_proxy
+    await caching_proxy.close()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://localhost:8000/",
+        "http://127.0.0.1/",
+        "http://2130706433/",
+        "http://0x7f000001/",
+        "http://127.1/",
+        "http://[::ffff:127.0.0.1]/",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://0.0.0.0/",
+        "https://[oops/",
+        "file:///etc/passwd",
+    ],
+)
+def test_private_and_invalid_urls_are_not_proxyable(url):
+    assert not is_proxyable(url)
+
+
+def test_public_urls_are_proxyable():
+    assert is_proxyable("https://example.com/")
+    assert is_proxyable("http://93.184.216.34/")
+
+
+async def test_names_resolving_to_private_addresses_are_refused(caching_proxy):
+    with pytest.raises(PrivateAddressError):
+        await caching_proxy.fetch("http://intranet.test/")
+
+
+@pytest.mark.parametrize("path", ["/moved", "/internal"])
+async def test_every_redirect_hop_is_checked(caching_proxy, path):
+    with pytest.raises(PrivateAddressError):
+        await caching_proxy.fetch(f"http://example.com{path}")
+
+
+async def test_public_redirects_are_followed(caching_proxy):
+    entry, cache_status = await caching_proxy.fetch("http://example.com/cdn")
+    assert entry.url == "http://cdn.example.com/"
+    assert cache_status == "MISS"
+
+
+async def test_prefetch_takes_the_same_checks(caching_proxy):
+    assert await caching_proxy.prefetch("http://intranet.test/", 2**20) == 0
+    assert await caching_proxy.prefetch("http://example.com/moved", 2**20) == 0
+    assert caching_proxy.prefetches == 0
+    assert await caching_proxy.prefetch("http://example.com/", 2**20) > 0
+    assert caching_proxy.prefetches == 1
+
+
+async def _get(cookies: dict[str, str], url: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=proxy_api)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://testserver", cookies=cookies
+    ) as client:
+        return await client.get("/_proxy", params={"url": url})
+
+
+async def test_proxy_requires_a_signed_token(caching_proxy):
+    for cookies in ({}, {PROXY_TOKEN_COOKIE: "p.forged"}):
+        response = await _get(cookies, "http://example.com/")
+        assert response.status_code == 401
+
+
+async def test_proxied_pages_are_sandboxed_and_frameable(caching_proxy):
+    cookies = {PROXY_TOKEN_COOKIE: proxy_token("p")}
+    response = await _get(cookies, "http://example.com/")
+    assert response.status_code == 200
+    assert response.headers["content-security-policy"] == (
+        "img-src *, sandbox allow-scripts allow-forms"
+    )
+    for header in ("x-frame-options", "set-cookie", "strict-transport-security"):
+        assert header not in response.headers
+    assert b'<base href="http://example.com/">' in response.content
+    response = await _get(cookies, "http://example.com/moved")
+    assert response.status_code == 403
+
+
+@pytest.fixture
+async def local_proxy(tmp_path):
+    local_proxy = CachingProxy(ProxyCache(str(tmp_path), 3000))
+    yield local_proxy
+    await local_proxy.close()
+
+
+async def test_fresh_responses_are_served_from_cache(local_proxy, origin_server):
+    url = f"{origin_server.url}/fresh"
+    statuses = [(await local_proxy.fetch(url))[1] for _ in range(3)]
+    assert statuses == ["MISS", "HIT", "HIT"]
+    assert origin_server.hits["fresh"] == 1
+
+
+async def test_uncached_responses_go_back_to_the_origin(local_proxy, origin_server):
+    for query in ("cache=no-cache", "cache=no-store", "cache=max-age=0"):
+        url = f"{origin_server.url}/page?{query}"
+        statuses = [(await local_proxy.fetch(url))[1] for _ in range(2)]
+        assert statuses == ["MISS", "MISS"]
+    assert origin_server.hits["page"] == 6
+
+
+@pytest.mark.parametrize("validator", ["etag", "modified"])
+async def test_stale_entries_are_revalidated(local_proxy, origin_server, validator):
+    url = f"{origin_server.url}/checked?{validator}&cache=no-cache"
+    first, first_status = await local_proxy.fetch(url)
+    second, second_status = await local_proxy.fetch(url)
+    assert (first_status, second_status) == ("MISS", "REVALIDATED")
+    assert second.body == first.body
+    assert origin_server.hits["checked"] == 2
+    assert origin_server.not_modified == 1
+
+
+async def test_least_recently_used_entries_are_evicted(local_proxy, origin_server):
+    async def fetch(name: str) -> str:
+        return (await local_proxy.fetch(f"{origin_server.url}/{name}?size=1000"))[1]
+
+    assert [await fetch(name) for name in ("a", "b", "a", "c")] == [
+        "MISS",
+        "MISS",
+        "HIT",
+        "MISS",
+    ]
+    assert local_proxy.cache.size <= local_proxy.cache.max_bytes
+    assert await fetch("a") == "HIT"
+    assert await fetch("b") == "MISS"
+    assert origin_server.hits == {"a": 1, "b": 2, "c": 1}
+
+
+async def test_concurrent_fetches_share_one_request(local_proxy, origin_server):
+    url = f"{origin_server.url}/slow?delay=0.2"
+    results = await asyncio.gather(*(local_proxy.fetch(url) for _ in range(5)))
+    assert {id(entry) for entry, _ in results} == {id(results[0][0])}
+    assert origin_server.hits["slow"] == 1
+
+
+async def test_connections_go_to_the_checked_address(
+    local_proxy, origin_server, monkeypatch
+):
+    async def resolve(host: str) -> list[str]:
+        return ["127.0.0.1"] if host == "origin.test" else []
+
+    monkeypatch.setattr(proxy, "_resolve", resolve)
+    port = origin_server.url.rsplit(":", 1)[1]
+    entry, _ = await local_proxy.fetch(f"http://origin.test:{port}/pinned")
+    assert b"pinned" in entry.body
+    assert origin_server.hosts == [f"origin.test:{port}"]
+
+
+async def test_names_rebinding_after_the_check_are_refused(
+    local_proxy, origin_server, monkeypatch
+):
+    answers = [["93.184.216.34"], ["127.0.0.1"]]
+    calls = []
+
+    async def resolve(host: str) -> list[str]:
+        calls.append(host)
+        return answers[min(len(calls), len(answers)) - 1]
+
+    monkeypatch.setattr(proxy, "_resolve", resolve)
+    monkeypatch.setattr(proxy, "PROXY_ALLOW_PRIVATE", False)
+    port = origin_server.url.rsplit(":", 1)[1]
+    with pytest.raises(PrivateAddressError):
+        await local_proxy.fetch(f"http://rebind.test:{port}/secret")
+    assert calls == ["rebind.test", "rebind.test"]
+    assert not origin_server.hits
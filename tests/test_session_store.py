@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app import session_store as session_store_module
+from app.session_store import SessionStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = SessionStore(str(tmp_path))
+    yield store
+    await store.close()
+
+
+def _tabs(session) -> list[tuple[int, str]]:
+    return [(tab.id, tab.url) for tab in session.tabs.values()]
+
+
+async def test_windows_keep_separate_logs(store):
+    assert await store.load("p", "window-1") is None
+    store.record("p", "window-1", "t", 1, "D", "https://d.com", 0, ["https://d.com"])
+    store.record("p", "window-1", "a", 1)
+    second = await store.load("p", "window-2")
+    assert _tabs(second) == [(1, "https://d.com")]
+    store.record("p", "window-2", "c", 1)
+    store.record("p", "window-2", "t", 2, "New Tab", "", 0, ["about:blank"])
+    store.record("p", "window-1", "p", 1, "E", "https://e.com", "https://e.com")
+    await store.flush()
+    assert _tabs(await store.load("p", "window-1")) == [(1, "https://e.com")]
+    assert _tabs(await store.load("p", "window-2")) == [(2, "")]
+
+
+async def test_new_window_forks_the_latest_log(store, tmp_path):
+    (tmp_path / "p.session").write_text(
+        '["t",1,"Old","https://old.com",0,["https://old.com"]]\n["a",1]\n'
+    )
+    assert _tabs(await store.load("p", "window-1")) == [(1, "https://old.com")]
+    store.record("p", "window-1", "p", 1, "New", "https://new.com", "https://new.com")
+    await store.flush()
+    restored = await store.load("p", "window-2")
+    assert _tabs(restored) == [(1, "https://new.com")]
+    assert restored.active_id == 1
+
+
+async def test_old_window_logs_are_pruned(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store_module, "MAX_WINDOW_LOGS", 3)
+    for window in range(6):
+        await store.load("p", f"window-{window}")
+        store.record("p", f"window-{window}", "a", window)
+        await store.flush()
+    assert len(list((tmp_path / "p").iterdir())) <= 3
+
+
+async def test_corrupt_tab_records_are_skipped_or_clamped(store, tmp_path):
+    (tmp_path / "p.session").write_text(
+        '["t",1,"A","https://a.com",0,[]]\n'
+        '["t",2,"B","https://b.com",0,"https://b.com"]\n'
+        '["t",3,"C","https://c.com",0,[1]]\n'
+        '["t",4,"D","https://d.com",7,["about:blank","https://d.com"]]\n'
+        '["p",1,"E","https://e.com","https://e.com"]\n'
+    )
+    session = await store.load("p", "window-1")
+    assert _tabs(session) == [(4, "https://d.com")]
+    assert session.tabs[4].position == 1
+
+
+async def test_failed_background_flush_is_logged(store, monkeypatch, caplog):
+    def fail(path: str, data: str):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(session_store_module, "FLUSH_INTERVAL", 0)
+    monkeypatch.setattr(session_store_module, "_append", fail)
+    store.record("p", "window-1", "a", 1)
+    await asyncio.sleep(0.05)
+    assert not store._flush_tasks
+    assert "Could not write session" in caplog.text
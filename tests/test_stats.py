@@ -0,0 +1,48 @@
+import pytest
+
+from app import stats
+from app.history_store import HistoryStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def store(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    monkeypatch.setattr(stats, "history_store", store)
+    monkeypatch.setattr(stats, "_profiles", stats.OrderedDict())
+    yield store
+    await store.close()
+
+
+async def test_stats_are_loaded_from_history(store):
+    await store.import_visits(
+        "p",
+        [
+            ("https://www.github.com/", "GitHub", 1.0),
+            ("https://gist.github.com/", "Gist", 2.0),
+            ("https://example.org/", "Example", 3.0),
+        ],
+    )
+    store.record("p", "https://github.com/", "GitHub", 4.0)
+    profile_stats = await stats.load_stats("p")
+    assert profile_stats.visits.top(2) == [
+        {"domain": "github.com", "visits": 3},
+        {"domain": "example.org", "visits": 1},
+    ]
+    assert profile_stats.visits.total_visits == 4
+    stats.record_visit("p", "https://example.org/a")
+    assert (await stats.load_stats("p")).visits.counts["example.org"] == 2
+
+
+async def test_load_times_survive_a_reload(store):
+    await stats.load_stats("p")
+    for load_ms in (50, 60, 900):
+        stats.record_load_time("p", "https://news.example.com/", load_ms)
+    stats.record_load_time("p", "https://other.example.org/", 20)
+    before = stats.get_loaded_stats("p").load_times.top(2)
+    assert before[0]["domain"] == "example.com"
+    assert before[0]["loads"] == 3
+    stats.invalidate_stats("p")
+    assert stats.get_loaded_stats("p") is None
+    assert (await stats.load_stats("p")).load_times.top(2) == before
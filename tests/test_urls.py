@@ -0,0 +1,84 @@
+import pytest
+
+from app import urls
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("github.com", "https://github.com"),
+        ("  https://github.com/reflex-dev  ", "https://github.com/reflex-dev"),
+        ("www.bbc.co.uk/news", "https://www.bbc.co.uk/news"),
+        ("http://example.com", "http://example.com"),
+        ("localhost:3000", "http://localhost:3000"),
+        ("dev.localhost", "http://dev.localhost"),
+        ("127.0.0.1:8080/x", "http://127.0.0.1:8080/x"),
+        ("[::1]:8000", "http://[::1]:8000"),
+        ("bücher.de", "https://xn--bcher-kva.de"),
+        ("https://münchen.de/straße", "https://xn--mnchen-3ya.de/stra%C3%9Fe"),
+        ("news.ycombinator.com/item?id=1", "https://news.ycombinator.com/item?id=1"),
+        ("ABOUT:Config", "about:config"),
+    ],
+)
+def test_resolves_addresses(text, expected):
+    assert urls.resolve(text, "Google") == (expected, False)
+
+
+@pytest.mark.parametrize(
+    ("text", "query"),
+    [
+        ("python asyncio", "python+asyncio"),
+        ("foo", "foo"),
+        ("1.2", "1.2"),
+        ("example.invalidtld", "example.invalidtld"),
+        ("a b.com", "a+b.com"),
+        ("C++ tutorial", "C%2B%2B+tutorial"),
+        ("ftp://example.com", "ftp://example.com"),
+        ("javascript:alert(1)", "javascript:alert(1)"),
+        ("https://[oops/", "https://%5Boops/"),
+    ],
+)
+def test_searches_everything_else(text, query):
+    assert urls.resolve(text, "DuckDuckGo") == (
+        f"https://duckduckgo.com/?q={query}",
+        True,
+    )
+
+
+def test_unknown_search_engine_falls_back_to_google():
+    assert urls.search_url("x y", "Nope") == "https://www.google.com/search?q=x+y"
+
+
+@pytest.mark.parametrize(
+    ("url", "domain", "host"),
+    [
+        ("https://www.bbc.co.uk/news", "bbc.co.uk", "bbc.co.uk"),
+        ("https://sub.example.com", "example.com", "sub.example.com"),
+        ("https://a.b.github.io/x", "b.github.io", "a.b.github.io"),
+        ("https://xn--mnchen-3ya.de/", "münchen.de", "münchen.de"),
+        ("http://localhost:3000", "localhost", "localhost"),
+        ("http://127.0.0.1/", "127.0.0.1", "127.0.0.1"),
+        ("https://WWW.Example.COM.", "example.com", "example.com."),
+        ("https://[oops/", "", "https://[oops/"),
+        ("about:blank", "", "about:blank"),
+    ],
+)
+def test_domains_and_display_hosts(url, domain, host):
+    assert urls.registrable_domain(url) == domain
+    assert urls.display_host(url) == host
+
+
+@pytest.mark.parametrize(
+    ("url", "navigable"),
+    [
+        ("https://example.com/a", True),
+        ("HTTP://Example.com", True),
+        ("https://[oops/", False),
+        ("https://example.com:99999/", False),
+        ("javascript:alert(1)", False),
+        ("place:sort=8", False),
+        ("example.com", False),
+    ],
+)
+def test_navigable_urls(url, navigable):
+    assert urls.is_navigable(url) is navigable